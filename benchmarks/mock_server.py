@@ -0,0 +1,349 @@
+"""
+A local stand-in for the BFL API, for benchmarking the client offline.
+
+The server implements the endpoints the client talks to: model submission
+(`POST /v1/<model>`), polling (`GET /v1/get_result?id=...`) and signed sample
+downloads (`GET /samples/<id>.jpeg`). Each endpoint answers after a latency
+drawn from a configurable distribution, and the server can inject transient
+failures, failed tasks and rate limiting so retries and backoff show up in
+the numbers.
+
+Run it on its own with:
+
+    python -m benchmarks.mock_server --port 8765 --poll-latency lognormal:0.02,0.5
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+Distribution = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> Distribution:
+    """
+    Parse a latency distribution, in seconds.
+
+    Supported forms:
+        "0.05"                  constant
+        "uniform:LOW,HIGH"      uniform between LOW and HIGH
+        "exp:MEAN"              exponential with the given mean
+        "lognormal:MEDIAN,SIGMA" log-normal, long-tailed like real networks
+
+    Raises:
+        ValueError: If the specification is not understood
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        value = float(kind)
+        if value < 0:
+            raise ValueError(f"Latency must not be negative: {spec!r}")
+        return lambda rng: value
+    params = [float(a) for a in args.split(",")]
+    if kind == "uniform" and len(params) == 2:
+        low, high = params
+        return lambda rng: rng.uniform(low, high)
+    if kind == "exp" and len(params) == 1:
+        (mean,) = params
+        return lambda rng: rng.expovariate(1 / mean) if mean > 0 else 0.0
+    if kind == "lognormal" and len(params) == 2:
+        median, sigma = params
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server."""
+
+    submit_latency: str = "0"
+    poll_latency: str = "0"
+    sample_latency: str = "0"
+    # Seconds from submission until a task is ready
+    generation_time: str = "0"
+    # Probability that a request is answered with a 503
+    failure_rate: float = 0.0
+    # Probability that a task ends as "failed" instead of "Ready"
+    task_failure_rate: float = 0.0
+    # Sustained requests per second before answering 429 (None: unlimited)
+    rate_limit: Optional[float] = None
+    sample_size: int = 256 * 1024
+    seed: Optional[int] = None
+
+
+@dataclass
+class MockStats:
+    """Requests seen by the mock server."""
+
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    requests: Dict[str, int] = field(default_factory=dict)
+    bytes_received: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+
+    def record(self, endpoint: str, received: int) -> None:
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_received += received
+
+    def to_dict(self) -> Dict[str, object]:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "bytes_received": self.bytes_received,
+                "failures": self.failures,
+                "rate_limited": self.rate_limited,
+            }
+
+
+class _Bucket:
+    """Token bucket deciding which requests are rate limited."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> Optional[float]:
+        """Take a token, or return the seconds until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this every response
+    # waits for the client's delayed ACK and adds ~40ms to each request
+    disable_nagle_algorithm = True
+    server: "_MockHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self, endpoint: str, latency: Distribution, received: int) -> bool:
+        """Simulate latency and injected errors. False if an error was sent."""
+        server = self.server
+        server.stats.record(endpoint, received)
+        time.sleep(server.draw(latency))
+        if server.bucket is not None:
+            wait = server.bucket.take()
+            if wait is not None:
+                with server.stats.lock:
+                    server.stats.rate_limited += 1
+                retry_after = f"{max(wait, 0.001):.3f}"
+                self._send(
+                    429, {"detail": "Rate limited"}, {"Retry-After": retry_after}
+                )
+                return False
+        if server.chance(server.config.failure_rate):
+            with server.stats.lock:
+                server.stats.failures += 1
+            self._send(503, {"detail": "Service unavailable"})
+            return False
+        return True
+
+    def do_POST(self):
+        body = self._read_body()
+        if not self._admit("submit", self.server.submit_latency, len(body)):
+            return
+        task_id = uuid.uuid4().hex
+        ready_at = time.monotonic() + self.server.draw(self.server.generation_time)
+        failed = self.server.chance(self.server.config.task_failure_rate)
+        with self.server.tasks_lock:
+            self.server.tasks[task_id] = (ready_at, failed)
+        self._send(
+            200,
+            {
+                "id": task_id,
+                "polling_url": f"{self._base()}/v1/get_result?id={task_id}",
+            },
+        )
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path.startswith("/samples/"):
+            if self._admit("sample", self.server.sample_latency, 0):
+                self._send(200, self.server.sample, content_type="image/jpeg")
+            return
+
+        if not self._admit("poll", self.server.poll_latency, 0):
+            return
+        task_id = parse_qs(parts.query).get("id", [""])[0]
+        with self.server.tasks_lock:
+            task = self.server.tasks.get(task_id)
+        if task is None:
+            return self._send(404, {"detail": "Task not found"})
+        ready_at, failed = task
+        if time.monotonic() < ready_at:
+            return self._send(200, {"id": task_id, "status": "Pending"})
+        if failed:
+            return self._send(
+                200, {"id": task_id, "status": "failed", "error": "Simulated failure"}
+            )
+        self._send(
+            200,
+            {
+                "id": task_id,
+                "status": "Ready",
+                "result": {"sample": f"{self._base()}/samples/{task_id}.jpeg"},
+            },
+        )
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.stats = MockStats()
+        self.submit_latency = parse_latency(config.submit_latency)
+        self.poll_latency = parse_latency(config.poll_latency)
+        self.sample_latency = parse_latency(config.sample_latency)
+        self.generation_time = parse_latency(config.generation_time)
+        self.bucket = _Bucket(config.rate_limit) if config.rate_limit else None
+        self.sample = b"\xff\xd8\xff\xe0" + b"\0" * max(config.sample_size - 4, 0)
+        self.tasks: Dict[str, tuple] = {}
+        self.tasks_lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+
+    def draw(self, distribution: Distribution) -> float:
+        with self._rng_lock:
+            return max(distribution(self._rng), 0.0)
+
+    def chance(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < probability
+
+
+class MockBFLServer:
+    """
+    The mock server, run on a background thread.
+
+    Examples:
+        >>> with MockBFLServer(MockConfig(poll_latency="uniform:0.01,0.03")) as server:
+        ...     client = BFLClient(api_key="bench", base_url=server.url)
+    """
+
+    def __init__(
+        self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port=0
+    ):
+        self.httpd = _MockHTTPServer((host, port), config or MockConfig())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> MockStats:
+        return self.httpd.stats
+
+    def __enter__(self) -> "MockBFLServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of MockConfig to a command line parser."""
+    group = parser.add_argument_group("mock server")
+    group.add_argument("--submit-latency", default="0")
+    group.add_argument("--poll-latency", default="0")
+    group.add_argument("--sample-latency", default="0")
+    group.add_argument(
+        "--generation-time", default="0.05", help="Seconds until a task is ready"
+    )
+    group.add_argument("--failure-rate", type=float, default=0.0)
+    group.add_argument("--task-failure-rate", type=float, default=0.0)
+    group.add_argument(
+        "--rate-limit", type=float, default=None, help="Requests per second"
+    )
+    group.add_argument("--sample-size", type=int, default=256 * 1024)
+    group.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        submit_latency=args.submit_latency,
+        poll_latency=args.poll_latency,
+        sample_latency=args.sample_latency,
+        generation_time=args.generation_time,
+        failure_rate=args.failure_rate,
+        task_failure_rate=args.task_failure_rate,
+        rate_limit=args.rate_limit,
+        sample_size=args.sample_size,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args()
+    with MockBFLServer(config_from_args(args), args.host, args.port) as server:
+        # The first line tells a parent process where to connect
+        print(server.url, flush=True)
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(json.dumps(server.stats.to_dict()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
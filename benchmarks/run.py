@@ -0,0 +1,416 @@
+"""
+Benchmark the client against a local mock BFL server.
+
+Every scenario generates a number of images in one of three modes and
+reports throughput, per-task latency percentiles, CPU time per task and peak
+traced memory:
+
+    sync      one `BFLClient.generate(sync=True)` after the other
+    threaded  `BFLClient.generate(sync=True)` from a thread pool
+    async     `AsyncBFLClient.generate(sync=True)` gathered on one event loop
+
+Input payloads range from a bare prompt to reference images of several
+megabytes, passed as file paths so the upload path is exercised. The mock
+server runs in a subprocess, so CPU and memory figures are the client's
+alone. Save a run with `--output` and compare later runs against it with
+`--compare` to spot regressions:
+
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.mock_server import add_arguments
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.polling.strategies import FixedInterval
+from blackforest.types.general.client_config import ClientConfig
+
+MODES = ("sync", "threaded", "async")
+
+_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+# Metrics compared by --compare, and whether higher values are better
+COMPARED = {
+    "throughput": True,
+    "p50": False,
+    "p99": False,
+    "cpu_per_task": False,
+    "peak_memory": False,
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as "10KB" or "20MB" into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", value.upper())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2) or ""])
+
+
+def format_size(size: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if size >= _UNITS[unit]:
+            return f"{size / _UNITS[unit]:.3g}{unit}"
+    return f"{size}B"
+
+
+def make_image(size: int, directory: str) -> str:
+    """Write a PNG of roughly `size` bytes; noise does not compress."""
+    from PIL import Image
+
+    side = max(int((size / 3) ** 0.5), 8)
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    path = os.path.join(directory, f"input-{size}.png")
+    image.save(path, compress_level=1)
+    return path
+
+
+@dataclass
+class Scenario:
+    mode: str
+    payload_size: int
+    tasks: int
+    concurrency: int
+
+
+@dataclass
+class BenchmarkResult:
+    mode: str
+    payload_size: int
+    tasks: int
+    concurrency: int
+    errors: int
+    # Seconds for the whole scenario
+    wall: float
+    # Tasks per second
+    throughput: float
+    # Per-task latency from submission to final result, in seconds
+    p50: float
+    p99: float
+    # Client process CPU seconds per task
+    cpu_per_task: float
+    # Peak memory traced during the scenario, in bytes (None if not measured)
+    peak_memory: Optional[int]
+
+    @property
+    def name(self) -> str:
+        payload = format_size(self.payload_size) if self.payload_size else "prompt"
+        return f"{self.mode}/{payload}"
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _timed(call: Callable[[], Any]) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        call()
+        ok = True
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+async def _timed_async(call: Callable[[], Any]) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        await call()
+        ok = True
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+class Runner:
+    """Runs scenarios against a server at `base_url`."""
+
+    def __init__(
+        self,
+        base_url: str,
+        poll_interval: float = 0.02,
+        image_dir: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.config = ClientConfig(
+            sync=True,
+            timeout=120,
+            max_retries=10_000,
+            polling_strategy=FixedInterval(poll_interval),
+        )
+        self.image_dir = image_dir or tempfile.mkdtemp(prefix="bfl-bench-")
+        self._images: Dict[int, str] = {}
+
+    def inputs(self, payload_size: int) -> Tuple[str, Dict[str, Any]]:
+        """Model and inputs of one task with a payload of `payload_size`."""
+        if payload_size == 0:
+            return "flux-dev", {"prompt": "a benchmark"}
+        if payload_size not in self._images:
+            self._images[payload_size] = make_image(payload_size, self.image_dir)
+        inputs = {"prompt": "a benchmark", "input_image": self._images[payload_size]}
+        return "flux-kontext-pro", inputs
+
+    def _run_sync(self, scenario: Scenario) -> List[Tuple[float, bool]]:
+        model, inputs = self.inputs(scenario.payload_size)
+        client = BFLClient(api_key="bench", base_url=self.base_url)
+        with client.session:
+            _timed(lambda: client.generate(model, inputs, self.config))  # warm up
+            return [
+                _timed(lambda: client.generate(model, inputs, self.config))
+                for _ in range(scenario.tasks)
+            ]
+
+    def _run_threaded(self, scenario: Scenario) -> List[Tuple[float, bool]]:
+        model, inputs = self.inputs(scenario.payload_size)
+        client = BFLClient(api_key="bench", base_url=self.base_url)
+        with client.session, ThreadPoolExecutor(scenario.concurrency) as pool:
+            _timed(lambda: client.generate(model, inputs, self.config))
+            return list(
+                pool.map(
+                    lambda _: _timed(
+                        lambda: client.generate(model, inputs, self.config)
+                    ),
+                    range(scenario.tasks),
+                )
+            )
+
+    async def _run_async(self, scenario: Scenario) -> List[Tuple[float, bool]]:
+        model, inputs = self.inputs(scenario.payload_size)
+        semaphore = asyncio.Semaphore(scenario.concurrency)
+
+        async with AsyncBFLClient(api_key="bench", base_url=self.base_url) as client:
+            await _timed_async(lambda: client.generate(model, inputs, self.config))
+
+            async def one():
+                async with semaphore:
+                    return await _timed_async(
+                        lambda: client.generate(model, inputs, self.config)
+                    )
+
+            return await asyncio.gather(*(one() for _ in range(scenario.tasks)))
+
+    def _execute(self, scenario: Scenario) -> List[Tuple[float, bool]]:
+        if scenario.mode == "sync":
+            return self._run_sync(scenario)
+        if scenario.mode == "threaded":
+            return self._run_threaded(scenario)
+        if scenario.mode == "async":
+            return asyncio.run(self._run_async(scenario))
+        raise ValueError(f"Unknown mode: {scenario.mode!r}")
+
+    def run(self, scenario: Scenario, measure_memory: bool = True) -> BenchmarkResult:
+        """
+        Run a scenario. Memory is traced in a second pass, since tracing
+        slows down allocation-heavy code and would distort the timings.
+        """
+        self.inputs(scenario.payload_size)
+        cpu = time.process_time()
+        start = time.perf_counter()
+        samples = self._execute(scenario)
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+
+        peak_memory = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                self._execute(scenario)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        latencies = [elapsed for elapsed, _ in samples]
+        return BenchmarkResult(
+            mode=scenario.mode,
+            payload_size=scenario.payload_size,
+            tasks=scenario.tasks,
+            concurrency=1 if scenario.mode == "sync" else scenario.concurrency,
+            errors=sum(1 for _, ok in samples if not ok),
+            wall=wall,
+            throughput=scenario.tasks / wall if wall > 0 else 0.0,
+            p50=_percentile(latencies, 0.50),
+            p99=_percentile(latencies, 0.99),
+            cpu_per_task=cpu / scenario.tasks,
+            peak_memory=peak_memory,
+        )
+
+
+class ServerProcess:
+    """The mock server in a subprocess, started with the given arguments."""
+
+    def __init__(self, server_args: Sequence[str]):
+        self.server_args = list(server_args)
+        self.process: Optional[subprocess.Popen] = None
+        self.url = ""
+        self.stats: Dict[str, Any] = {}
+
+    def __enter__(self) -> "ServerProcess":
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_server", *self.server_args],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.url = self.process.stdout.readline().strip()
+        if not self.url:
+            self.process.wait()
+            raise RuntimeError("The mock server failed to start")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.process.send_signal(signal.SIGINT)
+        try:
+            out, _ = self.process.communicate(timeout=10)
+            self.stats = json.loads(out.strip().splitlines()[-1])
+        except (subprocess.TimeoutExpired, ValueError, IndexError):
+            self.process.kill()
+            self.process.wait()
+
+
+def _server_args(args: argparse.Namespace) -> List[str]:
+    options = {
+        "--submit-latency": args.submit_latency,
+        "--poll-latency": args.poll_latency,
+        "--sample-latency": args.sample_latency,
+        "--generation-time": args.generation_time,
+        "--failure-rate": args.failure_rate,
+        "--task-failure-rate": args.task_failure_rate,
+        "--rate-limit": args.rate_limit,
+        "--sample-size": args.sample_size,
+        "--seed": args.seed,
+    }
+    return [f"{k}={v}" for k, v in options.items() if v is not None]
+
+
+def print_table(results: Sequence[BenchmarkResult]) -> None:
+    header = (
+        f"{'scenario':<18}{'tasks':>6}{'errors':>7}{'tasks/s':>9}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'cpu ms/task':>12}{'peak mem':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        memory = format_size(r.peak_memory) if r.peak_memory is not None else "-"
+        print(
+            f"{r.name:<18}{r.tasks:>6}{r.errors:>7}{r.throughput:>9.1f}"
+            f"{r.p50 * 1000:>9.1f}{r.p99 * 1000:>9.1f}"
+            f"{r.cpu_per_task * 1000:>12.2f}{memory:>10}"
+        )
+
+
+def compare(
+    results: Sequence[BenchmarkResult],
+    baseline: Sequence[Dict[str, Any]],
+    threshold: float,
+) -> List[str]:
+    """
+    Compare results with a saved baseline.
+
+    Returns:
+        One line per metric that got worse by more than `threshold`,
+        relative to the baseline
+    """
+    previous = {(b["mode"], b["payload_size"]): b for b in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result.mode, result.payload_size))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), getattr(result, metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if higher_is_better:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{result.name} {metric}: {old:.4g} -> {new:.4g} "
+                    f"({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the BFL client against a local mock server."
+    )
+    parser.add_argument(
+        "--modes", default=",".join(MODES), help="Comma-separated modes to run"
+    )
+    parser.add_argument(
+        "--payload-sizes",
+        default="0,10KB,1MB,20MB",
+        help="Comma-separated input image sizes; 0 sends a prompt only",
+    )
+    parser.add_argument("--tasks", type=int, default=50, help="Tasks per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--poll-interval", type=float, default=0.02, help="Client polling interval"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the memory tracing pass"
+    )
+    parser.add_argument("--output", help="Write the results to a JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative change reported as a regression",
+    )
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"Unknown mode {mode!r}, expected one of {MODES}")
+    sizes = [parse_size(s) for s in args.payload_sizes.split(",") if s.strip()]
+
+    results = []
+    with ServerProcess(_server_args(args)) as server:
+        runner = Runner(server.url, poll_interval=args.poll_interval)
+        for size in sizes:
+            for mode in modes:
+                scenario = Scenario(mode, size, args.tasks, args.concurrency)
+                result = runner.run(scenario, not args.no_memory)
+                results.append(result)
+                print(
+                    f"{result.name}: {result.throughput:.1f} tasks/s", file=sys.stderr
+                )
+    print_table(results)
+    print(f"\nserver: {json.dumps(server.stats)}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
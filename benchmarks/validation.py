@@ -0,0 +1,148 @@
+"""
+Microbenchmark of payload validation for every model in the registry.
+
+For each input class, the time to turn a typical input dict into request
+body bytes is measured along three paths:
+
+    model     `input_cls(**inputs).model_dump(...)` then `json.dumps`, as the
+              client did before compiled validators
+    compiled  `ModelValidator.validate` then pydantic-core's `to_json`
+    trusted   `ModelValidator.trusted` then `to_json`, without validation
+
+Image inputs are 256x256 PNGs, the smallest the API accepts; for them the
+JSON encoding of the base64 string dominates:
+
+    python -m benchmarks.validation --output validation.json
+"""
+
+import argparse
+import base64
+import io
+import json
+import sys
+import timeit
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from PIL import Image
+from pydantic_core import to_json
+
+from blackforest.resources.mapping.model_input_registry import MODEL_INPUT_REGISTRY
+from blackforest.validators import validator_for
+
+
+def _png(size: int = 256) -> str:
+    out = io.BytesIO()
+    Image.effect_noise((size, size), 40).convert("RGB").save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def sample_inputs() -> Dict[str, Dict[str, Any]]:
+    """Typical valid inputs of each model in the registry."""
+    image = _png()
+    text = {
+        "prompt": "a lighthouse on a cliff at dawn, volumetric light",
+        "seed": 42,
+    }
+    dimensions = {**text, "width": 1024, "height": 768}
+    samples = {
+        "flux-dev": {**dimensions, "steps": 28, "guidance": 3.0},
+        "flux-pro": {**dimensions, "steps": 40, "guidance": 2.5},
+        "flux-pro-1.1": dimensions,
+        "flux-pro-1.1-ultra": {**text, "aspect_ratio": "21:9", "raw": True},
+        "flux-pro-1.0-fill": {**text, "image": image, "mask": image},
+        "flux-pro-1.0-expand": {**text, "image": image, "top": 64, "bottom": 64},
+        "flux-pro-1.0-canny": {**text, "control_image": image},
+        "flux-pro-1.0-depth": {**text, "control_image": image},
+        "flux-kontext-pro": {**text, "input_image": image, "aspect_ratio": "16:9"},
+    }
+    return {model: samples.get(model, text) for model in MODEL_INPUT_REGISTRY}
+
+
+@dataclass
+class ValidationResult:
+    model: str
+    input_class: str
+    # Microseconds per payload, fastest of the repeats
+    model_us: float
+    compiled_us: float
+    trusted_us: float
+
+
+def _per_call(call: Callable[[], Any], number: int, repeat: int) -> float:
+    timer = timeit.Timer(call)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def measure(
+    model: str, inputs: Dict[str, Any], number: int = 2000, repeat: int = 5
+) -> ValidationResult:
+    """Time the three validation paths on one model's inputs."""
+    input_cls = MODEL_INPUT_REGISTRY[model]
+    validator = validator_for(input_cls)
+
+    def legacy() -> bytes:
+        payload = input_cls(**inputs).model_dump(mode="json", exclude_none=True)
+        return json.dumps(payload).encode("utf-8")
+
+    paths = {
+        "model": legacy,
+        "compiled": lambda: to_json(validator.validate(inputs)),
+        "trusted": lambda: to_json(validator.trusted(inputs)),
+    }
+    timings = {path: _per_call(call, number, repeat) for path, call in paths.items()}
+    return ValidationResult(
+        model=model,
+        input_class=input_cls.__name__,
+        model_us=timings["model"],
+        compiled_us=timings["compiled"],
+        trusted_us=timings["trusted"],
+    )
+
+
+def print_table(results: Sequence[ValidationResult]) -> None:
+    header = (
+        f"{'model':<22}{'model µs':>10}{'compiled µs':>13}{'trusted µs':>12}"
+        f"{'speedup':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.model:<22}{r.model_us:>10.2f}{r.compiled_us:>13.2f}"
+            f"{r.trusted_us:>12.2f}{r.model_us / r.compiled_us:>8.1f}x"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--models", help="Comma-separated models to measure (default: all)"
+    )
+    parser.add_argument("--number", type=int, default=2000, help="Calls per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    samples = sample_inputs()
+    models = list(samples)
+    if args.models:
+        models = [m.strip() for m in args.models.split(",") if m.strip()]
+        for model in models:
+            if model not in samples:
+                parser.error(
+                    f"Unknown model {model!r}, expected one of {list(samples)}"
+                )
+
+    results: List[ValidationResult] = [
+        measure(model, samples[model], args.number, args.repeat) for model in models
+    ]
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,12 @@ Black Forest Labs API Client
 
 __version__ = "0.1.0"
 
+import logging
+
+from blackforest.async_client import AsyncBFLClient
 from blackforest.client import BFLClient, BFLError
 
-__all__ = ["BFLClient", "BFLError"]
+# Library code only logs; applications decide where the records go
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+__all__ = ["AsyncBFLClient", "BFLClient", "BFLError"]
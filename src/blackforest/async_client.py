@@ -0,0 +1,742 @@
+"""
+Asyncio client implementation for the BFL API.
+"""
+
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlencode
+
+from pydantic_core import to_json
+
+from blackforest.base_client import (
+    POLLING_URL_TTL,
+    TERMINAL_STATUSES,
+    BaseBFLClient,
+    BFLError,
+)
+from blackforest.batch import agenerate_many
+from blackforest.images.cache import EncodedImageCache
+from blackforest.images.control import ControlPreprocessor
+from blackforest.images.encoding import StreamingJSONBody
+from blackforest.images.preprocess import ImagePreprocessor
+from blackforest.journal import TaskJournal
+from blackforest.metrics import Instrumentation
+from blackforest.progress import ProgressReporter
+from blackforest.result_cache import ResultCache
+from blackforest.transport.async_http import (
+    AsyncTransport,
+    ConnectError,
+    TransportError,
+    default_transport,
+)
+from blackforest.transport.rate_limit import RateLimiter
+from blackforest.transport.retry import RetryPolicy
+from blackforest.transport.session import ConnectionStats
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.general.ingestion_config import IngestionConfig
+from blackforest.types.inputs.generic import ImageInput
+from blackforest.types.responses.responses import (
+    AsyncResponse,
+    BatchResult,
+    ImageProcessingResponse,
+    SyncResponse,
+    TaskResult,
+)
+from blackforest.webhooks import WebhookReceiver
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBFLClient(BaseBFLClient):
+    """
+    Asyncio client for the Black Forest Labs API.
+
+    Mirrors BFLClient, but every network call is a coroutine so a single event
+    loop can drive many generations concurrently.
+
+    Examples:
+        >>> import asyncio
+        >>> from blackforest import AsyncBFLClient
+        >>>
+        >>> async def main():
+        ...     async with AsyncBFLClient(api_key="your-api-key") as client:
+        ...         responses = await asyncio.gather(
+        ...             *(client.generate("flux-pro-1.1", {"prompt": p})
+        ...               for p in ["a forest", "a lake"])
+        ...         )
+        >>> asyncio.run(main())
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.bfl.ai",
+        timeout: int = 30,
+        transport: Optional[AsyncTransport] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        stream_uploads: bool = True,
+        image_cache: Optional[EncodedImageCache] = None,
+        polling_url_ttl: float = POLLING_URL_TTL,
+        max_polling_urls: Optional[int] = None,
+        journal: Optional[TaskJournal] = None,
+        result_cache: Optional[ResultCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        control_preprocessor: Optional[ControlPreprocessor] = None,
+        trusted_inputs: bool = False,
+    ):
+        """
+        Initialize the async BFL client.
+
+        Args:
+            api_key: Your BFL API key
+            base_url: Base URL for the API (optional)
+            timeout: Request timeout in seconds (optional)
+            transport: HTTP transport to use (optional). Defaults to aiohttp when
+                installed, otherwise a stdlib asyncio transport.
+            retry_policy: Policy for retrying transient failures (optional).
+                Use RetryPolicy.disabled() to turn retries off.
+            rate_limiter: Client-side rate limiter, may be shared with other
+                sync or async clients (optional)
+            stream_uploads: Base64-encode local image files in chunks while
+                the request is sent instead of building the whole encoded
+                payload in memory first (default: True)
+            image_cache: Cache of encoded input images, may be shared between
+                clients (optional). Takes precedence over stream_uploads.
+            polling_url_ttl: Seconds the polling URL of a submitted task is
+                kept (default: 30 minutes)
+            max_polling_urls: Maximum number of polling URLs kept; the oldest
+                are dropped first (optional)
+            journal: Durable record of submitted tasks, for resuming them
+                after a restart with `resume()` (optional)
+            result_cache: Cache reusing the response of identical seeded
+                requests instead of submitting them again (optional)
+            instrumentation: Receiver of request, task and transfer metrics.
+                Defaults to logging them at DEBUG level.
+            preprocessor: Downscales and re-encodes input images of the expand,
+                fill, canny and depth models before upload (optional)
+            control_preprocessor: Computes the edge or depth maps of canny
+                and depth requests locally, sending them as
+                `preprocessed_image` (optional)
+            trusted_inputs: Build generation payloads without validating the
+                inputs, for callers that guarantee they are valid. Invalid
+                inputs are then only rejected by the API. (default: False)
+        """
+        super().__init__(
+            api_key,
+            base_url=base_url,
+            timeout=timeout,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            stream_uploads=stream_uploads,
+            image_cache=image_cache,
+            polling_url_ttl=polling_url_ttl,
+            max_polling_urls=max_polling_urls,
+            journal=journal,
+            result_cache=result_cache,
+            instrumentation=instrumentation,
+            preprocessor=preprocessor,
+            control_preprocessor=control_preprocessor,
+            trusted_inputs=trusted_inputs,
+        )
+        self.transport = transport if transport is not None else default_transport()
+        self.headers = self._default_headers()
+
+    @property
+    def connection_stats(self) -> Optional[ConnectionStats]:
+        """New vs. reused connection counters, if the transport records them."""
+        return getattr(self.transport, "stats", None)
+
+    async def __aenter__(self) -> "AsyncBFLClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying transport and its pooled connections."""
+        await self.transport.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Make a request to the API.
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint (can be a relative path or full URL)
+            params: URL parameters
+            data: Form data
+            json: JSON data
+
+        Returns:
+            API response as dictionary
+
+        Raises:
+            BFLError: If the API request fails
+        """
+        response_data, _ = await self._request_with_headers(
+            method, endpoint, params=params, data=data, json=json
+        )
+        return response_data
+
+    async def _request_with_headers(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Mapping[str, str]]:
+        """
+        Make a request to the API and also return the (lower-cased) headers.
+
+        Raises:
+            BFLError: If the API request fails
+        """
+        url = self._build_url(endpoint)
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+        headers = dict(self.headers)
+        body: Optional[Union[bytes, StreamingJSONBody]] = None
+        if json is not None:
+            # Payloads referencing image files are encoded while being sent
+            body = StreamingJSONBody.wrap(json)
+            if body is None:
+                body = to_json(json)
+        elif data is not None:
+            body = urlencode(data).encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        attempt = 0
+        while True:
+            delay = self._rate_limit_delay(method, url)
+            if delay:
+                await asyncio.sleep(delay)
+            self.retry_policy.record_request()
+            start = time.perf_counter()
+            try:
+                response = await self.transport.request(
+                    method, url, headers=headers, body=body, timeout=self.timeout
+                )
+            except TransportError as e:
+                self._observe_request(method, url, None, time.perf_counter() - start)
+                attempt += 1
+                connect_error = isinstance(e, ConnectError)
+                delay = self.retry_policy.next_delay(
+                    method, attempt, connect_error=connect_error
+                )
+                if delay is None:
+                    raise BFLError(f"API request failed: {e}") from e
+                self._observe_retry(method, url, connect_error=connect_error)
+                await asyncio.sleep(delay)
+                continue
+
+            self._record_status(method, url, response.status)
+            self._observe_request(
+                method, url, response.status, time.perf_counter() - start, body
+            )
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = None
+
+            if response.status >= 400:
+                attempt += 1
+                delay = self.retry_policy.next_delay(
+                    method, attempt, status=response.status, headers=response.headers
+                )
+                if delay is not None:
+                    self._observe_retry(method, url, response.status)
+                    await asyncio.sleep(delay)
+                    continue
+                error_message = self._error_message(
+                    response_data,
+                    response.text,
+                    f"{response.status} Error: {response.reason} for url: {url}",
+                )
+                raise BFLError(f"API request failed: {error_message}")
+
+            if response_data is None:
+                raise BFLError(
+                    f"API request failed: invalid JSON response from {url}"
+                )
+            return response_data, response.headers
+
+    async def process_image(
+        self,
+        input_data: Union[str, ImageInput],
+        endpoint: str = "/v1/image",
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
+    ) -> ImageProcessingResponse:
+        """
+        Process an image or multiple images using the specified endpoint.
+
+        Image files are read and encoded in worker threads, both while the
+        payload is prepared and while streamed images are sent, so the event
+        loop is not blocked by disk I/O or encoding.
+
+        Args:
+            input_data: Either a path to an image file or an ImageInput object
+            endpoint: The API endpoint to use for processing
+            ingestion: Read the images of folders and zip archives on a thread
+                pool, within a memory budget, while the request is sent
+                (optional)
+            **kwargs: Additional parameters to pass to the API
+
+        Returns:
+            ImageProcessingResponse containing task ID and status
+
+        Raises:
+            BFLError: If there's an error processing the images
+        """
+        payload = await asyncio.to_thread(
+            self._prepare_image_payload, input_data, ingestion, **kwargs
+        )
+        return await self._submit_image_payload(endpoint, payload)
+
+    async def process_image_chunks(
+        self,
+        input_data: Union[str, ImageInput],
+        endpoint: str = "/v1/image",
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
+    ) -> List[ImageProcessingResponse]:
+        """
+        Process a large folder or zip archive in several requests.
+
+        See `BFLClient.process_image_chunks`.
+        """
+        payloads = await asyncio.to_thread(
+            lambda: list(self._image_chunk_payloads(input_data, ingestion, **kwargs))
+        )
+        return [
+            await self._submit_image_payload(endpoint, payload) for payload in payloads
+        ]
+
+    async def _acquire_task_slot_async(self) -> None:
+        """Like `_acquire_task_slot`, without blocking the event loop."""
+        if self.rate_limiter is None:
+            return
+        if not await self.rate_limiter.acquire_task_slot_async():
+            raise self._slot_timeout_error()
+
+    async def _submit_image_payload(
+        self, endpoint: str, payload: Dict[str, Any]
+    ) -> ImageProcessingResponse:
+        await self._acquire_task_slot_async()
+        try:
+            response = await self._request("POST", endpoint, json=payload)
+        except BaseException:
+            self._release_task_slot()
+            raise
+
+        # Store the polling URL for this task if available
+        task_id = response.get("id")
+        self._store_polling_url(task_id, response)
+        self._task_started(task_id)
+
+        return ImageProcessingResponse(
+            task_id=task_id, status="submitted", result=response
+        )
+
+    async def get_task_status(self, task_id: str) -> ImageProcessingResponse:
+        """
+        Get the status of a processing task.
+
+        Args:
+            task_id: The ID of the task to check
+
+        Returns:
+            ImageProcessingResponse containing current status and result if available
+        """
+        endpoint = self._get_polling_endpoint(task_id)
+        response = await self._request("GET", endpoint)
+
+        if response.get("status") in TERMINAL_STATUSES:
+            self._task_done(task_id, response["status"])
+        return self._parse_task_status(task_id, response)
+
+    async def get_polling_result(
+        self,
+        task_id: str,
+        config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Poll for results until they are ready or until timeout.
+
+        Args:
+            task_id: The ID of the task to poll for
+            config: Optional configuration for polling behavior
+            model: Model the task was submitted to, used by adaptive
+                polling strategies (optional)
+
+        Returns:
+            The final result from the API
+
+        Raises:
+            BFLError: If polling times out or the API request fails
+        """
+        result, _ = await self._wait_for_result(task_id, config, model)
+        return result
+
+    async def _wait_for_result(
+        self,
+        task_id: str,
+        config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Poll a task until completion, returning its result and the poll count."""
+        finished = await self._poll_until_done(task_id, config, model)
+        if finished.status == "failed":
+            raise BFLError(f"Task failed: {finished.error}")
+        if finished.error is not None:
+            raise BFLError(finished.error)
+        return finished.result or {}, finished.polls
+
+    async def _poll_until_done(
+        self,
+        task_id: str,
+        config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
+    ) -> TaskResult:
+        """
+        Poll a task until it reaches a final status or polling gives up.
+
+        Returns:
+            The task's final state, with status "Timeout" if polling gave up
+
+        Raises:
+            BFLError: If a polling request fails
+        """
+        if config is None:
+            config = ClientConfig()
+        strategy = config.get_polling_strategy()
+
+        start_time = time.time()
+        attempts = 0
+        delay = strategy.initial_delay(model)
+        if delay:
+            await asyncio.sleep(delay)
+
+        while attempts < config.max_retries:
+            logger.debug(
+                "Polling task %s for result, attempt %d of %d",
+                task_id,
+                attempts + 1,
+                config.max_retries,
+            )
+            endpoint = self._get_polling_endpoint(task_id)
+            response, headers = await self._request_with_headers("GET", endpoint)
+            attempts += 1
+
+            # Check if the task is complete
+            status = response.get("status")
+            if status in TERMINAL_STATUSES:
+                self._task_done(task_id, status, attempts)
+                if status == "failed":
+                    error = response.get("error", "Unknown error")
+                    return TaskResult(
+                        id=task_id, status=status, error=error, polls=attempts
+                    )
+                strategy.record(model, time.time() - start_time, attempts)
+                return TaskResult(
+                    id=task_id,
+                    status=status,
+                    result=response.get("result") or {},
+                    polls=attempts,
+                )
+
+            # Check for timeout
+            if config.timeout and (time.time() - start_time > config.timeout):
+                error = f"Polling timed out after {config.timeout} seconds"
+                return TaskResult(
+                    id=task_id, status="Timeout", error=error, polls=attempts
+                )
+
+            # Sleep before next attempt
+            delay = self._next_poll_delay(strategy, attempts, delay, model, headers)
+            await asyncio.sleep(delay)
+
+        error = f"Polling exceeded maximum retries ({config.max_retries})"
+        return TaskResult(id=task_id, status="Timeout", error=error, polls=attempts)
+
+    async def generate(
+        self,
+        model: str,
+        inputs: Dict[str, Any],
+        config: Optional[ClientConfig] = None,
+        track_usage: bool = False,
+    ) -> Union[AsyncResponse, SyncResponse]:
+        """
+        Generate an image using model
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Dictionary containing generation parameters
+            config: Optional configuration for client behavior
+            track_usage: Whether to track usage for licensed models (default: False)
+
+        Returns:
+            AsyncResponse containing task ID and polling URL
+            OR
+            SyncResponse containing actual results
+
+        Raises:
+            BFLError: If the API request fails
+        """
+        if config is None:
+            config = ClientConfig()
+
+        payload = await self._aprepare_generation_payload(model, inputs)
+        return await self._generate_payload(model, payload, config, track_usage)
+
+    async def _aprepare_generation_payload(
+        self, model: str, inputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the payload, in a thread if that may block the event loop."""
+        if self._prepares_blocking(model, inputs):
+            return await asyncio.to_thread(
+                self._prepare_generation_payload, model, inputs
+            )
+        return self._prepare_generation_payload(model, inputs)
+
+    async def _generate_payload(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        config: ClientConfig,
+        track_usage: bool = False,
+    ) -> Union[AsyncResponse, SyncResponse]:
+        """Submit a validated payload unless the result cache has its response."""
+        key = self._result_cache_key(model, payload, config.sync)
+        if key is not None:
+            # Identical requests share one task, see ResultCache
+            return await self.result_cache.get_or_create_async(
+                key,
+                lambda: self._submit_generation(model, payload, config, track_usage),
+            )
+        return await self._submit_generation(model, payload, config, track_usage)
+
+    async def _submit_generation(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        config: ClientConfig,
+        track_usage: bool = False,
+    ) -> Union[AsyncResponse, SyncResponse]:
+        """Submit an already validated payload and optionally wait for the result."""
+        await self._acquire_task_slot_async()
+        try:
+            with self.instrumentation.timer("generation.submit.duration", model=model):
+                response = await self._request(
+                    "POST",
+                    f"{self.api_version}/{model}",
+                    json=payload,
+                )
+        except BaseException:
+            self._release_task_slot()
+            raise
+
+        # Store the polling URL for this task
+        task_id = response["id"]
+        self._store_polling_url(task_id, response)
+        self._task_started(task_id)
+        self._generation_submitted(task_id, model, payload, response)
+
+        # Track usage if requested
+        if track_usage:
+            await self.track_usage_via_api(model, 1)
+
+        # If sync is True, poll for results
+        if config.sync:
+            try:
+                result, polls = await self._wait_for_result(task_id, config, model)
+                return SyncResponse(id=task_id, result=result, polls=polls)
+            except Exception as e:
+                raise BFLError(f"Error getting synchronous result: {str(e)}")
+
+        else:
+            return AsyncResponse(id=task_id, polling_url=response["polling_url"])
+
+    async def submit(
+        self,
+        model: str,
+        inputs: Dict[str, Any],
+        config: Optional[ClientConfig] = None,
+        track_usage: bool = False,
+    ) -> "asyncio.Task[TaskResult]":
+        """
+        Submit a generation and return a task resolved with its final state.
+
+        The returned asyncio Task works with `asyncio.wait()`,
+        `asyncio.as_completed()` and `asyncio.wait_for()`, accepts done
+        callbacks and can be cancelled to stop polling.
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Dictionary containing generation parameters
+            config: Polling behaviour (`sync` is ignored)
+            track_usage: Whether to track usage for licensed models
+
+        Returns:
+            Task resolved with the final TaskResult
+
+        Raises:
+            BFLError: If the submission fails
+        """
+        if config is None:
+            config = ClientConfig()
+        response = await self.generate(
+            model, inputs, config.model_copy(update={"sync": False}), track_usage
+        )
+        return asyncio.ensure_future(self._poll_task(response.id, config, model))
+
+    async def _poll_task(
+        self, task_id: str, config: ClientConfig, model: Optional[str]
+    ) -> TaskResult:
+        try:
+            finished = await self._poll_until_done(task_id, config, model)
+        except (BFLError, asyncio.CancelledError) as e:
+            # The task may still finish on the server, so it stays pending in
+            # the journal and can be resumed
+            self._task_done(task_id)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return TaskResult(id=task_id, status="Error", error=str(e))
+        if finished.status == "Timeout":
+            self._task_done(task_id)
+        return finished
+
+    async def resume(
+        self, config: Optional[ClientConfig] = None
+    ) -> "List[asyncio.Task[TaskResult]]":
+        """
+        Resume polling the tasks left pending in the journal.
+
+        See `BFLClient.resume`.
+
+        Returns:
+            Tasks resolved with the final TaskResult, oldest submission first
+
+        Raises:
+            ValueError: If the client has no journal
+        """
+        if self.journal is None:
+            raise ValueError("resume() requires a client created with a journal")
+        if config is None:
+            config = ClientConfig()
+        tasks = []
+        for record in self.journal.pending():
+            if record.polling_url:
+                self._store_polling_url(
+                    record.task_id, {"polling_url": record.polling_url}
+                )
+            tasks.append(
+                asyncio.ensure_future(
+                    self._poll_task(record.task_id, config, record.model)
+                )
+            )
+        return tasks
+
+    async def generate_with_webhook(
+        self,
+        model: str,
+        inputs: Dict[str, Any],
+        receiver: WebhookReceiver,
+        track_usage: bool = False,
+    ) -> "asyncio.Future[TaskResult]":
+        """
+        Submit a generation whose completion is reported to a webhook receiver.
+
+        See `BFLClient.generate_with_webhook`.
+
+        Returns:
+            Awaitable future resolved with the final TaskResult by the receiver
+
+        Raises:
+            BFLError: If the API request fails
+        """
+        inputs = {**inputs, **receiver.webhook_inputs()}
+        payload = await self._aprepare_generation_payload(model, inputs)
+        response = await self._submit_generation(
+            model, payload, ClientConfig(sync=False), track_usage
+        )
+        future = receiver.expect(response.id)
+        future.add_done_callback(
+            lambda f: self._task_done(
+                response.id, None if f.cancelled() else f.result().status
+            )
+        )
+        return asyncio.wrap_future(future)
+
+    def generate_many(
+        self,
+        model: str,
+        inputs: Iterable[Dict[str, Any]],
+        concurrency: int = 8,
+        config: Optional[ClientConfig] = None,
+        ordered: bool = False,
+        track_usage: bool = False,
+        progress: Optional[ProgressReporter] = None,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Generate images for many inputs with bounded concurrency.
+
+        Async generator counterpart of `BFLClient.generate_many`.
+
+        Examples:
+            >>> async for item in client.generate_many("flux-dev", inputs, 32):
+            ...     print(item.index, item.response or item.error)
+        """
+        results = agenerate_many(
+            self,
+            model,
+            inputs,
+            concurrency=concurrency,
+            config=config,
+            ordered=ordered,
+            track_usage=track_usage,
+        )
+        return progress.atrack(results) if progress is not None else results
+
+    async def track_usage_via_api(self, name: str, n: int = 1) -> None:
+        """
+        Track usage of licensed models via the BFL API for licensing compliance.
+
+        Args:
+            name: The model name to track usage for
+            n: Number of generations to track (default: 1)
+
+        Raises:
+            BFLError: If the API request fails or model is not trackable
+        """
+        endpoint, payload = self._usage_request(name, n)
+
+        try:
+            await self._request("POST", endpoint, json=payload)
+            logger.info("Tracked usage for %s with %d generations", name, n)
+        except BFLError as e:
+            raise BFLError(f"Failed to track usage for {name}: {str(e)}")
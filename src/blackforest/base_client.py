@@ -0,0 +1,673 @@
+"""
+Transport-agnostic building blocks shared by the sync and async BFL clients.
+"""
+
+import base64
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import urljoin
+
+from pydantic import BaseModel
+
+from blackforest.images.cache import EncodedImageCache
+from blackforest.images.control import ControlPreprocessor
+from blackforest.images.encoding import FileImage, encode_file
+from blackforest.images.ingest import (
+    IMAGE_EXTENSIONS,  # noqa: F401 (re-exported)
+    ImageSequence,
+    ImageSource,
+    chunk_sources,
+    folder_sources,
+    stream_value,
+    zip_sources,
+)
+from blackforest.images.preprocess import ImagePreprocessor
+from blackforest.journal import TaskJournal, input_hash
+from blackforest.metrics import Instrumentation
+from blackforest.polling.strategies import PollingStrategy, parse_retry_after
+from blackforest.polling.ttl_map import TTLMap, TTLMapStats
+from blackforest.resources.mapping.model_input_registry import MODEL_INPUT_REGISTRY
+from blackforest.result_cache import ResultCache
+from blackforest.transport.rate_limit import RateLimiter
+from blackforest.transport.retry import RetryPolicy, RetryStats
+from blackforest.types.general.ingestion_config import IngestionConfig
+from blackforest.types.inputs.generic import ImageInput
+from blackforest.types.responses.responses import ImageProcessingResponse
+from blackforest.validators import validator_for
+
+# Models whose usage can be reported, mapped to their licensing slug
+TRACKABLE_MODEL_SLUGS = {
+    "flux-dev": "flux-1-dev",
+    "flux-dev-kontext": "flux-1-kontext-dev",
+    "flux-dev-fill": "flux-tools",
+    "flux-dev-depth": "flux-tools",
+    "flux-dev-canny": "flux-tools",
+    "flux-dev-canny-lora": "flux-tools",
+    "flux-dev-depth-lora": "flux-tools",
+    "flux-dev-redux": "flux-tools",
+}
+
+# Seconds a polling URL is kept after submission
+POLLING_URL_TTL = 1800.0
+
+# Task states after which polling stops
+TERMINAL_STATUSES = ("Ready", "completed", "failed")
+
+
+class BFLError(Exception):
+    """Base exception for BFL API errors."""
+
+    pass
+
+
+class BaseBFLClient:
+    """
+    State and request-building logic shared by BFLClient and AsyncBFLClient.
+
+    Subclasses provide the actual I/O (`_request`) and the public methods.
+    """
+
+    # Model to input type mapping registry
+    model_input_registry = MODEL_INPUT_REGISTRY
+    api_version = "v1"
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.bfl.ai",
+        timeout: int = 30,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        stream_uploads: bool = True,
+        image_cache: Optional[EncodedImageCache] = None,
+        polling_url_ttl: float = POLLING_URL_TTL,
+        max_polling_urls: Optional[int] = None,
+        journal: Optional[TaskJournal] = None,
+        result_cache: Optional[ResultCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        control_preprocessor: Optional[ControlPreprocessor] = None,
+        trusted_inputs: bool = False,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.stream_uploads = stream_uploads
+        self.image_cache = image_cache
+        self.journal = journal
+        self.result_cache = result_cache
+        self.preprocessor = preprocessor
+        self.control_preprocessor = control_preprocessor
+        self.trusted_inputs = trusted_inputs
+        self.instrumentation = (
+            instrumentation if instrumentation is not None else Instrumentation()
+        )
+        # Map to store task_id -> (polling_url, timestamp)
+        self._task_polling_urls: TTLMap[str, Tuple[str, float]] = TTLMap(
+            polling_url_ttl, max_polling_urls, on_remove=self._polling_url_removed
+        )
+        # task_id -> (model, monotonic submission time), for task metrics
+        self._submitted: TTLMap[str, Tuple[str, float]] = TTLMap(
+            polling_url_ttl, max_polling_urls
+        )
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """Counters of requests, retries and abandoned retries."""
+        return self.retry_policy.stats
+
+    def _default_headers(self) -> Dict[str, str]:
+        """Headers sent with every API request."""
+        return {
+            "X-Key": self.api_key,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+
+    def _build_url(self, endpoint: str) -> str:
+        """Resolve an endpoint (relative path or full URL) to a full URL."""
+        # If endpoint is already a full URL, use it directly
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+        return urljoin(self.base_url, endpoint)
+
+    @staticmethod
+    def _error_message(error_data: Any, text: str, default: str) -> str:
+        """Extract a human readable error message from a failed response."""
+        if isinstance(error_data, dict) and error_data.get("message"):
+            return str(error_data["message"])
+        return text or default
+
+    @property
+    def polling_url_stats(self) -> TTLMapStats:
+        """Hits, misses, expiries and evictions of stored polling URLs."""
+        return self._task_polling_urls.stats
+
+    def _cleanup_expired_polling_urls(self) -> None:
+        """
+        Remove polling URL entries older than the polling URL TTL.
+        """
+        self._task_polling_urls.expire()
+
+    def _polling_url_removed(self, task_id: str, entry: Tuple[str, float]) -> None:
+        # Expired or evicted tasks are no longer tracked, so their in-flight
+        # slot is released
+        self._task_done(task_id)
+
+    def clear_polling_urls(self) -> None:
+        """
+        Manually clear all stored polling URLs.
+        """
+        for task_id, _ in self._task_polling_urls.clear():
+            self._task_done(task_id)
+
+    def _rate_limit_delay(self, method: str, url: str) -> float:
+        """Seconds to wait before sending a request, per the rate limiter."""
+        if self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.reserve(self.rate_limiter.endpoint_class(method, url))
+
+    def _record_status(self, method: str, url: str, status: int) -> None:
+        """Let the rate limiter adapt to a response status."""
+        if self.rate_limiter is not None:
+            endpoint_class = self.rate_limiter.endpoint_class(method, url)
+            self.rate_limiter.on_response(endpoint_class, status)
+
+    def _observe_request(
+        self,
+        method: str,
+        url: str,
+        status: Optional[int],
+        elapsed: float,
+        body: Any = None,
+    ) -> None:
+        """Emit the metrics of one HTTP attempt."""
+        endpoint = RateLimiter.endpoint_class(method, url)
+        self.instrumentation.emit(
+            "http.request.duration",
+            elapsed,
+            method=method.upper(),
+            endpoint=endpoint,
+            status=status if status is not None else "error",
+        )
+        if body:
+            try:
+                size = len(body)
+            except TypeError:
+                # A body of unknown length, eg a generator
+                return
+            self.instrumentation.emit("http.upload.bytes", size, endpoint=endpoint)
+
+    def _observe_retry(
+        self,
+        method: str,
+        url: str,
+        status: Optional[int] = None,
+        connect_error: bool = False,
+    ) -> None:
+        """Emit a retry of a failed HTTP attempt."""
+        self.instrumentation.emit(
+            "http.retry",
+            method=method.upper(),
+            endpoint=RateLimiter.endpoint_class(method, url),
+            reason=self.retry_policy.retry_reason(method, status, connect_error),
+        )
+
+    def _acquire_task_slot(self) -> None:
+        """
+        Wait for an in-flight slot before submitting a task.
+
+        Raises:
+            BFLError: If no slot was freed within the limiter's slot timeout
+        """
+        if self.rate_limiter is not None and not self.rate_limiter.acquire_task_slot():
+            raise self._slot_timeout_error()
+
+    def _slot_timeout_error(self) -> BFLError:
+        return BFLError(
+            f"No in-flight task slot was freed within "
+            f"{self.rate_limiter.slot_timeout} seconds"
+        )
+
+    def _release_task_slot(self) -> None:
+        """Release an in-flight slot whose submission did not create a task."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.release_task_slot()
+
+    def _task_started(self, task_id: Optional[str]) -> None:
+        """Bind the in-flight slot of a submission to the created task."""
+        if self.rate_limiter is None:
+            return
+        if task_id:
+            self.rate_limiter.task_started(task_id)
+        else:
+            self.rate_limiter.release_task_slot()
+
+    def _task_done(
+        self, task_id: str, status: Optional[str] = None, polls: Optional[int] = None
+    ) -> None:
+        """
+        Release the in-flight slot of a task that is no longer tracked.
+
+        `status` is the task's final status, if known; it is journaled and,
+        with the number of polls it took, reported to the instrumentation.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.task_finished(task_id)
+        if status is None:
+            return
+        if self.journal is not None:
+            self.journal.finished(task_id, status)
+        submitted = self._submitted.pop(task_id)
+        if submitted is not None:
+            model, submitted_at = submitted
+            self.instrumentation.emit(
+                "task.ready.duration",
+                time.monotonic() - submitted_at,
+                model=model,
+                status=status,
+            )
+            if polls is not None:
+                self.instrumentation.emit(
+                    "task.polls", polls, model=model, status=status
+                )
+
+    def _result_cache_key(
+        self, model: str, payload: Dict[str, Any], sync: bool
+    ) -> Optional[str]:
+        """Key of a generation request in the result cache, if cacheable."""
+        if self.result_cache is None:
+            return None
+        return self.result_cache.key(model, payload, sync)
+
+    def _generation_submitted(
+        self, task_id: str, model: str, payload: Dict[str, Any], response: Dict
+    ) -> None:
+        """Record a submitted generation for the journal and task metrics."""
+        self._submitted[task_id] = (model, time.monotonic())
+        if self.journal is not None:
+            self.journal.submitted(
+                task_id,
+                model=model,
+                polling_url=response.get("polling_url"),
+                input_hash=input_hash(model, payload),
+            )
+
+    def _store_polling_url(self, task_id: Optional[str], response: Dict[str, Any]):
+        """Remember the polling URL returned when a task was submitted."""
+        if task_id and "polling_url" in response:
+            # Expired entries are dropped as the new one is added
+            self._task_polling_urls[task_id] = (response["polling_url"], time.time())
+
+    def _get_polling_endpoint(self, task_id: str) -> str:
+        """
+        Get the appropriate polling endpoint for a task.
+
+        Args:
+            task_id: The task ID to get the endpoint for
+
+        Returns:
+            The endpoint (relative path or full URL) to use for polling
+        """
+        entry = self._task_polling_urls.get(task_id)
+        if entry is not None:
+            polling_url, _ = entry  # Extract URL from tuple
+            # Return the full polling URL as-is since _request() now handles full URLs
+            return polling_url
+        else:
+            # Fallback to constructed URL
+            return f"/v1/get_result?id={task_id}"
+
+    def _encode_image(self, image_path: str) -> str:
+        """Encode image file to base64 string."""
+        if self.image_cache is not None:
+            return self.image_cache.encode_file(image_path)
+        return encode_file(image_path)
+
+    def _image_value(self, image_path: str) -> Union[str, FileImage]:
+        """
+        Payload value for a local image file.
+
+        With an image cache the cached encoding is used, so files reused
+        across requests are read and encoded once. Otherwise, with
+        `stream_uploads`, the file is only referenced here and encoded in
+        chunks while the request body is sent.
+        """
+        if self.stream_uploads and self.image_cache is None:
+            return FileImage(image_path)
+        return self._encode_image(image_path)
+
+    def _is_file_path(self, value: str) -> bool:
+        """Check if a string is a file path (not base64 or URL)."""
+        if value.startswith(("http://", "https://")):
+            return False
+        # Check if it looks like base64 (no path separators, mostly alphanumeric)
+        if "/" not in value and "\\" not in value and len(value) > 100:
+            try:
+                base64.b64decode(value)
+                return False  # It's valid base64
+            except Exception:
+                pass
+        # Check if file exists
+        return os.path.exists(value)
+
+    def _process_kontext_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Process flux-kontext-pro inputs to automatically encode image paths."""
+        processed_inputs = inputs.copy()
+
+        # Image fields that might need encoding
+        image_fields = [
+            "input_image",
+            "input_image_2",
+            "input_image_3",
+            "input_image_4",
+        ]
+
+        for field in image_fields:
+            if field in processed_inputs and processed_inputs[field]:
+                value = processed_inputs[field]
+                if isinstance(value, str) and self._is_file_path(value):
+                    try:
+                        processed_inputs[field] = self._image_value(value)
+                    except Exception as e:
+                        raise BFLError(
+                            f"Error encoding image file '{value}' "
+                            f"for field '{field}': {str(e)}"
+                        )
+
+        return processed_inputs
+
+    def _folder_sources(self, folder_path: str) -> List[ImageSource]:
+        folder = Path(folder_path)
+        if not folder.exists() or not folder.is_dir():
+            raise BFLError(f"Invalid folder path: {folder_path}")
+        return folder_sources(folder)
+
+    def _zip_sources(self, zip_path: str) -> List[ImageSource]:
+        if not os.path.exists(zip_path):
+            raise BFLError(f"Invalid zip file path: {zip_path}")
+        try:
+            return zip_sources(zip_path)
+        except zipfile.BadZipFile as e:
+            raise BFLError(f"Invalid zip file {zip_path}: {str(e)}")
+
+    def _process_folder(self, folder_path: str) -> List[Union[str, FileImage]]:
+        """Process all images in a folder and return list of base64 encoded images."""
+        encoded_images = []
+        for source in self._folder_sources(folder_path):
+            try:
+                encoded_images.append(self._image_value(source.path))
+            except Exception as e:
+                raise BFLError(f"Error processing image {source.path}: {str(e)}")
+        return encoded_images
+
+    def _process_zip(self, zip_path: str) -> List[Union[str, FileImage]]:
+        """
+        Process all images in a zip file and return list of base64 encoded images.
+
+        With `stream_uploads` and no image cache, members are only referenced
+        here and decompressed and encoded while the request body is sent.
+        """
+        sources = self._zip_sources(zip_path)
+        if self.stream_uploads and self.image_cache is None:
+            return [stream_value(source) for source in sources]
+
+        encoded_images = []
+        for source in sources:
+            try:
+                if self.image_cache is not None:
+                    encoded = self.image_cache.encode_zip_member(zip_path, source.info)
+                else:
+                    encoded = source.encode().decode("ascii")
+                encoded_images.append(encoded)
+            except Exception as e:
+                raise BFLError(
+                    f"Error processing image {source.name} from zip: {str(e)}"
+                )
+
+        return encoded_images
+
+    def _image_sources(self, input_data: ImageInput) -> Optional[List[ImageSource]]:
+        """The images of a folder or zip input; None for single images."""
+        if input_data.image_path or not (input_data.folder_path or input_data.zip_path):
+            return None
+        if input_data.folder_path:
+            return self._folder_sources(input_data.folder_path)
+        return self._zip_sources(input_data.zip_path)
+
+    def _image_sequence(
+        self, sources: List[ImageSource], ingestion: IngestionConfig
+    ) -> List[ImageSequence]:
+        """Payload value streaming `sources` with parallel reads."""
+        if not sources:
+            return []
+        return [
+            ImageSequence(
+                sources,
+                workers=ingestion.workers,
+                byte_budget=ingestion.byte_budget,
+                image_cache=self.image_cache,
+            )
+        ]
+
+    def _image_chunk_payloads(
+        self,
+        input_data: Union[str, ImageInput],
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Request payloads for the images of `input_data`, split according to
+        the chunk limits of `ingestion`. Single images give one payload.
+        """
+        if ingestion is None:
+            ingestion = IngestionConfig()
+        input_data = self._image_input(input_data)
+        sources = self._image_sources(input_data)
+        if sources is None:
+            yield self._prepare_image_payload(input_data, ingestion, **kwargs)
+            return
+        chunks = chunk_sources(
+            sources, ingestion.max_request_bytes, ingestion.max_images_per_request
+        )
+        for chunk in chunks:
+            yield {"image": self._image_sequence(chunk, ingestion), **kwargs}
+
+    def _get_input_cls(self, model: str) -> Type[BaseModel]:
+        """Look up the input model class for a model name."""
+        input_cls = self.model_input_registry.get(model)
+        if not input_cls:
+            raise BFLError(
+                f"Model {model} not supported. "
+                f"Supported models: {list(self.model_input_registry.keys())}"
+            )
+        return input_cls
+
+    def _prepares_blocking(self, model: str, inputs: Dict[str, Any]) -> bool:
+        """
+        Whether preparing the payload may read files or process images, so
+        the async client must not do it on the event loop.
+        """
+        if model == "flux-kontext-pro":
+            # Kontext inputs may reference image files that need encoding
+            return True
+        if self.preprocessor is not None and model in self.preprocessor.models:
+            return True
+        control = self.control_preprocessor
+        if control is not None and control.handles(model):
+            return True
+        return any(isinstance(value, FileImage) for value in inputs.values())
+
+    def _prepare_generation_payload(
+        self, model: str, inputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Validate generation inputs for a model and build the JSON payload."""
+        with self.instrumentation.timer("generation.validation.duration", model=model):
+            return self._validate_generation_inputs(model, inputs)
+
+    def _validate_generation_inputs(
+        self, model: str, inputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Get the appropriate input type from the registry
+        input_cls = self._get_input_cls(model)
+
+        # Process inputs for automatic image encoding if using flux-kontext-pro
+        processed_inputs = inputs
+        if model == "flux-kontext-pro":
+            processed_inputs = self._process_kontext_inputs(inputs)
+
+        # Input images are downscaled and re-encoded before validation
+        if self.preprocessor is not None:
+            with self.instrumentation.timer("image.preprocess.duration", model=model):
+                processed_inputs = self.preprocessor.process(model, processed_inputs)
+
+        # Control images are turned into edge or depth maps locally
+        if self.control_preprocessor is not None:
+            with self.instrumentation.timer("image.control.duration", model=model):
+                processed_inputs = self.control_preprocessor.process(
+                    model, processed_inputs
+                )
+
+        # Streamed images are validated by path and put back after dumping
+        streamed = {
+            k: v for k, v in processed_inputs.items() if isinstance(v, FileImage)
+        }
+        if streamed:
+            processed_inputs = {
+                **processed_inputs,
+                **{k: v.path for k, v in streamed.items()},
+            }
+
+        validator = validator_for(input_cls)
+        if self.trusted_inputs:
+            payload = validator.trusted(processed_inputs)
+        else:
+            # JSON mode so that URLs (eg webhook_url) are serialized as strings
+            payload = validator.validate(processed_inputs)
+        payload.update(streamed)
+        return payload
+
+    @staticmethod
+    def _image_input(input_data: Union[str, ImageInput]) -> ImageInput:
+        if isinstance(input_data, str):
+            # If input_data is a string, assume it's a path to an image
+            input_data = ImageInput(image_path=input_data)
+
+        if not isinstance(input_data, ImageInput):
+            raise BFLError("input_data must be either a string or an ImageInput object")
+        return input_data
+
+    def _prepare_image_payload(
+        self,
+        input_data: Union[str, ImageInput],
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Encode the images referenced by `input_data` into a request payload.
+
+        With `ingestion`, the images of folders and zip archives are read and
+        encoded in parallel while the request is sent.
+        """
+        input_data = self._image_input(input_data)
+
+        if ingestion is not None:
+            sources = self._image_sources(input_data)
+            if sources is not None:
+                return {"image": self._image_sequence(sources, ingestion), **kwargs}
+
+        # Process the input based on the provided type
+        if input_data.image_path:
+            image_data = self._image_value(input_data.image_path)
+        elif input_data.folder_path:
+            image_data = self._process_folder(input_data.folder_path)
+        elif input_data.zip_path:
+            image_data = self._process_zip(input_data.zip_path)
+        elif input_data.image_data:
+            image_data = input_data.image_data
+        else:
+            raise BFLError("No valid image input provided")
+
+        return {"image": image_data, **kwargs}
+
+    @staticmethod
+    def _parse_task_status(
+        task_id: str, response: Dict[str, Any]
+    ) -> ImageProcessingResponse:
+        """Convert a polling response into an ImageProcessingResponse."""
+        return ImageProcessingResponse(
+            task_id=task_id,
+            status=response.get("status", "unknown"),
+            result=response.get("result"),
+            error=response.get("error"),
+        )
+
+    def _task_result(
+        self, task_id: str, response: Dict[str, Any], polls: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Like `_completed_result`, also releasing the slot of finished tasks."""
+        if response.get("status") in TERMINAL_STATUSES:
+            self._task_done(task_id, response["status"], polls)
+        return self._completed_result(response)
+
+    @staticmethod
+    def _completed_result(response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Inspect a polling response.
+
+        Returns:
+            The task result once the task is complete, None while it is pending
+
+        Raises:
+            BFLError: If the task failed
+        """
+        if response.get("status") in TERMINAL_STATUSES:
+            if response.get("status") == "failed":
+                error_msg = response.get("error", "Unknown error")
+                raise BFLError(f"Task failed: {error_msg}")
+            return response.get("result") or {}
+        return None
+
+    @staticmethod
+    def _next_poll_delay(
+        strategy: PollingStrategy,
+        attempt: int,
+        previous: float,
+        model: Optional[str],
+        headers: Optional[Mapping[str, str]],
+    ) -> float:
+        """Delay before the next poll, honoring any Retry-After from the server."""
+        delay = strategy.next_delay(attempt, previous, model)
+        retry_after = parse_retry_after((headers or {}).get("retry-after"))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def _usage_request(name: str, n: int) -> Tuple[str, Dict[str, Any]]:
+        """Build the endpoint and payload used to report usage of a model."""
+        if name not in TRACKABLE_MODEL_SLUGS:
+            raise BFLError(
+                f"Cannot track usage for model '{name}'. "
+                "Model not trackable or name incorrect. "
+                f"Trackable models: {list(TRACKABLE_MODEL_SLUGS.keys())}"
+            )
+
+        model_slug = TRACKABLE_MODEL_SLUGS[name]
+        endpoint = f"/v1/licenses/models/{model_slug}/usage"
+        return endpoint, {"number_of_generations": n}
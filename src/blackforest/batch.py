@@ -0,0 +1,201 @@
+"""
+Batch generation with bounded concurrency.
+"""
+
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
+
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.responses.responses import BatchResult
+
+if TYPE_CHECKING:
+    from blackforest.async_client import AsyncBFLClient
+    from blackforest.client import BFLClient
+
+
+def _validate(
+    client: Union["BFLClient", "AsyncBFLClient"],
+    model: str,
+    index: int,
+    inputs: Dict[str, Any],
+) -> Union[Dict[str, Any], BatchResult]:
+    """Validate one item, returning its payload or an error result."""
+    try:
+        return client._prepare_generation_payload(model, inputs)
+    except Exception as e:
+        return BatchResult(index=index, error=f"Invalid inputs: {e}")
+
+
+class _Reorderer:
+    """
+    Releases results in input order, holding back those that finish early.
+    With `ordered=False` results are released immediately.
+    """
+
+    def __init__(self, ordered: bool):
+        self.ordered = ordered
+        self.next_index = 0
+        self.held: Dict[int, BatchResult] = {}
+
+    def __len__(self) -> int:
+        return len(self.held)
+
+    def push(self, result: BatchResult) -> Iterator[BatchResult]:
+        if not self.ordered:
+            yield result
+            return
+        self.held[result.index] = result
+        while self.next_index in self.held:
+            yield self.held.pop(self.next_index)
+            self.next_index += 1
+
+
+def generate_many(
+    client: "BFLClient",
+    model: str,
+    inputs: Iterable[Dict[str, Any]],
+    concurrency: int = 8,
+    config: Optional[ClientConfig] = None,
+    ordered: bool = False,
+    track_usage: bool = False,
+) -> Iterator[BatchResult]:
+    """
+    Generate many images with at most `concurrency` requests in flight.
+
+    See `BFLClient.generate_many`.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if config is None:
+        config = ClientConfig()
+
+    items = enumerate(inputs)
+    reorderer = _Reorderer(ordered)
+    in_flight: Dict[Future, int] = {}
+    exhausted = False
+
+    executor = ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="bfl-batch"
+    )
+    try:
+        while True:
+            # Results held back for ordering count against the window so that
+            # memory stays bounded behind a slow item.
+            while (
+                not exhausted
+                and len(in_flight) < concurrency
+                and len(in_flight) + len(reorderer) < 2 * concurrency
+            ):
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                payload = _validate(client, model, index, item)
+                if isinstance(payload, BatchResult):
+                    yield from reorderer.push(payload)
+                    continue
+                future = executor.submit(
+                    client._generate_payload, model, payload, config, track_usage
+                )
+                in_flight[future] = index
+
+            if not in_flight:
+                if exhausted:
+                    return
+                continue
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    result = BatchResult(index=index, response=future.result())
+                except Exception as e:
+                    result = BatchResult(index=index, error=str(e))
+                yield from reorderer.push(result)
+    finally:
+        # A consumer that stops early does not wait for the requests still
+        # running; queued ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def agenerate_many(
+    client: "AsyncBFLClient",
+    model: str,
+    inputs: Iterable[Dict[str, Any]],
+    concurrency: int = 8,
+    config: Optional[ClientConfig] = None,
+    ordered: bool = False,
+    track_usage: bool = False,
+) -> AsyncIterator[BatchResult]:
+    """
+    Asyncio counterpart of `generate_many`.
+
+    See `AsyncBFLClient.generate_many`.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if config is None:
+        config = ClientConfig()
+
+    items = enumerate(inputs)
+    reorderer = _Reorderer(ordered)
+    in_flight: Dict[asyncio.Task, int] = {}
+    exhausted = False
+
+    try:
+        while True:
+            while (
+                not exhausted
+                and len(in_flight) < concurrency
+                and len(in_flight) + len(reorderer) < 2 * concurrency
+            ):
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if client._prepares_blocking(model, item):
+                    payload = await asyncio.to_thread(
+                        _validate, client, model, index, item
+                    )
+                else:
+                    payload = _validate(client, model, index, item)
+                if isinstance(payload, BatchResult):
+                    for result in reorderer.push(payload):
+                        yield result
+                    continue
+                task = asyncio.ensure_future(
+                    client._generate_payload(model, payload, config, track_usage)
+                )
+                in_flight[task] = index
+
+            if not in_flight:
+                if exhausted:
+                    return
+                continue
+
+            done, _ = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                index = in_flight.pop(task)
+                try:
+                    result = BatchResult(index=index, response=task.result())
+                except Exception as e:
+                    result = BatchResult(index=index, error=str(e))
+                for ready in reorderer.push(result):
+                    yield ready
+    finally:
+        for task in in_flight:
+            task.cancel()
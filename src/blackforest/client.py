@@ -2,46 +2,99 @@
 Main client implementation for the BFL API.
 """
 
-import base64
-import os
+import logging
+import threading
 import time
-import zipfile
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
-from urllib.parse import urljoin
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import requests
-
-from blackforest.resources.mapping.model_input_registry import MODEL_INPUT_REGISTRY
+import urllib3
+from pydantic_core import to_json
+
+from blackforest.base_client import (
+    POLLING_URL_TTL,
+    TERMINAL_STATUSES,
+    BaseBFLClient,
+    BFLError,
+)
+from blackforest.batch import generate_many
+from blackforest.download import Destination, Downloader
+from blackforest.images.cache import EncodedImageCache
+from blackforest.images.control import ControlPreprocessor
+from blackforest.images.encoding import StreamingJSONBody
+from blackforest.images.preprocess import ImagePreprocessor
+from blackforest.journal import TaskJournal
+from blackforest.metrics import Instrumentation
+from blackforest.polling.handles import BackgroundPoller, TaskHandle
+from blackforest.progress import ProgressReporter
+from blackforest.result_cache import ResultCache
+from blackforest.transport.rate_limit import RateLimiter
+from blackforest.transport.retry import RetryPolicy
+from blackforest.transport.session import ConnectionStats, build_session
+from blackforest.types.base.output_format import OutputFormat
 from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.general.connection_pool_config import ConnectionPoolConfig
+from blackforest.types.general.ingestion_config import IngestionConfig
 from blackforest.types.inputs.generic import ImageInput
 from blackforest.types.responses.responses import (
     AsyncResponse,
+    BatchResult,
+    DownloadResult,
     ImageProcessingResponse,
+    PipelineResult,
     SyncResponse,
+    TaskResult,
 )
+from blackforest.webhooks import WebhookReceiver
 
+logger = logging.getLogger(__name__)
 
-class BFLError(Exception):
-    """Base exception for BFL API errors."""
 
-    pass
+def _is_connect_error(exc: requests.exceptions.RequestException) -> bool:
+    """Whether a request failed before a connection to the server was made."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = exc.args[0] if exc.args else None
+        reason = getattr(reason, "reason", reason)
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
 
 
-class BFLClient:
+class BFLClient(BaseBFLClient):
     """
     Main client class for interacting with the Black Forest Labs API.
     """
 
-    # Model to input type mapping registry
-    model_input_registry = MODEL_INPUT_REGISTRY
-    api_version = "v1"
-
     def __init__(
         self,
         api_key: str,
         base_url: str = "https://api.bfl.ai",
         timeout: int = 30,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        pool_config: Optional[ConnectionPoolConfig] = None,
+        stream_uploads: bool = True,
+        image_cache: Optional[EncodedImageCache] = None,
+        polling_url_ttl: float = POLLING_URL_TTL,
+        max_polling_urls: Optional[int] = None,
+        journal: Optional[TaskJournal] = None,
+        result_cache: Optional[ResultCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        control_preprocessor: Optional[ControlPreprocessor] = None,
+        trusted_inputs: bool = False,
     ):
         """
         Initialize the BFL client.
@@ -50,73 +103,99 @@ class BFLClient:
             api_key: Your BFL API key
             base_url: Base URL for the API (optional)
             timeout: Request timeout in seconds (optional)
+            retry_policy: Policy for retrying transient failures (optional).
+                Use RetryPolicy.disabled() to turn retries off.
+            rate_limiter: Client-side rate limiter, may be shared between
+                clients and threads (optional)
+            pool_config: Connection pooling and keep-alive settings (optional)
+            stream_uploads: Base64-encode local image files in chunks while
+                the request is sent instead of building the whole encoded
+                payload in memory first (default: True)
+            image_cache: Cache of encoded input images, may be shared between
+                clients (optional). Takes precedence over stream_uploads.
+            polling_url_ttl: Seconds the polling URL of a submitted task is
+                kept (default: 30 minutes)
+            max_polling_urls: Maximum number of polling URLs kept; the oldest
+                are dropped first (optional)
+            journal: Durable record of submitted tasks, for resuming them
+                after a restart with `resume()` (optional)
+            result_cache: Cache reusing the response of identical seeded
+                requests instead of submitting them again (optional)
+            instrumentation: Receiver of request, task and transfer metrics.
+                Defaults to logging them at DEBUG level.
+            preprocessor: Downscales and re-encodes input images of the expand,
+                fill, canny and depth models before upload (optional)
+            control_preprocessor: Computes the edge or depth maps of canny
+                and depth requests locally, sending them as
+                `preprocessed_image` (optional)
+            trusted_inputs: Build generation payloads without validating the
+                inputs, for callers that guarantee they are valid. Invalid
+                inputs are then only rejected by the API. (default: False)
         """
-        self.api_key = api_key
-        self.base_url = base_url.rstrip("/")
-        self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "X-Key": api_key,
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            }
+        super().__init__(
+            api_key,
+            base_url=base_url,
+            timeout=timeout,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            stream_uploads=stream_uploads,
+            image_cache=image_cache,
+            polling_url_ttl=polling_url_ttl,
+            max_polling_urls=max_polling_urls,
+            journal=journal,
+            result_cache=result_cache,
+            instrumentation=instrumentation,
+            preprocessor=preprocessor,
+            control_preprocessor=control_preprocessor,
+            trusted_inputs=trusted_inputs,
         )
-        # Map to store task_id -> (polling_url, timestamp)
-        self._task_polling_urls = {}
-
-    def _cleanup_expired_polling_urls(self) -> None:
-        """
-        Remove polling URL entries that are older than 30 minutes.
-        """
-        current_time = time.time()
-        expired_keys = []
+        self.connection_stats = ConnectionStats()
+        self.pool_config = pool_config
+        self.session = build_session(pool_config, self.connection_stats)
+        self._downloader: Optional[Downloader] = None
+        self._background_pollers: Dict[tuple, BackgroundPoller] = {}
+        self._background_lock = threading.Lock()
+        self.session.headers.update(self._default_headers())
 
-        for task_id, (polling_url, timestamp) in self._task_polling_urls.items():
-            # Remove entries older than 30 minutes (1800 seconds)
-            if current_time - timestamp > 1800:
-                expired_keys.append(task_id)
-
-        for key in expired_keys:
-            del self._task_polling_urls[key]
-
-    def clear_polling_urls(self) -> None:
-        """
-        Manually clear all stored polling URLs.
-        """
-        self._task_polling_urls.clear()
-
-    def _get_polling_endpoint(self, task_id: str) -> str:
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
-        Get the appropriate polling endpoint for a task.
+        Make a request to the API.
 
         Args:
-            task_id: The task ID to get the endpoint for
+            method: HTTP method
+            endpoint: API endpoint (can be a relative path or full URL)
+            params: URL parameters
+            data: Form data
+            json: JSON data
 
         Returns:
-            The endpoint (relative path or full URL) to use for polling
-        """
-        # Clean up expired entries
-        self._cleanup_expired_polling_urls()
+            API response as dictionary
 
-        if task_id in self._task_polling_urls:
-            polling_url, _ = self._task_polling_urls[task_id]  # Extract URL from tuple
-            # Return the full polling URL as-is since _request() now handles full URLs
-            return polling_url
-        else:
-            # Fallback to constructed URL
-            return f"/v1/get_result?id={task_id}"
+        Raises:
+            BFLError: If the API request fails
+        """
+        response_data, _ = self._request_with_headers(
+            method, endpoint, params=params, data=data, json=json
+        )
+        return response_data
 
-    def _request(
+    def _request_with_headers(
         self,
         method: str,
         endpoint: str,
         params: Optional[Dict[str, Any]] = None,
         data: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
+    ) -> Tuple[Dict[str, Any], Mapping[str, str]]:
         """
-        Make a request to the API.
+        Make a request to the API and also return the response headers.
 
         Args:
             method: HTTP method
@@ -126,128 +205,84 @@ class BFLClient:
             json: JSON data
 
         Returns:
-            API response as dictionary
+            Tuple of the API response as dictionary and the response headers
 
         Raises:
             BFLError: If the API request fails
         """
-        # If endpoint is already a full URL, use it directly
-        if endpoint.startswith(("http://", "https://")):
-            url = endpoint
-        else:
-            url = urljoin(self.base_url, endpoint)
-
-        try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                data=data,
-                json=json,
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            if response is not None:
-                try:
-                    error_data = response.json()
-                    error_message = error_data.get("message", str(e))
-                except ValueError:
-                    error_message = response.text or str(e)
-            else:
-                error_message = str(e)
-
-            raise BFLError(f"API request failed: {error_message}") from e
-
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image file to base64 string."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
-
-    def _is_file_path(self, value: str) -> bool:
-        """Check if a string is a file path (not base64 or URL)."""
-        if value.startswith(("http://", "https://")):
-            return False
-        # Check if it looks like base64 (no path separators, mostly alphanumeric with +/=)
-        if "/" not in value and "\\" not in value and len(value) > 100:
+        url = self._build_url(endpoint)
+        attempt = 0
+
+        # Payloads referencing image files are encoded while being sent;
+        # others are serialized by pydantic-core, several times faster than
+        # the json module. The session sends the JSON content type.
+        if json is not None:
+            body = StreamingJSONBody.wrap(json)
+            data = body if body is not None else to_json(json)
+            json = None
+
+        while True:
+            delay = self._rate_limit_delay(method, url)
+            if delay:
+                time.sleep(delay)
+            self.retry_policy.record_request()
+            response = None
+            start = time.perf_counter()
             try:
-                base64.b64decode(value)
-                return False  # It's valid base64
-            except Exception:
-                pass
-        # Check if file exists
-        return os.path.exists(value)
-
-    def _process_kontext_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Process flux-kontext-pro inputs to automatically encode image paths."""
-        processed_inputs = inputs.copy()
-
-        # Image fields that might need encoding
-        image_fields = [
-            "input_image",
-            "input_image_2",
-            "input_image_3",
-            "input_image_4",
-        ]
-
-        for field in image_fields:
-            if field in processed_inputs and processed_inputs[field]:
-                value = processed_inputs[field]
-                if isinstance(value, str) and self._is_file_path(value):
-                    try:
-                        processed_inputs[field] = self._encode_image(value)
-                    except Exception as e:
-                        raise BFLError(
-                            f"Error encoding image file '{value}' for field '{field}': {str(e)}"
-                        )
-
-        return processed_inputs
-
-    def _process_folder(self, folder_path: str) -> List[str]:
-        """Process all images in a folder and return list of base64 encoded images."""
-        folder = Path(folder_path)
-        if not folder.exists() or not folder.is_dir():
-            raise BFLError(f"Invalid folder path: {folder_path}")
-
-        image_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
-        encoded_images = []
-
-        for file_path in folder.glob("*"):
-            if file_path.suffix.lower() in image_extensions:
-                try:
-                    encoded_images.append(self._encode_image(str(file_path)))
-                except Exception as e:
-                    raise BFLError(f"Error processing image {file_path}: {str(e)}")
-
-        return encoded_images
-
-    def _process_zip(self, zip_path: str) -> List[str]:
-        """Process all images in a zip file and return list of base64 encoded images."""
-        if not os.path.exists(zip_path):
-            raise BFLError(f"Invalid zip file path: {zip_path}")
-
-        image_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
-        encoded_images = []
-
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            for file_name in zip_ref.namelist():
-                if Path(file_name).suffix.lower() in image_extensions:
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    data=data,
+                    json=json,
+                    timeout=self.timeout,
+                )
+                self._record_status(method, url, response.status_code)
+                self._observe_request(
+                    method,
+                    url,
+                    response.status_code,
+                    time.perf_counter() - start,
+                    response.request.body,
+                )
+                response.raise_for_status()
+                return response.json(), response.headers
+            except requests.exceptions.RequestException as e:
+                if response is None:
+                    self._observe_request(
+                        method, url, None, time.perf_counter() - start
+                    )
+                attempt += 1
+                status = response.status_code if response is not None else None
+                delay = self.retry_policy.next_delay(
+                    method,
+                    attempt,
+                    status=status,
+                    connect_error=_is_connect_error(e),
+                    headers=response.headers if response is not None else None,
+                )
+                if delay is not None:
+                    self._observe_retry(method, url, status, _is_connect_error(e))
+                    time.sleep(delay)
+                    continue
+
+                if response is not None:
                     try:
-                        with zip_ref.open(file_name) as image_file:
-                            encoded_images.append(
-                                base64.b64encode(image_file.read()).decode("utf-8")
-                            )
-                    except Exception as e:
-                        raise BFLError(
-                            f"Error processing image {file_name} \
-                                        from zip: {str(e)}"
-                        )
-
-        return encoded_images
+                        error_data = response.json()
+                        error_message = error_data.get("message", str(e))
+                    except ValueError:
+                        error_message = response.text or str(e)
+                else:
+                    error_message = str(e)
+
+                raise BFLError(f"API request failed: {error_message}") from e
 
     def process_image(
-        self, input_data: Union[str, ImageInput], endpoint: str = "/v1/image", **kwargs
+        self,
+        input_data: Union[str, ImageInput],
+        endpoint: str = "/v1/image",
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
     ) -> ImageProcessingResponse:
         """
         Process an image or multiple images using the specified endpoint.
@@ -255,6 +290,9 @@ class BFLClient:
         Args:
             input_data: Either a path to an image file or an ImageInput object
             endpoint: The API endpoint to use for processing
+            ingestion: Read the images of folders and zip archives on a thread
+                pool, within a memory budget, while the request is sent
+                (optional)
             **kwargs: Additional parameters to pass to the API
 
         Returns:
@@ -263,37 +301,59 @@ class BFLClient:
         Raises:
             BFLError: If there's an error processing the images
         """
-        if isinstance(input_data, str):
-            # If input_data is a string, assume it's a path to an image
-            input_data = ImageInput(image_path=input_data)
-
-        if not isinstance(input_data, ImageInput):
-            raise BFLError("input_data must be either a string or an ImageInput object")
-
-        # Process the input based on the provided type
-        if input_data.image_path:
-            image_data = self._encode_image(input_data.image_path)
-        elif input_data.folder_path:
-            image_data = self._process_folder(input_data.folder_path)
-        elif input_data.zip_path:
-            image_data = self._process_zip(input_data.zip_path)
-        elif input_data.image_data:
-            image_data = input_data.image_data
-        else:
-            raise BFLError("No valid image input provided")
-
         # Prepare the request payload
-        payload = {"image": image_data, **kwargs}
+        payload = self._prepare_image_payload(input_data, ingestion, **kwargs)
+        return self._submit_image_payload(endpoint, payload)
 
+    def process_image_chunks(
+        self,
+        input_data: Union[str, ImageInput],
+        endpoint: str = "/v1/image",
+        ingestion: Optional[IngestionConfig] = None,
+        **kwargs,
+    ) -> List[ImageProcessingResponse]:
+        """
+        Process a large folder or zip archive in several requests.
+
+        The images are split according to `ingestion.max_request_bytes` and
+        `ingestion.max_images_per_request`, and the chunks are sent one after
+        the other, each streamed like `process_image` with `ingestion`.
+
+        Args:
+            input_data: Either a path to an image file or an ImageInput object
+            endpoint: The API endpoint to use for processing
+            ingestion: Chunk limits and parallel reading settings (optional)
+            **kwargs: Additional parameters to pass to the API with every chunk
+
+        Returns:
+            One ImageProcessingResponse per request, in image order
+
+        Examples:
+            >>> ingestion = IngestionConfig(max_request_bytes=512 * 1024 * 1024)
+            >>> responses = client.process_image_chunks(
+            ...     ImageInput(zip_path="training-set.zip"), ingestion=ingestion
+            ... )
+        """
+        return [
+            self._submit_image_payload(endpoint, payload)
+            for payload in self._image_chunk_payloads(input_data, ingestion, **kwargs)
+        ]
+
+    def _submit_image_payload(
+        self, endpoint: str, payload: Dict[str, Any]
+    ) -> ImageProcessingResponse:
         # Make the API request
-        response = self._request("POST", endpoint, json=payload)
+        self._acquire_task_slot()
+        try:
+            response = self._request("POST", endpoint, json=payload)
+        except BaseException:
+            self._release_task_slot()
+            raise
 
         # Store the polling URL for this task if available
         task_id = response.get("id")
-        if task_id and "polling_url" in response:
-            # Clean up expired entries before adding new one
-            self._cleanup_expired_polling_urls()
-            self._task_polling_urls[task_id] = (response["polling_url"], time.time())
+        self._store_polling_url(task_id, response)
+        self._task_started(task_id)
 
         return ImageProcessingResponse(
             task_id=task_id,
@@ -314,17 +374,15 @@ class BFLClient:
         endpoint = self._get_polling_endpoint(task_id)
         response = self._request("GET", endpoint)
 
-        return ImageProcessingResponse(
-            task_id=task_id,
-            status=response.get("status", "unknown"),
-            result=response.get("result"),
-            error=response.get("error"),
-        )
+        if response.get("status") in TERMINAL_STATUSES:
+            self._task_done(task_id, response["status"])
+        return self._parse_task_status(task_id, response)
 
     def get_polling_result(
         self,
         task_id: str,
         config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Poll for results until they are ready or until timeout.
@@ -332,6 +390,8 @@ class BFLClient:
         Args:
             task_id: The ID of the task to poll for
             config: Optional configuration for polling behavior
+            model: Model the task was submitted to, used by adaptive
+                polling strategies (optional)
 
         Returns:
             The final result from the API
@@ -339,38 +399,87 @@ class BFLClient:
         Raises:
             BFLError: If polling times out or the API request fails
         """
+        result, _ = self._wait_for_result(task_id, config, model)
+        return result
+
+    def _wait_for_result(
+        self,
+        task_id: str,
+        config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Poll a task until completion, returning its result and the poll count."""
         if config is None:
             config = ClientConfig()
+        strategy = config.get_polling_strategy()
 
         start_time = time.time()
         attempts = 0
+        delay = strategy.initial_delay(model)
+        if delay:
+            time.sleep(delay)
 
         while attempts < config.max_retries:
-            print(
-                f"Polling task {task_id} for result. \
-                  Attempt {attempts + 1} of {config.max_retries}"
+            logger.debug(
+                "Polling task %s for result, attempt %d of %d",
+                task_id,
+                attempts + 1,
+                config.max_retries,
             )
 
             endpoint = self._get_polling_endpoint(task_id)
-            response = self._request("GET", endpoint)
+            response, headers = self._request_with_headers("GET", endpoint)
+            attempts += 1
 
             # Check if the task is complete
-            if response.get("status") in ["Ready", "completed", "failed"]:
-                if response.get("status") == "failed":
-                    error_msg = response.get("error", "Unknown error")
-                    raise BFLError(f"Task failed: {error_msg}")
-                return response.get("result", {})
+            result = self._task_result(task_id, response, attempts)
+            if result is not None:
+                strategy.record(model, time.time() - start_time, attempts)
+                return result, attempts
 
             # Check for timeout
             if config.timeout and (time.time() - start_time > config.timeout):
                 raise BFLError(f"Polling timed out after {config.timeout} seconds")
 
             # Sleep before next attempt
-            time.sleep(config.polling_interval)
-            attempts += 1
+            delay = self._next_poll_delay(strategy, attempts, delay, model, headers)
+            time.sleep(delay)
 
         raise BFLError(f"Polling exceeded maximum retries ({config.max_retries})")
 
+    def poll_many(
+        self,
+        task_ids: Optional[Iterable[str]] = None,
+        config: Optional[ClientConfig] = None,
+        timeout: Optional[float] = None,
+        progress: Optional[ProgressReporter] = None,
+    ) -> Iterator[TaskResult]:
+        """
+        Poll many tasks from the calling thread, yielding them as they finish.
+
+        Args:
+            task_ids: Tasks to poll. Defaults to every task submitted through
+                this client whose polling URL is still known.
+            config: Optional configuration for polling behavior
+            timeout: Maximum total seconds to wait for all tasks
+            progress: Reporter counting finished items by status (optional)
+
+        Returns:
+            Iterator of TaskResult in completion order
+
+        Raises:
+            BFLError: If `timeout` elapses while tasks are still pending
+        """
+        from blackforest.polling.poller import TaskPoller
+
+        poller = TaskPoller(self, task_ids=task_ids, config=config)
+        results = poller.as_completed(timeout=timeout)
+        if progress is not None:
+            if progress.total is None:
+                progress.total = len(poller)
+            return progress.track(results)
+        return results
+
     def generate(
         self,
         model: str,
@@ -415,34 +524,51 @@ class BFLClient:
         if config is None:
             config = ClientConfig()
 
-        # Get the appropriate input type from the registry
-        input_cls = self.model_input_registry.get(model)
-        if not input_cls:
-            raise BFLError(
-                f"Model {model} not supported. \
-                           Supported models: {list(self.model_input_registry.keys())}"
-            )
-
-        # Process inputs for automatic image encoding if using flux-kontext-pro
-        processed_inputs = inputs
-        if model == "flux-kontext-pro":
-            processed_inputs = self._process_kontext_inputs(inputs)
+        payload = self._prepare_generation_payload(model, inputs)
+        return self._generate_payload(model, payload, config, track_usage)
 
-        # Convert the inputs to the appropriate type
-        typed_inputs = input_cls(**processed_inputs)
+    def _generate_payload(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        config: ClientConfig,
+        track_usage: bool = False,
+    ) -> Union[AsyncResponse, SyncResponse]:
+        """Submit a validated payload unless the result cache has its response."""
+        key = self._result_cache_key(model, payload, config.sync)
+        if key is not None:
+            # Identical requests share one task, see ResultCache
+            return self.result_cache.get_or_create(
+                key,
+                lambda: self._submit_generation(model, payload, config, track_usage),
+            )
+        return self._submit_generation(model, payload, config, track_usage)
 
-        response = self._request(
-            "POST",
-            f"{self.api_version}/{model}",
-            json=typed_inputs.model_dump(exclude_none=True),
-        )
+    def _submit_generation(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        config: ClientConfig,
+        track_usage: bool = False,
+    ) -> Union[AsyncResponse, SyncResponse]:
+        """Submit an already validated payload and optionally wait for the result."""
+        self._acquire_task_slot()
+        try:
+            with self.instrumentation.timer("generation.submit.duration", model=model):
+                response = self._request(
+                    "POST",
+                    f"{self.api_version}/{model}",
+                    json=payload,
+                )
+        except BaseException:
+            self._release_task_slot()
+            raise
 
         # Store the polling URL for this task
         task_id = response["id"]
-        if "polling_url" in response:
-            # Clean up expired entries before adding new one
-            self._cleanup_expired_polling_urls()
-            self._task_polling_urls[task_id] = (response["polling_url"], time.time())
+        self._store_polling_url(task_id, response)
+        self._task_started(task_id)
+        self._generation_submitted(task_id, model, payload, response)
 
         # Track usage if requested
         if track_usage:
@@ -451,14 +577,311 @@ class BFLClient:
         # If sync is True, poll for results
         if config.sync:
             try:
-                result = self.get_polling_result(task_id, config)
-                return SyncResponse(id=task_id, result=result)
+                result, polls = self._wait_for_result(task_id, config, model)
+                return SyncResponse(id=task_id, result=result, polls=polls)
             except Exception as e:
                 raise BFLError(f"Error getting synchronous result: {str(e)}")
 
         else:
             return AsyncResponse(id=task_id, polling_url=response["polling_url"])
 
+    def submit(
+        self,
+        model: str,
+        inputs: Dict[str, Any],
+        config: Optional[ClientConfig] = None,
+        track_usage: bool = False,
+    ) -> TaskHandle:
+        """
+        Submit a generation and return a future-like handle for its result.
+
+        The task is polled by a background thread shared by all handles with
+        the same polling configuration. Handles work with
+        `concurrent.futures.wait()` and `as_completed()`, accept done
+        callbacks, can be cancelled and awaited.
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Dictionary containing generation parameters
+            config: Polling behaviour (`sync` is ignored)
+            track_usage: Whether to track usage for licensed models
+
+        Returns:
+            TaskHandle resolved with the final TaskResult
+
+        Raises:
+            BFLError: If the submission fails
+
+        Examples:
+            >>> handles = [client.submit("flux-dev", {"prompt": p}) for p in prompts]
+            >>> done, pending = concurrent.futures.wait(handles, timeout=120)
+        """
+        if config is None:
+            config = ClientConfig()
+        response = self.generate(
+            model, inputs, config.model_copy(update={"sync": False}), track_usage
+        )
+        return self.track(response, config, model)
+
+    def track(
+        self,
+        task: Union[str, AsyncResponse],
+        config: Optional[ClientConfig] = None,
+        model: Optional[str] = None,
+    ) -> TaskHandle:
+        """
+        Return a handle for an already submitted task.
+
+        Args:
+            task: AsyncResponse returned by `generate()` or a task ID
+            config: Polling behaviour (`sync` is ignored)
+            model: Model the task was submitted to (optional)
+
+        Returns:
+            TaskHandle resolved with the final TaskResult
+        """
+        if isinstance(task, AsyncResponse):
+            task_id, polling_url = task.id, task.polling_url
+        else:
+            task_id, polling_url = task, None
+        return self._background_poller(config).track(task_id, polling_url, model)
+
+    def resume(self, config: Optional[ClientConfig] = None) -> List[TaskHandle]:
+        """
+        Resume polling the tasks left pending in the journal.
+
+        Call on startup to pick up generations submitted by a previous run
+        instead of submitting them again.
+
+        Args:
+            config: Polling behaviour (`sync` is ignored)
+
+        Returns:
+            TaskHandles of the resumed tasks, oldest submission first
+
+        Raises:
+            ValueError: If the client has no journal
+        """
+        if self.journal is None:
+            raise ValueError("resume() requires a client created with a journal")
+        poller = self._background_poller(config)
+        return [
+            poller.track(record.task_id, record.polling_url, record.model)
+            for record in self.journal.pending()
+        ]
+
+    def _background_poller(self, config: Optional[ClientConfig]) -> BackgroundPoller:
+        if config is None:
+            config = ClientConfig()
+        # Strategies may adapt to observed latencies, so they are shared by
+        # identity rather than by value
+        key = (
+            config.timeout,
+            config.polling_interval,
+            config.max_retries,
+            id(config.polling_strategy),
+        )
+        with self._background_lock:
+            poller = self._background_pollers.get(key)
+            if poller is None:
+                poller = BackgroundPoller(self, config)
+                self._background_pollers[key] = poller
+            return poller
+
+    def generate_with_webhook(
+        self,
+        model: str,
+        inputs: Dict[str, Any],
+        receiver: WebhookReceiver,
+        track_usage: bool = False,
+    ) -> "Future[TaskResult]":
+        """
+        Submit a generation whose completion is reported to a webhook receiver.
+
+        The request carries the receiver's `webhook_url` and `webhook_secret`,
+        and no polling requests are made for the task.
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Dictionary containing generation parameters
+            receiver: Receiver the API will call when the task finishes
+            track_usage: Whether to track usage for licensed models
+
+        Returns:
+            Future resolved with the final TaskResult by the receiver
+
+        Raises:
+            BFLError: If the API request fails
+        """
+        payload = self._prepare_generation_payload(
+            model, {**inputs, **receiver.webhook_inputs()}
+        )
+        response = self._submit_generation(
+            model, payload, ClientConfig(sync=False), track_usage
+        )
+        future = receiver.expect(response.id)
+        future.add_done_callback(
+            lambda f: self._task_done(
+                response.id, None if f.cancelled() else f.result().status
+            )
+        )
+        return future
+
+    def generate_many(
+        self,
+        model: str,
+        inputs: Iterable[Dict[str, Any]],
+        concurrency: int = 8,
+        config: Optional[ClientConfig] = None,
+        ordered: bool = False,
+        track_usage: bool = False,
+        progress: Optional[ProgressReporter] = None,
+    ) -> Iterator[BatchResult]:
+        """
+        Generate images for many inputs with bounded concurrency.
+
+        Inputs are consumed lazily and validated in the calling thread before
+        submission; at most `concurrency` generations (including polling when
+        `config.sync` is set) run at once. A failing item produces a
+        BatchResult with `error` set instead of aborting the batch.
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Iterable of input dictionaries, as for `generate`
+            concurrency: Maximum number of generations in flight
+            config: Optional configuration for client behavior
+            ordered: Yield results in input order instead of completion order
+            track_usage: Whether to track usage for licensed models
+            progress: Reporter counting finished items by status (optional)
+
+        Returns:
+            Iterator of BatchResult, one per input item
+
+        Examples:
+            >>> prompts = ({"prompt": p} for p in open("prompts.txt"))
+            >>> for item in client.generate_many("flux-pro-1.1", prompts, 16):
+            ...     print(item.index, item.response or item.error)
+        """
+        results = generate_many(
+            self,
+            model,
+            inputs,
+            concurrency=concurrency,
+            config=config,
+            ordered=ordered,
+            track_usage=track_usage,
+        )
+        return progress.track(results) if progress is not None else results
+
+    def run_pipeline(
+        self,
+        model: str,
+        inputs: Iterable[Dict[str, Any]],
+        output_dir: Optional[str] = None,
+        config: Optional[ClientConfig] = None,
+        output_format: Optional[OutputFormat] = None,
+        progress: Optional[ProgressReporter] = None,
+        **kwargs: Any,
+    ) -> Iterator[PipelineResult]:
+        """
+        Generate and download images for many inputs in overlapping stages.
+
+        Encoding, submission, polling and downloading of different items run
+        concurrently, connected by bounded queues so that a slow stage slows
+        down the ones before it. See GenerationPipeline for tuning options.
+
+        Args:
+            model: The model to use for generation, eg "flux-pro-1.1"
+            inputs: Iterable of input dictionaries, as for `generate`
+            output_dir: Directory to write images to. When omitted the image
+                bytes are returned in `PipelineResult.content`.
+            config: Optional polling configuration
+            output_format: Expected image format, checked on download
+            progress: Reporter counting finished items by status (optional)
+            **kwargs: Stage sizes passed to GenerationPipeline
+
+        Returns:
+            Iterator of PipelineResult in completion order, one per input item
+
+        Examples:
+            >>> prompts = ({"prompt": p} for p in open("prompts.txt"))
+            >>> for item in client.run_pipeline("flux-pro-1.1", prompts, "out"):
+            ...     print(item.index, item.path or item.error)
+        """
+        from blackforest.pipeline import GenerationPipeline
+
+        pipeline = GenerationPipeline(
+            self,
+            model,
+            config=config,
+            output_dir=output_dir,
+            output_format=output_format,
+            **kwargs,
+        )
+        results = pipeline.run(inputs)
+        return progress.track(results) if progress is not None else results
+
+    @property
+    def downloader(self) -> Downloader:
+        """Downloader for generated samples, created on first use."""
+        if self._downloader is None:
+            self._downloader = Downloader(
+                pool_config=self.pool_config,
+                result_cache=self.result_cache,
+                instrumentation=self.instrumentation,
+            )
+        return self._downloader
+
+    def download(
+        self,
+        result: Union[str, SyncResponse, TaskResult],
+        dest: Destination = None,
+        output_format: Optional[OutputFormat] = None,
+    ) -> DownloadResult:
+        """
+        Download the sample of a finished generation.
+
+        Args:
+            result: A SyncResponse, a finished TaskResult or a sample URL
+            dest: File path or writable binary file-like object. When omitted
+                the image is returned in `DownloadResult.content`.
+            output_format: Expected image format; the response content type
+                is checked against it (optional)
+
+        Returns:
+            DownloadResult describing the downloaded sample
+
+        Raises:
+            BFLError: If the download fails or the content type is unexpected
+        """
+        return self.downloader.download(result, dest, output_format)
+
+    def download_many(
+        self,
+        results: Iterable[Union[str, SyncResponse, TaskResult]],
+        directory: Optional[str] = None,
+        output_format: Optional[OutputFormat] = None,
+        progress: Optional[ProgressReporter] = None,
+    ) -> Iterator[DownloadResult]:
+        """
+        Download many samples concurrently, yielding them as they complete.
+
+        Samples whose signed URL expires first are downloaded first.
+
+        Args:
+            results: SyncResponses, finished TaskResults or sample URLs
+            directory: Directory to write the samples to, named after their
+                task ID. When omitted images are kept in memory.
+            output_format: Expected image format (optional)
+            progress: Reporter counting finished items by status (optional)
+
+        Returns:
+            Iterator of DownloadResult in completion order; failed downloads
+            have `error` set
+        """
+        downloads = self.downloader.download_many(results, directory, output_format)
+        return progress.track(downloads) if progress is not None else downloads
+
     def track_usage_via_api(self, name: str, n: int = 1) -> None:
         """
         Track usage of licensed models via the BFL API for commercial licensing compliance.
@@ -473,29 +896,10 @@ class BFLClient:
         For more information on licensing BFL's models for commercial use and usage reporting,
         see the README.md or visit: https://dashboard.bfl.ai/licensing/subscriptions?showInstructions=true
         """
-        model_slug_map = {
-            "flux-dev": "flux-1-dev",
-            "flux-dev-kontext": "flux-1-kontext-dev",
-            "flux-dev-fill": "flux-tools",
-            "flux-dev-depth": "flux-tools",
-            "flux-dev-canny": "flux-tools",
-            "flux-dev-canny-lora": "flux-tools",
-            "flux-dev-depth-lora": "flux-tools",
-            "flux-dev-redux": "flux-tools",
-        }
-
-        if name not in model_slug_map:
-            raise BFLError(
-                f"Cannot track usage for model '{name}'. Model not trackable or name incorrect. "
-                f"Trackable models: {list(model_slug_map.keys())}"
-            )
-
-        model_slug = model_slug_map[name]
-        endpoint = f"/v1/licenses/models/{model_slug}/usage"
-        payload = {"number_of_generations": n}
+        endpoint, payload = self._usage_request(name, n)
 
         try:
             self._request("POST", endpoint, json=payload)
-            print(f"Successfully tracked usage for {name} with {n} generations")
+            logger.info("Tracked usage for %s with %d generations", name, n)
         except BFLError as e:
             raise BFLError(f"Failed to track usage for {name}: {str(e)}")
@@ -0,0 +1,422 @@
+"""
+Concurrent downloads of generated samples.
+
+The `sample` URL of a result is signed and only valid for a short time, so
+queued downloads are ordered by the expiry of their URL: the sample that
+expires first is fetched first. Samples are streamed in chunks to a file or
+a file-like sink instead of being buffered whole.
+
+Downloads use their own session without the API key header, since sample
+URLs point at a delivery host rather than the API.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from blackforest.base_client import BFLError
+from blackforest.metrics import Instrumentation
+from blackforest.result_cache import ResultCache
+from blackforest.transport.session import build_session
+from blackforest.types.base.output_format import OutputFormat
+from blackforest.types.general.connection_pool_config import ConnectionPoolConfig
+from blackforest.types.responses.responses import (
+    DownloadResult,
+    SyncResponse,
+    TaskResult,
+)
+
+# Validity of sample URLs whose expiry cannot be read from the URL itself
+DEFAULT_URL_TTL = 600
+
+CONTENT_TYPES = {
+    OutputFormat.jpeg: "image/jpeg",
+    OutputFormat.png: "image/png",
+}
+EXTENSIONS = {"image/jpeg": ".jpeg", "image/png": ".png", "image/webp": ".webp"}
+
+Destination = Union[str, os.PathLike, IO[bytes], None]
+Downloadable = Union[str, SyncResponse, TaskResult]
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    for fmt in ("%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y%m%dT%H%M%SZ"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=timezone.utc).timestamp()
+    return None
+
+
+def url_expiry(url: str, default_ttl: float = DEFAULT_URL_TTL) -> float:
+    """
+    Epoch time at which a signed URL expires.
+
+    Understands Azure SAS (`se`), AWS SigV4 (`X-Amz-Date` + `X-Amz-Expires`)
+    and epoch `Expires` parameters. Other URLs are assumed to expire
+    `default_ttl` seconds from now.
+    """
+    params = {k.lower(): v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    try:
+        if "se" in params:
+            expiry = _parse_timestamp(params["se"])
+            if expiry is not None:
+                return expiry
+        if "x-amz-date" in params and "x-amz-expires" in params:
+            signed = _parse_timestamp(params["x-amz-date"])
+            if signed is not None:
+                return signed + float(params["x-amz-expires"])
+        if "expires" in params:
+            return float(params["expires"])
+    except ValueError:
+        pass
+    return time.time() + default_ttl
+
+
+def _sample_of(item: Downloadable) -> Tuple[str, Optional[str]]:
+    """Return the sample URL and key of a result or URL."""
+    if isinstance(item, SyncResponse):
+        return item.result.sample, item.id
+    if isinstance(item, TaskResult):
+        if not item.ok or not item.result or "sample" not in item.result:
+            raise BFLError(f"Task {item.id} has no sample to download")
+        return item.result["sample"], item.id
+    return item, None
+
+
+def _check_content_type(
+    content_type: str, output_format: Optional[OutputFormat]
+) -> None:
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if output_format is not None:
+        expected = CONTENT_TYPES[OutputFormat(output_format)]
+        if mime != expected:
+            raise BFLError(
+                f"Unexpected content type {mime or 'none'!r}, expected {expected!r}"
+            )
+    elif not mime.startswith("image/"):
+        raise BFLError(f"Unexpected content type {mime or 'none'!r}")
+
+
+class _Job:
+    def __init__(
+        self,
+        url: str,
+        dest: Destination,
+        output_format: Optional[OutputFormat],
+        key: Optional[str],
+        task_id: Optional[str] = None,
+    ):
+        self.url = url
+        self.dest = dest
+        self.output_format = output_format
+        self.key = key
+        self.task_id = task_id
+        self.expires_at = url_expiry(url)
+        self.future: Future = Future()
+
+
+class Downloader:
+    """
+    Downloads samples with a pool of worker threads.
+
+    Jobs wait in a queue ordered by URL expiry. Each worker streams its
+    response in `chunk_size` pieces to the destination: a file path (written
+    to a temporary file and renamed when complete), a writable binary
+    file-like object, or memory when no destination is given.
+
+    Examples:
+        >>> with Downloader(max_workers=8) as downloader:
+        ...     for result in downloader.download_many(responses, "out/"):
+        ...         print(result.path if result.ok else result.error)
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        chunk_size: int = 64 * 1024,
+        timeout: float = 60,
+        verify_content_type: bool = True,
+        pool_config: Optional[ConnectionPoolConfig] = None,
+        session: Optional[requests.Session] = None,
+        result_cache: Optional[ResultCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
+        """
+        Args:
+            max_workers: Number of concurrent downloads
+            chunk_size: Bytes read from the response at a time
+            timeout: Connect/read timeout per request in seconds
+            verify_content_type: Check the response content type against the
+                expected OutputFormat (or any image type if none is given)
+            pool_config: Connection pool settings for the download session
+            session: Session to use instead of creating one (optional)
+            result_cache: Cache serving and storing sample bytes by task ID
+                (optional)
+            instrumentation: Receiver of download metrics (optional)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.verify_content_type = verify_content_type
+        self.session = session if session is not None else build_session(pool_config)
+        self.result_cache = result_cache
+        self.instrumentation = instrumentation
+        self._queue: List[Tuple[float, int, _Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+
+    def __enter__(self) -> "Downloader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self, cancel_futures: bool = False) -> None:
+        """
+        Stop the workers after the queued downloads have finished.
+
+        Args:
+            cancel_futures: Cancel the downloads that have not started yet
+                instead of waiting for them
+        """
+        with self._cond:
+            self._closed = True
+            cancelled = []
+            if cancel_futures:
+                cancelled = [job for _, _, job in self._queue]
+                self._queue.clear()
+            self._cond.notify_all()
+        # Outside the lock: cancelling runs the futures' done callbacks
+        for job in cancelled:
+            job.future.cancel()
+        for worker in self._workers:
+            worker.join()
+        self.session.close()
+
+    def submit(
+        self,
+        item: Downloadable,
+        dest: Destination = None,
+        output_format: Optional[OutputFormat] = None,
+        key: Optional[str] = None,
+    ) -> "Future[DownloadResult]":
+        """
+        Queue a download.
+
+        Args:
+            item: Sample URL, or a finished SyncResponse/TaskResult
+            dest: File path or binary file-like object; None keeps the
+                sample in memory (`DownloadResult.content`)
+            output_format: Expected format of the sample (optional)
+            key: Identifier reported in the result (defaults to the task ID)
+
+        Returns:
+            Future resolving to a DownloadResult. Failures are reported in
+            `DownloadResult.error` rather than raised.
+        """
+        url, task_id = _sample_of(item)
+        job = _Job(url, dest, output_format, key or task_id, task_id)
+        with self._cond:
+            if self._closed:
+                raise BFLError("Downloader is closed")
+            heapq.heappush(self._queue, (job.expires_at, next(self._seq), job))
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._work, name="bfl-download", daemon=True
+                )
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        return job.future
+
+    def download(
+        self,
+        item: Downloadable,
+        dest: Destination = None,
+        output_format: Optional[OutputFormat] = None,
+    ) -> DownloadResult:
+        """
+        Download one sample in the calling thread.
+
+        Raises:
+            BFLError: If the download fails
+        """
+        url, task_id = _sample_of(item)
+        result = self._run(_Job(url, dest, output_format, task_id, task_id))
+        if not result.ok:
+            raise BFLError(result.error)
+        return result
+
+    def download_many(
+        self,
+        items: Iterable[Downloadable],
+        directory: Optional[Union[str, os.PathLike]] = None,
+        output_format: Optional[OutputFormat] = None,
+    ) -> Iterator[DownloadResult]:
+        """
+        Download many samples, yielding results as they complete.
+
+        Args:
+            items: Sample URLs or finished SyncResponse/TaskResult objects
+            directory: Directory to write samples to, named after their task
+                ID (or position); None keeps them in memory
+            output_format: Expected format of the samples (optional)
+
+        Returns:
+            Iterator of DownloadResult in completion order
+        """
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        futures = []
+        for index, item in enumerate(items):
+            try:
+                url, task_id = _sample_of(item)
+            except BFLError as e:
+                key = getattr(item, "id", None)
+                yield DownloadResult(url="", key=key, error=str(e))
+                continue
+            key = task_id or str(index)
+            dest = None
+            if directory is not None:
+                dest = Path(directory) / f"{key}{self._extension(url, output_format)}"
+            futures.append(self.submit(item, dest, output_format, key))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    @staticmethod
+    def _extension(url: str, output_format: Optional[OutputFormat]) -> str:
+        if output_format is not None:
+            return EXTENSIONS[CONTENT_TYPES[OutputFormat(output_format)]]
+        suffix = Path(urlsplit(url).path).suffix.lower()
+        return suffix if suffix in (".jpg", ".jpeg", ".png", ".webp") else ""
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = self._run(job)
+            except Exception as e:
+                # Every requested sample yields a result, and the worker
+                # survives errors _run does not expect
+                error = str(e) or type(e).__name__
+                result = DownloadResult(url=job.url, key=job.key, error=error)
+            job.future.set_result(result)
+
+    def _run(self, job: _Job) -> DownloadResult:
+        start = time.perf_counter()
+        try:
+            result = self._fetch(job)
+        except (requests.exceptions.RequestException, OSError, BFLError) as e:
+            message = str(e)
+            if time.time() > job.expires_at:
+                message = f"{message} (signed URL expired)"
+            result = DownloadResult(url=job.url, key=job.key, error=message)
+        if self.instrumentation is not None:
+            status = "ok" if result.ok else "error"
+            elapsed = time.perf_counter() - start
+            self.instrumentation.emit("download.duration", elapsed, status=status)
+            self.instrumentation.emit("download.bytes", result.size or 0, status=status)
+        return result
+
+    def _fetch(self, job: _Job) -> DownloadResult:
+        cache = self.result_cache if job.task_id else None
+        cached = cache.get_content(job.task_id) if cache is not None else None
+        if cached is not None:
+            content_type, content = cached
+            if self.verify_content_type:
+                _check_content_type(content_type, job.output_format)
+            return self._deliver(job, [content], content_type)
+
+        with self.session.get(job.url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if self.verify_content_type:
+                _check_content_type(content_type, job.output_format)
+            chunks = response.iter_content(chunk_size=self.chunk_size)
+            result = self._deliver(job, chunks, content_type)
+        # Only samples held in memory anyway are cached; downloads to files
+        # stay streamed
+        if cache is not None and result.content is not None:
+            cache.put_content(job.task_id, content_type, result.content)
+        return result
+
+    def _deliver(
+        self, job: _Job, chunks: Iterable[bytes], content_type: str
+    ) -> DownloadResult:
+        """Write the sample to the job's destination."""
+        if job.dest is None:
+            content = b"".join(chunks)
+            return DownloadResult(
+                url=job.url,
+                key=job.key,
+                content=content,
+                content_type=content_type,
+                size=len(content),
+            )
+
+        if hasattr(job.dest, "write"):
+            size = self._write(chunks, job.dest)
+            path = None
+        else:
+            path = os.fspath(job.dest)
+            # Write next to the target and rename, so a failed download
+            # never leaves a truncated file behind
+            partial = f"{path}.part"
+            try:
+                with open(partial, "wb") as f:
+                    size = self._write(chunks, f)
+                os.replace(partial, path)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+                raise
+        return DownloadResult(
+            url=job.url,
+            key=job.key,
+            path=path,
+            content_type=content_type,
+            size=size,
+        )
+
+    @staticmethod
+    def _write(chunks: Iterable[bytes], sink: Any) -> int:
+        size = 0
+        for chunk in chunks:
+            sink.write(chunk)
+            size += len(chunk)
+        return size
@@ -0,0 +1,181 @@
+"""
+Cache of base64-encoded input images.
+
+Entries are keyed by where the bytes came from, so a cached image is found
+without reading the file again: local files by resolved path, modification
+time and size, zip members by archive, member name and CRC. Any change to a
+file changes its key, so stale encodings are never returned.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+
+from blackforest.images.encoding import encode_file, encode_zip_member
+
+
+def file_key(path: Union[str, os.PathLike]) -> Tuple:
+    """Cache key of a local file."""
+    stat = os.stat(path)
+    return ("file", os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def zip_member_key(zip_path: Union[str, os.PathLike], info: zipfile.ZipInfo) -> Tuple:
+    """Cache key of a member of a zip archive."""
+    return (
+        "zip",
+        *file_key(zip_path)[1:],
+        info.filename,
+        info.CRC,
+        info.file_size,
+    )
+
+
+class EncodedImageCache:
+    """
+    Thread-safe LRU cache of base64-encoded images with an optional disk tier.
+
+    The memory tier holds at most `max_bytes` of encoded data. When `disk_dir`
+    is given, every encoding is also written there and survives restarts;
+    disk hits are promoted back into memory.
+
+    Examples:
+        >>> cache = EncodedImageCache(max_bytes=128 * 1024 * 1024)
+        >>> client = BFLClient(api_key, image_cache=cache)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: Optional[Union[str, os.PathLike]] = None,
+    ):
+        """
+        Args:
+            max_bytes: Memory budget for encoded images
+            disk_dir: Directory for the on-disk tier (optional)
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Encoded bytes held in memory."""
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def clear(self) -> None:
+        """Drop the memory tier (the disk tier is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return the cached encoding for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self._read_disk(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        self._store(key, value)
+        self._write_disk(key, value)
+
+    def get_or_encode(self, key: Hashable, encode: Callable[[], str]) -> str:
+        """Return the cached encoding for `key`, computing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = encode()
+            self.put(key, value)
+        return value
+
+    def encode_file(self, path: Union[str, os.PathLike]) -> str:
+        """Base64-encode a local file, using the cache."""
+        return self.get_or_encode(file_key(path), lambda: encode_file(path))
+
+    def encode_zip_member(
+        self, zip_path: Union[str, os.PathLike], info: zipfile.ZipInfo
+    ) -> str:
+        """Base64-encode a member of a zip archive, using the cache."""
+        return self.get_or_encode(
+            zip_member_key(zip_path, info),
+            lambda: encode_zip_member(zip_path, info).decode("ascii"),
+        )
+
+    def _store(self, key: Hashable, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key: Hashable) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.b64"
+
+    def _read_disk(self, key: Hashable) -> Optional[str]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding="ascii")
+        except OSError:
+            return None
+
+    def _write_disk(self, key: Hashable, value: str) -> None:
+        path = self._disk_path(key)
+        if path is None or path.exists():
+            return
+        # Write to a temporary file first so readers never see partial data
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="ascii") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
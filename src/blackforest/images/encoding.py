@@ -0,0 +1,298 @@
+"""
+Base64 encoding of image files without holding whole copies in memory.
+
+`encode_file` encodes straight from a memory map instead of reading the file
+into a buffer first. `FileImage` goes one step further: placed in a request
+payload in place of the base64 string, it is encoded chunk by chunk while
+`StreamingJSONBody` writes the body to the socket, so no encoded copy of the
+image ever exists as a whole.
+
+Members stored uncompressed in zip archives get the same treatment: their
+data is sliced out of a memory map of the archive and handed to the encoder
+without being copied. Only compressed members go through `zipfile`, with
+each thread keeping its recently used archives open so that a run of members
+does not parse the central directory once per member.
+"""
+
+import base64
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import uuid
+import zipfile
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import IO, Any, Iterator, List, Optional, Tuple, Union
+
+# Multiple of 3 so chunks encode without padding in the middle of the stream
+DEFAULT_CHUNK_SIZE = 3 * 64 * 1024
+
+
+def encoded_length(size: int) -> int:
+    """Length of the base64 encoding of `size` bytes."""
+    return 4 * ((size + 2) // 3)
+
+
+def encode_file(path: Union[str, os.PathLike]) -> str:
+    """Encode a file to a base64 string, reading it through a memory map."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return base64.b64encode(mapped).decode("ascii")
+
+
+def iter_base64(
+    path: Union[str, os.PathLike], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the base64 encoding of a file in chunks of about `chunk_size`."""
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError("chunk_size must be a positive multiple of 3")
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                for start in range(0, size, chunk_size):
+                    yield base64.b64encode(view[start : start + chunk_size])
+
+
+def iter_base64_stream(
+    f: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the base64 encoding of a readable stream in chunks."""
+    remainder = b""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        data = remainder + data
+        cut = len(data) - len(data) % 3
+        remainder = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut])
+    if remainder:
+        yield base64.b64encode(remainder)
+
+
+# Local file header: signature, then the lengths of the name and extra field
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+
+def stored_member_offset(f: IO[bytes], info: zipfile.ZipInfo) -> Optional[int]:
+    """
+    Offset of a zip member's data in the archive, if it can be read in place.
+
+    Returns:
+        The offset for members stored uncompressed and unencrypted, None for
+        the others
+    """
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+    f.seek(info.header_offset)
+    header = f.read(_LOCAL_HEADER.size)
+    if len(header) < _LOCAL_HEADER.size:
+        raise zipfile.BadZipFile(f"Truncated header for {info.filename}")
+    signature, name_length, extra_length = _LOCAL_HEADER.unpack(header)
+    if signature != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    # The local name and extra field may differ from the central directory's
+    return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+# Archives each thread keeps open: path -> ((mtime, size), ZipFile)
+_open_archives = threading.local()
+MAX_OPEN_ARCHIVES = 4
+
+
+def open_archive(zip_path: Union[str, os.PathLike]) -> zipfile.ZipFile:
+    """
+    The calling thread's open ZipFile of an archive.
+
+    Archives are kept open per thread, up to `MAX_OPEN_ARCHIVES` of them, and
+    reopened when the file changes. The ZipFile must not be closed or handed
+    to other threads; members opened from it may be read anywhere.
+    """
+    path = os.path.abspath(zip_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    archives: "OrderedDict[str, Tuple[Tuple[int, int], zipfile.ZipFile]]"
+    archives = getattr(_open_archives, "archives", None)
+    if archives is None:
+        archives = _open_archives.archives = OrderedDict()
+    entry = archives.pop(path, None)
+    if entry is not None and entry[0] != version:
+        entry[1].close()
+        entry = None
+    if entry is None:
+        entry = (version, zipfile.ZipFile(path))
+        while len(archives) >= MAX_OPEN_ARCHIVES:
+            _, (_, oldest) = archives.popitem(last=False)
+            # Members still being read keep their file open
+            oldest.close()
+    archives[path] = entry
+    return entry[1]
+
+
+def _check_crc(view: memoryview, info: zipfile.ZipInfo) -> None:
+    if zlib.crc32(view) != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+
+
+def encode_zip_member(
+    zip_path: Union[str, os.PathLike], info: zipfile.ZipInfo
+) -> bytes:
+    """
+    Base64-encode a member of a zip archive.
+
+    Stored members are encoded straight from a memory map of the archive;
+    compressed ones are decompressed by `zipfile`.
+    """
+    with open(zip_path, "rb") as f:
+        offset = stored_member_offset(f, info)
+        if offset is None or info.file_size == 0:
+            return base64.b64encode(open_archive(zip_path).read(info))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped)[offset : offset + info.file_size] as view:
+                _check_crc(view, info)
+                return base64.b64encode(view)
+
+
+def iter_base64_zip_member(
+    zip_path: Union[str, os.PathLike],
+    info: zipfile.ZipInfo,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield the base64 encoding of a zip member in chunks, see above."""
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError("chunk_size must be a positive multiple of 3")
+    with open(zip_path, "rb") as f:
+        offset = stored_member_offset(f, info)
+        if offset is None or info.file_size == 0:
+            with open_archive(zip_path).open(info) as member:
+                yield from iter_base64_stream(member, chunk_size)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped)[offset : offset + info.file_size] as view:
+                # Checked before sending anything, like a full read would be
+                _check_crc(view, info)
+                for start in range(0, info.file_size, chunk_size):
+                    yield base64.b64encode(view[start : start + chunk_size])
+
+
+class StreamedValue(ABC):
+    """
+    A JSON string value produced while `StreamingJSONBody` sends the body.
+
+    The bytes yielded go between the string's quotes verbatim, so they must
+    not need JSON escaping, and `len()` must give their exact total size.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Total size of the bytes yielded."""
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the value's bytes; iterating again starts over."""
+
+
+class FileImage(StreamedValue):
+    """
+    An image file to be sent base64-encoded in a JSON request body.
+
+    The file size is read up front so the request's Content-Length is known
+    before any data is encoded.
+    """
+
+    def __init__(
+        self, path: Union[str, os.PathLike], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self.path = os.fspath(path)
+        self.size = os.path.getsize(self.path)
+        self.chunk_size = chunk_size
+
+    def __len__(self) -> int:
+        return encoded_length(self.size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter_base64(self.path, self.chunk_size)
+
+    def encode(self) -> str:
+        """Encode the whole file at once."""
+        return encode_file(self.path)
+
+    def __repr__(self) -> str:
+        return f"FileImage({self.path!r})"
+
+
+def _contains_streamed(value: Any) -> bool:
+    if isinstance(value, StreamedValue):
+        return True
+    if isinstance(value, dict):
+        return any(_contains_streamed(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_contains_streamed(v) for v in value)
+    return False
+
+
+class StreamingJSONBody:
+    """
+    A JSON request body whose FileImage (and other StreamedValue) values are
+    encoded while it is sent.
+
+    The payload is serialized once with placeholders for the images; iterating
+    yields the JSON text around them and the encoded image chunks in between.
+    Iterating again starts over, so a request can be retried. `len()` gives
+    the exact body size for the Content-Length header.
+    """
+
+    def __init__(self, payload: Any):
+        self._parts: List[Union[bytes, StreamedValue]] = []
+        images: List[StreamedValue] = []
+        token = uuid.uuid4().hex
+
+        def replace(value: Any) -> Any:
+            if isinstance(value, StreamedValue):
+                images.append(value)
+                return f"{token}:{len(images) - 1}"
+            if isinstance(value, dict):
+                return {k: replace(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [replace(v) for v in value]
+            return value
+
+        text = json.dumps(replace(payload))
+        # Splitting on the placeholders leaves their quotes in the JSON text;
+        # base64 needs no escaping, so the chunks go between them verbatim.
+        pieces = re.split(f"{token}:(\\d+)", text)
+        for i, piece in enumerate(pieces):
+            if i % 2:
+                self._parts.append(images[int(piece)])
+            elif piece:
+                self._parts.append(piece.encode("utf-8"))
+        self._length = sum(len(part) for part in self._parts)
+
+    @classmethod
+    def wrap(cls, payload: Any) -> Optional["StreamingJSONBody"]:
+        """Return a streaming body if `payload` contains streamed values."""
+        return cls(payload) if _contains_streamed(payload) else None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, StreamedValue):
+                yield from part
+            else:
+                yield part
+
+    def to_bytes(self) -> bytes:
+        """Materialize the whole body (mainly useful for testing)."""
+        return b"".join(self)
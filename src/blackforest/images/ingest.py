@@ -0,0 +1,283 @@
+"""
+Parallel, memory-bounded ingestion of image folders and zip archives.
+
+Folders and archives are listed up front as `ImageSource`s, which only record
+where each image is and how large it is. Their bytes are read when the
+request body is sent: `ZipMemberImage` streams one archive member like
+`FileImage` streams a file, and `ImageSequence` streams a whole list of
+images, reading and encoding the next ones on a thread pool while the current
+one is written to the socket. Encoded images waiting to be sent never exceed
+a byte budget, so ingesting a multi-gigabyte archive takes about as much
+memory as the budget, whatever the archive's size. `chunk_sources` splits
+large inputs over several requests.
+"""
+
+import base64
+import mmap
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    IO,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from blackforest.images.cache import EncodedImageCache, file_key, zip_member_key
+from blackforest.images.encoding import (
+    DEFAULT_CHUNK_SIZE,
+    FileImage,
+    StreamedValue,
+    encode_zip_member,
+    encoded_length,
+    iter_base64,
+    iter_base64_zip_member,
+    open_archive,
+)
+
+# Image file types picked up from folders and zip archives
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
+
+# Encoded bytes read ahead of the request body, by default
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+
+# Separator between the strings of a JSON array, see ImageSequence
+_ARRAY_SEPARATOR = b'","'
+
+
+@dataclass(frozen=True)
+class ImageSource:
+    """An image file, or a member of a zip archive when `info` is set."""
+
+    path: str
+    size: int
+    info: Optional[zipfile.ZipInfo] = None
+
+    @property
+    def name(self) -> str:
+        return self.info.filename if self.info is not None else self.path
+
+    @property
+    def encoded_size(self) -> int:
+        return encoded_length(self.size)
+
+    @contextmanager
+    def open(self) -> Iterator[IO[bytes]]:
+        """Open the image for reading, in its own file handle."""
+        if self.info is None:
+            with open(self.path, "rb") as f:
+                yield f
+        else:
+            with open_archive(self.path).open(self.info) as f:
+                yield f
+
+    def read(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+    def encode(self) -> bytes:
+        """Base64-encode the whole image, reading it through a memory map."""
+        if self.info is None:
+            with open(self.path, "rb") as f:
+                if self.size == 0:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return base64.b64encode(mapped)
+        return encode_zip_member(self.path, self.info)
+
+    def iter_base64(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the base64 encoding of the image in chunks."""
+        if self.info is None:
+            return iter_base64(self.path, chunk_size)
+        return iter_base64_zip_member(self.path, self.info, chunk_size)
+
+    def cache_key(self) -> Tuple:
+        """Key of the image in an EncodedImageCache."""
+        if self.info is None:
+            return file_key(self.path)
+        return zip_member_key(self.path, self.info)
+
+
+def _is_image(name: str) -> bool:
+    return Path(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def folder_sources(folder_path: Union[str, os.PathLike]) -> List[ImageSource]:
+    """The images directly inside a folder, sorted by name."""
+    sources = []
+    for entry in sorted(Path(folder_path).iterdir()):
+        if _is_image(entry.name) and entry.is_file():
+            sources.append(ImageSource(str(entry), entry.stat().st_size))
+    return sources
+
+
+def zip_sources(zip_path: Union[str, os.PathLike]) -> List[ImageSource]:
+    """The images in a zip archive, in archive order."""
+    path = os.fspath(zip_path)
+    with zipfile.ZipFile(path) as archive:
+        return [
+            ImageSource(path, info.file_size, info)
+            for info in archive.infolist()
+            if not info.is_dir() and _is_image(info.filename)
+        ]
+
+
+class ZipMemberImage(FileImage):
+    """
+    A member of a zip archive, encoded while it is sent.
+
+    Stored members are read in place from a memory map of the archive;
+    compressed ones are decompressed on the fly.
+    """
+
+    def __init__(self, source: ImageSource, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = source.path
+        self.size = source.size
+        self.chunk_size = chunk_size
+        self.source = source
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.source.iter_base64(self.chunk_size)
+
+    def encode(self) -> str:
+        return self.source.encode().decode("ascii")
+
+    def __repr__(self) -> str:
+        return f"ZipMemberImage({self.path!r}, {self.source.name!r})"
+
+
+def stream_value(source: ImageSource) -> FileImage:
+    """A value streaming `source` into a request body."""
+    if source.info is None:
+        return FileImage(source.path)
+    return ZipMemberImage(source)
+
+
+class ImageSequence(StreamedValue):
+    """
+    A list of images read and encoded in parallel while the body is sent.
+
+    Worker threads read and encode the images ahead of the one being sent,
+    as long as the encoded images waiting stay within `byte_budget`. An
+    image larger than the budget is streamed in chunks by the sending
+    thread instead. Images are sent in order.
+
+    The sequence stands for all the strings of a JSON array at once: it is
+    placed in the payload as the only element of a list, `[ImageSequence(...)]`,
+    and yields the images separated by `","`.
+
+    Examples:
+        >>> sources = zip_sources("training-set.zip")
+        >>> payload = {"image": [ImageSequence(sources, workers=8)]}
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[ImageSource],
+        workers: int = 4,
+        byte_budget: int = DEFAULT_BYTE_BUDGET,
+        image_cache: Optional[EncodedImageCache] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if not sources:
+            raise ValueError("An ImageSequence needs at least one image")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.sources = list(sources)
+        self.workers = workers
+        self.byte_budget = byte_budget
+        self.image_cache = image_cache
+        self.chunk_size = chunk_size
+
+    def __len__(self) -> int:
+        encoded = sum(source.encoded_size for source in self.sources)
+        return encoded + len(_ARRAY_SEPARATOR) * (len(self.sources) - 1)
+
+    def _encode(self, source: ImageSource) -> bytes:
+        if self.image_cache is not None:
+            return self.image_cache.get_or_encode(
+                source.cache_key(), lambda: source.encode().decode("ascii")
+            ).encode("ascii")
+        return source.encode()
+
+    def __iter__(self) -> Iterator[bytes]:
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="bfl-ingest")
+        # Images being read ahead; None for those streamed by this thread
+        pending: Deque[Tuple[ImageSource, Optional[Future]]] = deque()
+        next_index = 0
+        held = 0
+        try:
+            for i in range(len(self.sources)):
+                # Read ahead while within budget; the image about to be sent
+                # is always admitted, so a small budget still makes progress
+                while next_index < len(self.sources):
+                    source = self.sources[next_index]
+                    cost = source.encoded_size
+                    if cost > self.byte_budget:
+                        pending.append((source, None))
+                    elif not pending or held + cost <= self.byte_budget:
+                        pending.append((source, pool.submit(self._encode, source)))
+                        held += cost
+                    else:
+                        break
+                    next_index += 1
+                    if len(pending) > 2 * self.workers:
+                        break
+
+                source, future = pending.popleft()
+                if i:
+                    yield _ARRAY_SEPARATOR
+                if future is None:
+                    yield from source.iter_base64(self.chunk_size)
+                else:
+                    data = future.result()
+                    held -= source.encoded_size
+                    yield data
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __repr__(self) -> str:
+        return f"ImageSequence({len(self.sources)} images)"
+
+
+def chunk_sources(
+    sources: Iterable[ImageSource],
+    max_bytes: Optional[int] = None,
+    max_images: Optional[int] = None,
+) -> Iterator[List[ImageSource]]:
+    """
+    Split images into consecutive chunks for separate requests.
+
+    Args:
+        sources: Images to split
+        max_bytes: Maximum encoded bytes per chunk. An image larger than this
+            gets a chunk of its own.
+        max_images: Maximum number of images per chunk
+
+    Yields:
+        Non-empty lists of images, in order
+    """
+    if max_images is not None and max_images < 1:
+        raise ValueError("max_images must be at least 1")
+    chunk: List[ImageSource] = []
+    size = 0
+    for source in sources:
+        full = max_images is not None and len(chunk) >= max_images
+        too_big = max_bytes is not None and size + source.encoded_size > max_bytes
+        if chunk and (full or too_big):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(source)
+        size += source.encoded_size
+    if chunk:
+        yield chunk
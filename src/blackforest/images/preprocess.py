@@ -0,0 +1,344 @@
+"""
+Client-side preprocessing of input images before upload.
+
+The expand, fill, canny and depth models accept images of up to 20MB and 20
+megapixels, but work at a far lower resolution. `ImagePreprocessor`
+downscales larger inputs to a megapixel cap, applies the EXIF orientation,
+strips metadata and re-encodes them compactly, which typically shrinks
+uploads several-fold. Decoding and encoding are CPU-bound, so they run in a
+process pool shared by all requests of a client.
+
+Preprocessing changes what is sent: outputs of fill and expand follow the
+size of the (downscaled) input. It is therefore opt-in:
+
+    >>> client = BFLClient(api_key, preprocessor=ImagePreprocessor())
+"""
+
+import base64
+import binascii
+import io
+import math
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from blackforest.images.encoding import FileImage
+
+# The FLUX tools generate at most 1440x1440 pixels, about 2 megapixels
+DEFAULT_MAX_MEGAPIXELS = 2.0
+
+# Input validation rejects images with a side below this
+MIN_SIDE = 256
+
+# Image fields of each model. The first is the primary image: the others
+# are resized to its final dimensions, so masks keep matching it.
+MODEL_IMAGE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "flux-pro-1.0-expand": ("image",),
+    "flux-pro-1.0-fill": ("image", "mask"),
+    "flux-pro-1.0-canny": ("control_image", "preprocessed_image"),
+    "flux-pro-1.0-depth": ("control_image", "preprocessed_image"),
+}
+
+# Fields holding masks, which are resampled without blending and kept
+# lossless
+MASK_FIELDS = {"mask"}
+
+# Expansion margins, in pixels of the input image
+_EXPAND_FIELDS = ("top", "bottom", "left", "right")
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """What the worker processes do to every image."""
+
+    max_megapixels: float = DEFAULT_MAX_MEGAPIXELS
+    format: str = "JPEG"
+    quality: int = 90
+    strip_metadata: bool = True
+
+
+@dataclass(frozen=True)
+class ProcessedImage:
+    """Result of preprocessing one image."""
+
+    data: str
+    size: Tuple[int, int]
+    original_size: Tuple[int, int]
+    original_bytes: int
+
+    @property
+    def scale(self) -> float:
+        """Linear scale factor; EXIF rotation may have swapped the sides."""
+        width, height = self.size
+        original_width, original_height = self.original_size
+        return math.sqrt(width * height / (original_width * original_height))
+
+
+def image_source(value: Any) -> Optional[Tuple[str, str]]:
+    """
+    Where an input image value comes from: ("path", file path) or
+    ("base64", encoded image). None for URLs and non-image values.
+    """
+    if isinstance(value, FileImage):
+        return ("path", value.path)
+    if not isinstance(value, str) or not value:
+        return None
+    if value.startswith(("http://", "https://")):
+        return None
+    if len(value) < 4096 and os.path.isfile(value):
+        return ("path", value)
+    return ("base64", value)
+
+
+def load_source(source: Tuple[str, str]) -> bytes:
+    """The bytes of an image source returned by `image_source`."""
+    kind, value = source
+    if kind == "path":
+        with open(value, "rb") as f:
+            return f.read()
+    return base64.b64decode(value)
+
+
+def _target_size(
+    size: Tuple[int, int], max_megapixels: float
+) -> Optional[Tuple[int, int]]:
+    """Dimensions to downscale to, or None if the image is small enough."""
+    width, height = size
+    scale = math.sqrt(max_megapixels * 1e6 / (width * height))
+    # Never below the minimum side the API accepts
+    scale = max(scale, MIN_SIDE / min(width, height))
+    if scale >= 1:
+        return None
+    # Rounded down, so the result never exceeds the cap
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+def _has_metadata(image: Image.Image) -> bool:
+    if any(image.info.get(key) for key in ("exif", "icc_profile", "xmp", "comment")):
+        return True
+    # Text chunks of PNGs
+    return bool(getattr(image, "text", None))
+
+
+def _encode(image: Image.Image, mask: bool, options: PreprocessOptions) -> bytes:
+    out = io.BytesIO()
+    kwargs: Dict[str, Any] = {}
+    if not options.strip_metadata:
+        for key in ("exif", "icc_profile"):
+            if image.info.get(key):
+                kwargs[key] = image.info[key]
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if mask or has_alpha or options.format.upper() == "PNG":
+        # Masks and alpha channels must survive exactly
+        if image.mode == "P" or (has_alpha and image.mode not in ("RGBA", "LA")):
+            image = image.convert("RGBA")
+        # The default zlib level; `optimize` costs seconds per image for a few
+        # percent
+        image.save(out, format="PNG", **kwargs)
+    else:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(
+            out,
+            format=options.format,
+            quality=options.quality,
+            optimize=True,
+            **kwargs,
+        )
+    return out.getvalue()
+
+
+def preprocess_image(
+    source: Tuple[str, str],
+    options: PreprocessOptions,
+    mask: bool = False,
+    size: Optional[Tuple[int, int]] = None,
+) -> ProcessedImage:
+    """
+    Downscale and re-encode one image.
+
+    Args:
+        source: ("path", file path) or ("base64", encoded image)
+        options: Resolution cap and output encoding
+        mask: Resample without blending and encode losslessly
+        size: Exact output dimensions, overriding the megapixel cap
+
+    Returns:
+        The processed image. When the image needs no resizing and carries no
+        metadata, the original is kept if re-encoding does not make it
+        smaller.
+    """
+    data = load_source(source)
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    original_size = image.size
+    stripped = options.strip_metadata and _has_metadata(image)
+
+    # Pixels are stored unrotated with an orientation tag; apply it so the
+    # image still looks the same without its metadata
+    image = ImageOps.exif_transpose(image)
+    target = (
+        size if size is not None else _target_size(image.size, options.max_megapixels)
+    )
+    resized = target is not None and target != image.size
+    if resized:
+        resample = Image.Resampling.NEAREST if mask else Image.Resampling.LANCZOS
+        image = image.resize(target, resample, reducing_gap=None if mask else 3.0)
+
+    encoded = _encode(image, mask, options)
+    if not resized and not stripped and len(encoded) >= len(data):
+        encoded = data
+    return ProcessedImage(
+        data=base64.b64encode(encoded).decode("ascii"),
+        size=image.size,
+        original_size=original_size,
+        original_bytes=len(data),
+    )
+
+
+def _preprocess_group(
+    sources: List[Tuple[str, Tuple[str, str]]], options: PreprocessOptions
+) -> Dict[str, ProcessedImage]:
+    """
+    Preprocess the images of one request. The first is the primary image;
+    the others get its final dimensions.
+    """
+    results: Dict[str, ProcessedImage] = {}
+    size = None
+    for field, source in sources:
+        results[field] = preprocess_image(
+            source, options, mask=field in MASK_FIELDS, size=size
+        )
+        if size is None:
+            size = results[field].size
+    return results
+
+
+class ImagePreprocessor:
+    """
+    Downscales and re-encodes the input images of supported models before
+    they are validated and uploaded.
+
+    Images may be given as base64 strings or, with a preprocessor, as local
+    file paths. Work runs in a process pool started on first use; pass
+    `processes=0` to work in the calling thread instead.
+
+    Examples:
+        >>> preprocessor = ImagePreprocessor(max_megapixels=1.0, quality=85)
+        >>> client = BFLClient(api_key, preprocessor=preprocessor)
+        >>> client.generate("flux-pro-1.0-canny", {
+        ...     "prompt": "a watercolor city",
+        ...     "control_image": "photos/city-48mp.jpg",
+        ... })
+    """
+
+    def __init__(
+        self,
+        max_megapixels: float = DEFAULT_MAX_MEGAPIXELS,
+        format: str = "JPEG",
+        quality: int = 90,
+        strip_metadata: bool = True,
+        processes: Optional[int] = None,
+        models: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ):
+        """
+        Args:
+            max_megapixels: Larger images are downscaled to this many
+                megapixels, keeping their aspect ratio
+            format: Pillow format of re-encoded images without alpha.
+                Masks and images with alpha are always PNG.
+            quality: Quality of lossy formats
+            strip_metadata: Drop EXIF, XMP, ICC and text metadata
+            processes: Size of the process pool; None for one per CPU, 0 to
+                work in the calling thread
+            models: Image fields per model (default: expand, fill, canny and
+                depth)
+        """
+        if max_megapixels <= 0:
+            raise ValueError("max_megapixels must be positive")
+        self.options = PreprocessOptions(
+            max_megapixels=max_megapixels,
+            format=format,
+            quality=quality,
+            strip_metadata=strip_metadata,
+        )
+        self.processes = processes
+        self.models = dict(MODEL_IMAGE_FIELDS if models is None else models)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _pool(self) -> Optional[Executor]:
+        if self.processes == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.processes)
+            return self._executor
+
+    def close(self) -> None:
+        """Shut the process pool down."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self) -> "ImagePreprocessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Bytes of the images received and produced so far."""
+        with self._stats_lock:
+            return {"bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    def process(self, model: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return `inputs` with the images of `model` preprocessed. Inputs of
+        other models are returned unchanged.
+
+        Raises:
+            ValueError: If an image cannot be read
+        """
+        fields = self.models.get(model)
+        if not fields:
+            return inputs
+        sources = [
+            (field, source)
+            for field in fields
+            if (source := image_source(inputs.get(field))) is not None
+        ]
+        if not sources:
+            return inputs
+
+        pool = self._pool()
+        try:
+            if pool is None:
+                results = _preprocess_group(sources, self.options)
+            else:
+                results = pool.submit(_preprocess_group, sources, self.options).result()
+        except (OSError, binascii.Error, Image.DecompressionBombError) as e:
+            raise ValueError(f"Cannot preprocess input image: {e}") from e
+
+        processed = dict(inputs)
+        for field, result in results.items():
+            processed[field] = result.data
+        with self._stats_lock:
+            self.bytes_in += sum(r.original_bytes for r in results.values())
+            self.bytes_out += sum(len(r.data) * 3 // 4 for r in results.values())
+
+        # Expansion margins are in pixels of the input, so they scale with it
+        primary = results[sources[0][0]]
+        if model == "flux-pro-1.0-expand" and primary.size != primary.original_size:
+            for field in _EXPAND_FIELDS:
+                if processed.get(field):
+                    processed[field] = round(processed[field] * primary.scale)
+        return processed
@@ -0,0 +1,249 @@
+"""
+Header-only probing of base64-encoded images.
+
+Checking an input image only needs its dimensions, which PNG, JPEG, WebP and
+GIF store near the start of the file. `probe_image` decodes just enough
+leading base64 to parse the header (plus the last quantum to check the
+padding), so the cost does not grow with the size of the image. Other formats,
+and inputs that are not plain unwrapped base64, fall back to decoding the
+whole payload with Pillow.
+
+Results are cached per payload, so validating the same image again (for
+instance in several models, or for every prompt of a batch) is free.
+"""
+
+import base64
+import binascii
+import io
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Decoded bytes tried first, and the most a header search may decode before
+# giving up and falling back to a full decode
+_INITIAL_PREFIX = 64
+_MAX_PREFIX = 4 * 1024 * 1024
+
+_CACHE_SIZE = 1024
+
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+_JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+# Start-of-frame markers carry the dimensions; C4, C8 and CC are not frames
+_JPEG_SOF = {0xC0 + i for i in range(16)} - {0xC4, 0xC8, 0xCC}
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """Dimensions and pixel mode read from an image header."""
+
+    width: int
+    height: int
+    mode: str
+    format: str
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+
+class _NeedMore(Exception):
+    """The header extends past the decoded prefix."""
+
+
+def _parse_png(data: bytes) -> ImageInfo:
+    if len(data) < 26:
+        raise _NeedMore
+    if data[12:16] != b"IHDR":
+        raise ValueError("PNG without IHDR chunk")
+    width, height = struct.unpack(">II", data[16:24])
+    return ImageInfo(width, height, _PNG_MODES.get(data[25], "RGB"), "PNG")
+
+
+def _parse_jpeg(data: bytes) -> ImageInfo:
+    pos = 2
+    while True:
+        if pos >= len(data):
+            raise _NeedMore
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        # Skip fill bytes before the marker
+        while pos < len(data) and data[pos] == 0xFF:
+            pos += 1
+        if pos >= len(data):
+            raise _NeedMore
+        marker = data[pos]
+        pos += 1
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            # Standalone markers have no length
+            continue
+        if pos + 2 > len(data):
+            raise _NeedMore
+        (length,) = struct.unpack(">H", data[pos : pos + 2])
+        if marker in _JPEG_SOF:
+            if pos + 8 > len(data):
+                raise _NeedMore
+            height, width = struct.unpack(">HH", data[pos + 3 : pos + 7])
+            mode = _JPEG_MODES.get(data[pos + 7], "RGB")
+            return ImageInfo(width, height, mode, "JPEG")
+        if marker == 0xDA or length < 2:
+            raise ValueError("JPEG without frame header")
+        pos += length
+
+
+def _parse_webp(data: bytes) -> ImageInfo:
+    if len(data) < 30:
+        raise _NeedMore
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return ImageInfo(width & 0x3FFF, height & 0x3FFF, "RGB", "WEBP")
+    if chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+        mode = "RGBA" if bits >> 28 & 1 else "RGB"
+        return ImageInfo(width, height, mode, "WEBP")
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        mode = "RGBA" if data[20] & 0x10 else "RGB"
+        return ImageInfo(width, height, mode, "WEBP")
+    raise ValueError("Unknown WebP chunk")
+
+
+def _parse_gif(data: bytes) -> ImageInfo:
+    if len(data) < 10:
+        raise _NeedMore
+    width, height = struct.unpack("<HH", data[6:10])
+    return ImageInfo(width, height, "P", "GIF")
+
+
+def _parse_header(data: bytes) -> Optional[ImageInfo]:
+    """Parse dimensions from leading bytes; None if the format is unknown."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _parse_png(data)
+    if data.startswith(b"\xff\xd8"):
+        return _parse_jpeg(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _parse_webp(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return _parse_gif(data)
+    if len(data) < 12:
+        raise _NeedMore
+    return None
+
+
+def _probe_header(image: str) -> Optional[ImageInfo]:
+    """Try the header-only path. None means a full decode is needed."""
+    if len(image) % 4:
+        return None
+    try:
+        # The final quantum carries the padding, so decoding it catches
+        # truncated payloads without looking at the middle
+        base64.b64decode(image[-4:], validate=True)
+        prefix = _INITIAL_PREFIX
+        while True:
+            chars = min(len(image), -(-prefix // 3) * 4)
+            data = base64.b64decode(image[:chars], validate=True)
+            try:
+                return _parse_header(data)
+            except _NeedMore:
+                if chars == len(image) or prefix >= _MAX_PREFIX:
+                    return None
+                prefix *= 16
+    except (binascii.Error, ValueError, struct.error):
+        return None
+
+
+def _probe_full(image: str) -> ImageInfo:
+    """Decode the whole payload and let Pillow read it."""
+    from PIL import Image
+
+    data = base64.b64decode(image)
+    img = Image.open(io.BytesIO(data))
+    return ImageInfo(img.width, img.height, img.mode, img.format or "")
+
+
+class _InfoCache:
+    """Small thread-safe LRU of probe results."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[int, int], ImageInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int]) -> Optional[ImageInfo]:
+        with self._lock:
+            info = self._entries.get(key)
+            if info is not None:
+                self._entries.move_to_end(key)
+            return info
+
+    def put(self, key: Tuple[int, int], info: ImageInfo) -> None:
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _InfoCache(_CACHE_SIZE)
+
+
+def _cache_key(image: str) -> Tuple[int, int]:
+    # str hashes are computed once and stored on the object, so looking up
+    # the same payload again is O(1) and the payload itself is not retained
+    return len(image), hash(image)
+
+
+def probe_image(image: str) -> ImageInfo:
+    """
+    Read the dimensions of a base64-encoded image.
+
+    Args:
+        image: Base64-encoded image data
+
+    Returns:
+        ImageInfo with the width, height, mode and format of the image
+
+    Raises:
+        binascii.Error: If the payload is not valid base64
+        Exception: If the image cannot be read
+    """
+    key = _cache_key(image)
+    info = _cache.get(key)
+    if info is None:
+        info = _probe_header(image) or _probe_full(image)
+        _cache.put(key, info)
+    return info
+
+
+def is_base64(value: str) -> bool:
+    """
+    Cheaply check that `value` looks like base64 data.
+
+    Like `probe_image`, only the start and the end of the payload are decoded
+    when the payload is plain unwrapped base64.
+    """
+    if _cache.get(_cache_key(value)) is not None:
+        return True
+    try:
+        if len(value) % 4 == 0:
+            base64.b64decode(value[:4096], validate=True)
+            base64.b64decode(value[-4:], validate=True)
+        else:
+            base64.b64decode(value)
+        return True
+    except (binascii.Error, ValueError):
+        return False
+
+
+def clear_cache() -> None:
+    """Forget all cached probe results."""
+    _cache.clear()
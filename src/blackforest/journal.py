@@ -0,0 +1,255 @@
+"""
+Durable journal of submitted tasks, for resuming them after a restart.
+
+Every state change of a task is appended as one JSON line, so writes never
+rewrite earlier data and a crash can at worst lose the line being written.
+On open the journal is replayed to rebuild the latest state of every task;
+tasks still pending can then be re-attached to a poller with
+`BFLClient.resume()` instead of being generated again.
+
+Only the most recently finished tasks are remembered, and the file is
+compacted automatically once most of its lines describe forgotten or
+superseded states, so a long-running process keeps memory and disk use
+bounded.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from blackforest.images.cache import file_key
+from blackforest.images.encoding import FileImage
+
+# Status of tasks submitted but not known to be finished
+PENDING = "Pending"
+
+# Finished tasks remembered by default; older ones are forgotten
+DEFAULT_MAX_FINISHED = 10_000
+
+# Lines the file may hold beyond two per remembered task before compaction
+_COMPACT_SLACK = 1_000
+
+
+@dataclass(frozen=True)
+class TaskRecord:
+    """Latest known state of a journaled task."""
+
+    task_id: str
+    status: str = PENDING
+    model: Optional[str] = None
+    polling_url: Optional[str] = None
+    input_hash: Optional[str] = None
+    submitted_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.status == PENDING
+
+
+_FIELDS = {f.name for f in fields(TaskRecord)}
+
+
+def _hash_default(value: Any) -> Any:
+    if isinstance(value, FileImage):
+        # Streamed files are identified by path, modification time and size
+        return list(file_key(value.path))
+    return str(value)
+
+
+def input_hash(model: str, payload: Dict[str, Any]) -> str:
+    """Stable hash of a model and its request payload."""
+    data = json.dumps(
+        [model, payload], sort_keys=True, separators=(",", ":"), default=_hash_default
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class TaskJournal:
+    """
+    Append-only JSONL record of submitted tasks and their final status.
+
+    Thread-safe; a journal is meant to be owned by one process at a time.
+
+    Examples:
+        >>> journal = TaskJournal("tasks.jsonl")
+        >>> client = BFLClient(api_key, journal=journal)
+        >>> handles = client.resume()  # tasks left pending by the last run
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        fsync: bool = False,
+        max_finished: Optional[int] = DEFAULT_MAX_FINISHED,
+    ):
+        """
+        Args:
+            path: Journal file, created if missing
+            fsync: Force every entry to disk before returning. Without it
+                entries survive a process crash but not a power loss.
+            max_finished: Finished tasks to remember; the oldest ones are
+                forgotten beyond it (None keeps them all)
+        """
+        if max_finished is not None and max_finished < 0:
+            raise ValueError("max_finished must not be negative")
+        self.path = Path(path)
+        self.fsync = fsync
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._records: Dict[str, TaskRecord] = {}
+        # Ids of the finished records, oldest first
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        # Lines in the file, to decide when to compact it
+        self._lines = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                self._lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash
+                    continue
+                if isinstance(entry, dict) and entry.get("task_id"):
+                    self._apply(entry)
+
+    def _apply(self, entry: Dict[str, Any]) -> TaskRecord:
+        entry = {k: v for k, v in entry.items() if k in _FIELDS}
+        record = self._records.get(entry["task_id"])
+        if record is None:
+            record = TaskRecord(**entry)
+        else:
+            record = replace(record, **entry)
+        self._records[record.task_id] = record
+        if record.pending:
+            self._finished.pop(record.task_id, None)
+        else:
+            self._finished[record.task_id] = None
+            self._finished.move_to_end(record.task_id)
+            if self.max_finished is not None:
+                while len(self._finished) > self.max_finished:
+                    task_id, _ = self._finished.popitem(last=False)
+                    del self._records[task_id]
+        return record
+
+    def _append(self, entry: Dict[str, Any]) -> TaskRecord:
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file.closed:
+                raise ValueError("TaskJournal is closed")
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._lines += 1
+            record = self._apply(entry)
+            if self._lines > 2 * len(self._records) + _COMPACT_SLACK:
+                self._compact(keep_finished=True)
+            return record
+
+    def submitted(
+        self,
+        task_id: str,
+        model: Optional[str] = None,
+        polling_url: Optional[str] = None,
+        input_hash: Optional[str] = None,
+    ) -> TaskRecord:
+        """Record a newly submitted task."""
+        now = time.time()
+        return self._append(
+            {
+                "task_id": task_id,
+                "status": PENDING,
+                "model": model,
+                "polling_url": polling_url,
+                "input_hash": input_hash,
+                "submitted_at": now,
+                "updated_at": now,
+            }
+        )
+
+    def finished(self, task_id: str, status: str) -> Optional[TaskRecord]:
+        """Record the final status of a task. Unknown tasks are ignored."""
+        with self._lock:
+            record = self._records.get(task_id)
+        if record is None or record.status == status:
+            return record
+        return self._append(
+            {"task_id": task_id, "status": status, "updated_at": time.time()}
+        )
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        """Latest state of a task, if journaled."""
+        with self._lock:
+            return self._records.get(task_id)
+
+    def find(self, input_hash: str) -> List[TaskRecord]:
+        """Tasks submitted with the given input hash, oldest first."""
+        with self._lock:
+            return [r for r in self._records.values() if r.input_hash == input_hash]
+
+    def pending(self) -> List[TaskRecord]:
+        """Tasks submitted but not known to be finished, oldest first."""
+        with self._lock:
+            return [r for r in self._records.values() if r.pending]
+
+    def __iter__(self) -> Iterator[TaskRecord]:
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def compact(self, keep_finished: bool = False) -> None:
+        """
+        Rewrite the journal with one line per task.
+
+        Args:
+            keep_finished: Also keep finished tasks (by default only pending
+                ones are kept)
+        """
+        with self._lock:
+            self._compact(keep_finished)
+
+    def _compact(self, keep_finished: bool) -> None:
+        """Rewrite the journal. Must hold the lock."""
+        records = [r for r in self._records.values() if keep_finished or r.pending]
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(asdict(record), separators=(",", ":")))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._records = {r.task_id: r for r in records}
+        if not keep_finished:
+            self._finished.clear()
+        self._lines = len(records)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "TaskJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
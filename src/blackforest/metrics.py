@@ -0,0 +1,213 @@
+"""
+Instrumentation of requests, polls, tasks and transfers.
+
+Clients report what they do as metric events to an `Instrumentation`, which
+fans them out to any number of sinks. By default events go to the
+"blackforest.metrics" logger at DEBUG level; other backends (Prometheus,
+OpenTelemetry, StatsD, ...) plug in with a `CallbackSink` or a `MetricsSink`
+subclass.
+
+Events emitted by the clients:
+
+    http.request.duration        seconds   method, endpoint, status
+    http.retry                   1         method, endpoint, reason
+    http.upload.bytes            bytes     endpoint
+    generation.validation.duration seconds model, outcome
+    image.preprocess.duration    seconds   model, outcome
+    image.control.duration       seconds   model, outcome
+    generation.submit.duration   seconds   model, outcome
+    task.ready.duration          seconds   model, status   (submit to final)
+    task.polls                   count     model, status
+    download.duration            seconds   status
+    download.bytes               bytes     status
+
+`endpoint` is "submit", "poll" or "usage"; `status` of HTTP events is the
+response status code, or "error" when no response was received. `outcome` is
+"ok", or "error" when the step raised.
+"""
+
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Observations kept per series by InMemorySink, for percentiles
+DEFAULT_MAX_SAMPLES = 10_000
+
+
+@dataclass(frozen=True)
+class MetricEvent:
+    """A single measurement."""
+
+    name: str
+    value: float
+    tags: Mapping[str, str] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+class MetricsSink(ABC):
+    """Receives metric events. Subclasses implement `emit`."""
+
+    @abstractmethod
+    def emit(self, event: MetricEvent) -> None:
+        """Record one event."""
+
+
+class LoggingSink(MetricsSink):
+    """Writes events to a logger, formatted as `name value key=value ...`."""
+
+    def __init__(self, logger: logging.Logger = logger, level: int = logging.DEBUG):
+        self.logger = logger
+        self.level = level
+
+    def emit(self, event: MetricEvent) -> None:
+        if self.logger.isEnabledFor(self.level):
+            tags = " ".join(f"{k}={v}" for k, v in sorted(event.tags.items()))
+            self.logger.log(self.level, "%s %g %s", event.name, event.value, tags)
+
+
+class CallbackSink(MetricsSink):
+    """
+    Forwards events to a function, the simplest way to adapt a backend.
+
+    Examples:
+        >>> histogram = prometheus_client.Histogram(
+        ...     "bfl_task_ready_seconds", "Submit to ready", ["model"]
+        ... )
+        >>> def export(event):
+        ...     if event.name == "task.ready.duration":
+        ...         histogram.labels(event.tags["model"]).observe(event.value)
+        >>> client = BFLClient(api_key, instrumentation=Instrumentation([
+        ...     CallbackSink(export)
+        ... ]))
+    """
+
+    def __init__(self, callback: Callable[[MetricEvent], None]):
+        self.callback = callback
+
+    def emit(self, event: MetricEvent) -> None:
+        self.callback(event)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    index = max(0, math.ceil(q * len(ordered)) - 1)
+    return ordered[index]
+
+
+class InMemorySink(MetricsSink):
+    """
+    Aggregates events in memory, for inspection and tests.
+
+    The last `max_samples` values of every series (event name plus tags) are
+    kept for percentiles; counts and sums cover all events.
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, Tuple], Deque[float]] = {}
+        self._totals: Dict[Tuple[str, Tuple], List[float]] = {}
+
+    def emit(self, event: MetricEvent) -> None:
+        series = (event.name, tuple(sorted(event.tags.items())))
+        with self._lock:
+            samples = self._samples.get(series)
+            if samples is None:
+                samples = self._samples[series] = deque(maxlen=self.max_samples)
+                self._totals[series] = [0, 0.0]
+            samples.append(event.value)
+            totals = self._totals[series]
+            totals[0] += 1
+            totals[1] += event.value
+
+    def _matching(self, name: str, tags: Mapping[str, str]) -> Iterator[Tuple]:
+        for series in self._samples:
+            series_name, series_tags = series
+            if series_name == name and tags.items() <= dict(series_tags).items():
+                yield series
+
+    def summary(self, name: str, **tags: str) -> Dict[str, float]:
+        """
+        Count, sum, mean and percentiles of an event, across every series
+        whose tags include `tags`.
+        """
+        with self._lock:
+            series = list(self._matching(name, tags))
+            values = sorted(v for s in series for v in self._samples[s])
+            count = sum(self._totals[s][0] for s in series)
+            total = sum(self._totals[s][1] for s in series)
+        if not count:
+            return {"count": 0, "sum": 0.0}
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count,
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+
+    def histogram(self, name: str, tag: str) -> Counter:
+        """Number of events per value of `tag`, eg HTTP status codes."""
+        counts: Counter = Counter()
+        with self._lock:
+            for (series_name, series_tags), totals in self._totals.items():
+                tags = dict(series_tags)
+                if series_name == name and tag in tags:
+                    counts[tags[tag]] += totals[0]
+        return counts
+
+
+class Instrumentation:
+    """
+    Dispatches metric events to sinks.
+
+    A failing sink is logged and skipped, so instrumentation never breaks a
+    request.
+    """
+
+    def __init__(self, sinks: Iterable[MetricsSink] = (), log: bool = True):
+        """
+        Args:
+            sinks: Sinks receiving every event
+            log: Also send events to the "blackforest.metrics" logger
+        """
+        self.sinks: List[MetricsSink] = list(sinks)
+        if log:
+            self.sinks.append(LoggingSink())
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        self.sinks.append(sink)
+
+    def emit(self, name: str, value: float = 1, **tags: object) -> None:
+        """Send an event to every sink."""
+        if not self.sinks:
+            return
+        event = MetricEvent(name, value, {k: str(v) for k, v in tags.items()})
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception:
+                logger.exception("Metrics sink %r failed", sink)
+
+    @contextmanager
+    def timer(self, name: str, **tags: object) -> Iterator[None]:
+        """
+        Emit the duration of the block, in seconds, when it exits. The event
+        is tagged `outcome` "ok", or "error" if the block raised.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.emit(name, time.perf_counter() - start, outcome=outcome, **tags)
@@ -0,0 +1,378 @@
+"""
+Pipelined generation: encode, submit, poll and download in overlapping stages.
+
+Each stage runs in its own threads and hands items to the next one through a
+bounded queue, so a slow stage pushes back on the ones before it instead of
+letting work pile up in memory:
+
+    inputs -> encode -> submit -> poll -> download -> results
+
+Polling is multiplexed by a single TaskPoller and downloads go through a
+Downloader, so polls and downloads of different items overlap with the
+encoding and submission of later ones.
+"""
+
+import itertools
+import queue
+import threading
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from blackforest.download import Downloader
+from blackforest.polling.poller import TaskPoller
+from blackforest.types.base.output_format import OutputFormat
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.responses.responses import (
+    DownloadResult,
+    PipelineResult,
+    TaskResult,
+)
+
+if TYPE_CHECKING:
+    from blackforest.client import BFLClient
+
+# How often blocked stage threads check whether the pipeline was stopped
+_CHECK_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class GenerationPipeline:
+    """
+    Runs many generations through encode/submit/poll/download stages.
+
+    Examples:
+        >>> pipeline = GenerationPipeline(client, "flux-pro-1.1", output_dir="out")
+        >>> for result in pipeline.run({"prompt": p} for p in prompts):
+        ...     print(result.index, result.path if result.ok else result.error)
+    """
+
+    def __init__(
+        self,
+        client: "BFLClient",
+        model: str,
+        config: Optional[ClientConfig] = None,
+        output_dir: Optional[Union[str, Path]] = None,
+        output_format: Optional[OutputFormat] = None,
+        encode_workers: int = 2,
+        submit_workers: int = 4,
+        download_workers: int = 4,
+        max_polling: int = 32,
+        queue_size: int = 8,
+        track_usage: bool = False,
+    ):
+        """
+        Args:
+            client: Client used for all API calls
+            model: Model to generate with, eg "flux-pro-1.1"
+            config: Polling behaviour (`sync` is ignored)
+            output_dir: Directory to write images to. When omitted the image
+                bytes are returned in `PipelineResult.content`.
+            output_format: Expected image format, checked on download
+            encode_workers: Threads validating and encoding inputs
+            submit_workers: Threads submitting generation requests
+            download_workers: Concurrent downloads
+            max_polling: Maximum tasks submitted but not yet finished
+            queue_size: Capacity of each queue between stages
+            track_usage: Whether to track usage for licensed models
+        """
+        for name, value in (
+            ("encode_workers", encode_workers),
+            ("submit_workers", submit_workers),
+            ("download_workers", download_workers),
+            ("max_polling", max_polling),
+            ("queue_size", queue_size),
+        ):
+            if value < 1:
+                raise ValueError(f"{name} must be at least 1")
+        self.client = client
+        self.model = model
+        self.config = config or ClientConfig()
+        self.output_dir = Path(output_dir) if output_dir is not None else None
+        self.output_format = output_format
+        self.encode_workers = encode_workers
+        self.submit_workers = submit_workers
+        self.download_workers = download_workers
+        self.max_polling = max_polling
+        self.queue_size = queue_size
+        self.track_usage = track_usage
+
+    def run(self, inputs: Iterable[Dict[str, Any]]) -> Iterator[PipelineResult]:
+        """
+        Run every input through the pipeline, yielding results as they finish.
+
+        Inputs are consumed lazily, only as fast as the pipeline drains.
+        Closing the iterator early stops all stages.
+
+        Returns:
+            Iterator of PipelineResult in completion order
+        """
+        return _Run(self, inputs).results()
+
+
+class _Run:
+    """State of one `GenerationPipeline.run` call."""
+
+    def __init__(self, pipeline: GenerationPipeline, inputs: Iterable[Dict[str, Any]]):
+        self.p = pipeline
+        self.inputs = inputs
+        self.stop = threading.Event()
+        size = pipeline.queue_size
+        self.encode_q: "queue.Queue" = queue.Queue(size)
+        self.submit_q: "queue.Queue" = queue.Queue(size)
+        self.out_q: "queue.Queue" = queue.Queue(size)
+        self.total: Optional[int] = None
+
+        # Submitted but unfinished tasks are bounded by max_polling, finished
+        # but not yet downloaded ones by queue_size
+        self.polling_slots = threading.Semaphore(pipeline.max_polling)
+        self.download_slots = threading.Semaphore(size)
+        self.poller = TaskPoller(pipeline.client, task_ids=[], config=pipeline.config)
+        # Task ID -> indices of the inputs it serves; identical seeded inputs
+        # share one task through the client's result cache
+        self.task_index: Dict[str, List[int]] = {}
+        self.task_added = threading.Event()
+        self.submitters_done = threading.Event()
+        self.downloader = Downloader(
+            max_workers=pipeline.download_workers,
+            pool_config=pipeline.client.pool_config,
+            instrumentation=pipeline.client.instrumentation,
+        )
+        self.threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._alive = {
+            "encode": pipeline.encode_workers,
+            "submit": pipeline.submit_workers,
+        }
+        self.downloading = 0
+
+    # Blocking queue/semaphore operations that give up once stopped
+
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q: "queue.Queue") -> Any:
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=_CHECK_INTERVAL)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _acquire(self, semaphore: threading.Semaphore) -> bool:
+        while not self.stop.is_set():
+            if semaphore.acquire(timeout=_CHECK_INTERVAL):
+                return True
+        return False
+
+    def _emit(self, result: PipelineResult) -> None:
+        self._put(self.out_q, result)
+
+    def _start(self, target, count: int, name: str) -> None:
+        for _ in range(count):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    # Stages
+
+    def _feed(self) -> None:
+        count = 0
+        try:
+            for index, item in enumerate(self.inputs):
+                if not self._put(self.encode_q, (index, item)):
+                    return
+                count = index + 1
+        except Exception as e:
+            # A failing input iterator ends the run after what was fed so far
+            self._emit(PipelineResult(index=count, error=f"Reading inputs: {e}"))
+            count += 1
+        finally:
+            self.total = count
+            for _ in range(self.p.encode_workers):
+                self._put(self.encode_q, _DONE)
+
+    def _encode(self) -> None:
+        while True:
+            job = self._get(self.encode_q)
+            if job is _DONE:
+                break
+            index, item = job
+            try:
+                payload = self.p.client._prepare_generation_payload(self.p.model, item)
+            except Exception as e:
+                self._emit(PipelineResult(index=index, error=f"Invalid inputs: {e}"))
+                continue
+            if not self._put(self.submit_q, (index, payload)):
+                return
+        with self._lock:
+            self._alive["encode"] -= 1
+            last = self._alive["encode"] == 0
+        if last:
+            for _ in range(self.p.submit_workers):
+                self._put(self.submit_q, _DONE)
+
+    def _submit(self) -> None:
+        submit_config = self.p.config.model_copy(update={"sync": False})
+        while True:
+            job = self._get(self.submit_q)
+            if job is _DONE:
+                break
+            index, payload = job
+            if not self._acquire(self.polling_slots):
+                return
+            try:
+                response = self.p.client._generate_payload(
+                    self.p.model, payload, submit_config, self.p.track_usage
+                )
+            except Exception as e:
+                self.polling_slots.release()
+                self._emit(PipelineResult(index=index, error=str(e)))
+                continue
+            with self._lock:
+                indices = self.task_index.setdefault(response.id, [])
+                indices.append(index)
+                polled = len(indices) > 1
+            if polled:
+                # Already being polled for an earlier input
+                self.polling_slots.release()
+                continue
+            self.poller.add(response.id, response.polling_url, self.p.model)
+            self.task_added.set()
+        with self._lock:
+            self._alive["submit"] -= 1
+            if self._alive["submit"] == 0:
+                self.submitters_done.set()
+                self.task_added.set()
+
+    def _poll(self) -> None:
+        while not self.stop.is_set():
+            self.task_added.clear()
+            finished = self.poller.poll_next()
+            if finished is None:
+                if self.submitters_done.is_set() and len(self.poller) == 0:
+                    return
+                self.task_added.wait(_CHECK_INTERVAL)
+                continue
+            self.polling_slots.release()
+            with self._lock:
+                indices = self.task_index.pop(finished.id)
+            self._download(indices, finished)
+
+    def _download(self, indices: List[int], task: TaskResult) -> None:
+        """Download a finished task once, for every input it serves."""
+        if not task.ok:
+            error = task.error or f"Task ended with status {task.status}"
+            for index in indices:
+                self._emit(PipelineResult(index=index, id=task.id, error=error))
+            return
+        if not self._acquire(self.download_slots):
+            return
+        dest = None
+        if self.p.output_dir is not None:
+            extension = Downloader._extension(
+                task.result.get("sample", "") if task.result else "",
+                self.p.output_format,
+            )
+            dest = self.p.output_dir / f"{task.id}{extension}"
+        with self._lock:
+            self.downloading += 1
+        try:
+            future = self.downloader.submit(task, dest, self.p.output_format)
+        except Exception as e:
+            self._download_finished()
+            for index in indices:
+                self._emit(PipelineResult(index=index, id=task.id, error=str(e)))
+            return
+
+        def done(future) -> None:
+            try:
+                download: DownloadResult = future.result()
+                results = [
+                    PipelineResult(
+                        index=index,
+                        id=task.id,
+                        path=download.path,
+                        content=download.content,
+                        error=download.error,
+                    )
+                    for index in indices
+                ]
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                results = [
+                    PipelineResult(index=index, id=task.id, error=error)
+                    for index in indices
+                ]
+            # The slot is held until the results are handed on, so a slow
+            # consumer stalls the downloads too
+            try:
+                for result in results:
+                    self._emit(result)
+            finally:
+                self._download_finished()
+
+        future.add_done_callback(done)
+
+    def _download_finished(self) -> None:
+        self.download_slots.release()
+        with self._lock:
+            self.downloading -= 1
+
+    def results(self) -> Iterator[PipelineResult]:
+        if self.p.output_dir is not None:
+            self.p.output_dir.mkdir(parents=True, exist_ok=True)
+        self._start(self._feed, 1, "bfl-pipeline-feed")
+        self._start(self._encode, self.p.encode_workers, "bfl-pipeline-encode")
+        self._start(self._submit, self.p.submit_workers, "bfl-pipeline-submit")
+        self._start(self._poll, 1, "bfl-pipeline-poll")
+        try:
+            for yielded in itertools.count():
+                if self.total is not None and yielded >= self.total:
+                    return
+                result = self._get_result()
+                if result is None:
+                    return
+                yield result
+        finally:
+            self.stop.set()
+            for task_id in list(self.task_index):
+                self.poller.discard(task_id)
+            # Nobody will read the queued downloads any more
+            self.downloader.close(cancel_futures=True)
+
+    def _stalled(self) -> bool:
+        with self._lock:
+            if self.downloading:
+                return False
+        return self.total is not None and not any(
+            t.is_alive() for t in self.threads
+        )
+
+    def _get_result(self) -> Optional[PipelineResult]:
+        while True:
+            try:
+                return self.out_q.get(timeout=_CHECK_INTERVAL)
+            except queue.Empty:
+                if self._stalled():
+                    # Nothing can produce more results; anything left is
+                    # already queued
+                    try:
+                        return self.out_q.get_nowait()
+                    except queue.Empty:
+                        return None
@@ -0,0 +1,186 @@
+"""
+Future-based handles for submitted tasks, resolved by a background poller.
+
+A `TaskHandle` is a `concurrent.futures.Future`, so the standard library's
+`wait()` and `as_completed()` work across handles, callbacks run when a task
+finishes and `result(timeout)` bounds the wait. Handles can also be awaited
+from asyncio code.
+
+All handles of a `BackgroundPoller` share one polling thread driving a
+`TaskPoller`, so thousands of outstanding tasks cost one thread and one
+request at a time.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, Generator, Optional
+
+from blackforest.polling.poller import TaskPoller
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.responses.responses import TaskResult
+
+if TYPE_CHECKING:
+    from blackforest.client import BFLClient
+
+
+class TaskHandle(Future):
+    """
+    Future resolved with the final TaskResult of a submitted task.
+
+    Failed and timed out tasks resolve normally, with `TaskResult.ok` False.
+    Cancelling a handle stops polling its task; the task itself keeps running
+    on the API side.
+
+    Examples:
+        >>> handles = [client.submit("flux-dev", {"prompt": p}) for p in prompts]
+        >>> for handle in concurrent.futures.as_completed(handles, timeout=300):
+        ...     print(handle.id, handle.result().status)
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        polling_url: Optional[str],
+        model: Optional[str],
+        poller: "BackgroundPoller",
+    ):
+        super().__init__()
+        self.id = task_id
+        self.polling_url = polling_url
+        self.model = model
+        self._poller = poller
+
+    def cancel(self) -> bool:
+        """Stop polling the task. Returns False if it already finished."""
+        if not super().cancel():
+            return False
+        self._poller._forget(self.id)
+        return True
+
+    def __await__(self) -> Generator[Any, None, TaskResult]:
+        return asyncio.wrap_future(self).__await__()
+
+    def __repr__(self) -> str:
+        return f"<TaskHandle id={self.id!r} state={self._state}>"
+
+
+class BackgroundPoller:
+    """
+    Resolves TaskHandles from a single, lazily started polling thread.
+
+    The thread exits after `idle_timeout` seconds without pending tasks and is
+    restarted by the next `track()` call.
+    """
+
+    def __init__(
+        self,
+        client: "BFLClient",
+        config: Optional[ClientConfig] = None,
+        max_requests_per_second: Optional[float] = None,
+        idle_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            client: Client used to issue the polling requests
+            config: Polling behaviour (strategy, per-task timeout, max polls)
+            max_requests_per_second: Upper bound on the polling request rate
+            idle_timeout: Seconds the polling thread lingers with no tasks
+        """
+        self.client = client
+        self.idle_timeout = idle_timeout
+        self.poller = TaskPoller(
+            client,
+            task_ids=[],
+            config=config,
+            max_requests_per_second=max_requests_per_second,
+        )
+        self._handles: Dict[str, TaskHandle] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._handles)
+
+    def track(
+        self,
+        task_id: str,
+        polling_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> TaskHandle:
+        """
+        Start polling a task in the background.
+
+        Args:
+            task_id: The task to poll
+            polling_url: Polling URL returned at submission (optional)
+            model: Model the task was submitted to (optional)
+
+        Returns:
+            Handle resolved when the task finishes. Tracking a task twice
+            returns the same handle.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BackgroundPoller is closed")
+            handle = self._handles.get(task_id)
+            if handle is not None:
+                return handle
+            handle = TaskHandle(task_id, polling_url, model, self)
+            self._handles[task_id] = handle
+            self.poller.add(task_id, polling_url, model)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="bfl-background-poller", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def _forget(self, task_id: str) -> None:
+        with self._cond:
+            self._handles.pop(task_id, None)
+        if self.poller.discard(task_id):
+            # Only polling stops; the task stays pending in the journal
+            self.client._task_done(task_id)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                finished = self.poller.poll_next()
+                if finished is None:
+                    with self._cond:
+                        self._cond.wait_for(
+                            lambda: len(self.poller) or self._closed,
+                            self.idle_timeout,
+                        )
+                        if self._closed or not len(self.poller):
+                            self._thread = None
+                            return
+                    continue
+                with self._cond:
+                    handle = self._handles.pop(finished.id, None)
+                if handle is not None and handle.set_running_or_notify_cancel():
+                    handle.set_result(finished)
+        except BaseException as e:
+            # Nothing resolves the handles once the thread is gone
+            with self._cond:
+                handles = list(self._handles.values())
+                self._handles.clear()
+                self._thread = None
+            for handle in handles:
+                self.poller.discard(handle.id)
+                if handle.set_running_or_notify_cancel():
+                    handle.set_exception(e)
+            raise
+
+    def close(self) -> None:
+        """Stop polling and cancel every pending handle."""
+        with self._cond:
+            self._closed = True
+            handles = list(self._handles.values())
+            self._cond.notify_all()
+        for handle in handles:
+            handle.cancel()
@@ -0,0 +1,264 @@
+"""
+Multiplexed polling of many tasks from a single loop.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+
+from blackforest.base_client import TERMINAL_STATUSES, BFLError
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.responses.responses import TaskResult
+
+if TYPE_CHECKING:
+    from blackforest.client import BFLClient
+
+
+@dataclass
+class _PendingTask:
+    task_id: str
+    added_at: float
+    model: Optional[str] = None
+    seq: int = 0
+    polls: int = 0
+    last_delay: float = 0.0
+    cancelled: bool = False
+
+
+class TaskPoller:
+    """
+    Polls any number of tasks from one thread.
+
+    Tasks are kept in a priority queue ordered by their next poll deadline, so
+    the poller only ever sleeps until the earliest deadline and issues one
+    request at a time. Thread and request counts stay flat no matter how many
+    tasks are outstanding; `max_requests_per_second` caps the request rate.
+
+    Examples:
+        >>> poller = TaskPoller(client)  # seeded with the client's known tasks
+        >>> for task in poller.as_completed():
+        ...     print(task.id, task.status, task.result)
+    """
+
+    def __init__(
+        self,
+        client: "BFLClient",
+        task_ids: Optional[Iterable[str]] = None,
+        config: Optional[ClientConfig] = None,
+        max_requests_per_second: Optional[float] = None,
+    ):
+        """
+        Args:
+            client: Client used to issue the polling requests
+            task_ids: Tasks to track. Defaults to every task the client
+                currently holds a polling URL for.
+            config: Polling behaviour (strategy, per-task timeout, max polls)
+            max_requests_per_second: Upper bound on the polling request rate
+        """
+        self.client = client
+        self.config = config or ClientConfig()
+        self.strategy = self.config.get_polling_strategy()
+        self.min_request_gap = (
+            1.0 / max_requests_per_second if max_requests_per_second else 0.0
+        )
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._tasks: Dict[str, _PendingTask] = {}
+        self._counter = itertools.count()
+        self._last_request = 0.0
+
+        if task_ids is None:
+            task_ids = list(client._task_polling_urls.keys())
+        for task_id in task_ids:
+            self.add(task_id)
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._tasks)
+
+    def add(
+        self,
+        task_id: str,
+        polling_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> None:
+        """
+        Start tracking a task. Its first poll is scheduled after the polling
+        strategy's initial delay (immediately by default).
+
+        Args:
+            task_id: The task to poll
+            polling_url: Polling URL returned at submission (optional)
+            model: Model the task was submitted to (optional)
+        """
+        if polling_url:
+            self.client._store_polling_url(task_id, {"polling_url": polling_url})
+        with self._cond:
+            if task_id in self._tasks:
+                return
+            task = _PendingTask(
+                task_id=task_id, added_at=time.monotonic(), model=model
+            )
+            task.last_delay = self.strategy.initial_delay(model)
+            self._tasks[task_id] = task
+            self._push(task, task.added_at + task.last_delay)
+            self._cond.notify()
+
+    def discard(self, task_id: str) -> bool:
+        """Stop tracking a task. Returns True if it was pending."""
+        with self._cond:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return False
+            task.cancelled = True
+            return True
+
+    def _push(self, task: _PendingTask, due_at: float) -> None:
+        task.seq = next(self._counter)
+        heapq.heappush(self._heap, (due_at, task.seq, task.task_id))
+
+    def _is_stale(self, entry: tuple) -> bool:
+        task = self._tasks.get(entry[2])
+        return task is None or task.seq != entry[1]
+
+    def _next_due(self, deadline: Optional[float]) -> Optional[_PendingTask]:
+        """Block until a task is due for polling and pop it."""
+        with self._cond:
+            while True:
+                # Entries of discarded or rescheduled tasks are dropped lazily
+                while self._heap and self._is_stale(self._heap[0]):
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    return None
+
+                now = time.monotonic()
+                due_at = max(
+                    self._heap[0][0], self._last_request + self.min_request_gap
+                )
+                if due_at <= now:
+                    _, _, task_id = heapq.heappop(self._heap)
+                    self._last_request = now
+                    return self._tasks[task_id]
+                if deadline is not None and now >= deadline:
+                    raise BFLError(
+                        f"Timed out waiting for {len(self._tasks)} pending tasks"
+                    )
+                wait = due_at - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._cond.wait(wait)
+
+    def _reschedule(self, task: _PendingTask, delay: float) -> None:
+        with self._cond:
+            if task.cancelled:
+                return
+            self._push(task, time.monotonic() + delay)
+            self._cond.notify()
+
+    def _finish(self, task: _PendingTask, result: TaskResult) -> Optional[TaskResult]:
+        with self._cond:
+            if task.cancelled or self._tasks.get(task.task_id) is not task:
+                return None
+            del self._tasks[task.task_id]
+            return result
+
+    def poll_next(self, timeout: Optional[float] = None) -> Optional[TaskResult]:
+        """
+        Poll tasks as they come due until one of them finishes.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            The finished task, or None if no tasks are pending
+
+        Raises:
+            BFLError: If `timeout` elapses before a task finishes
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            task = self._next_due(deadline)
+            if task is None:
+                return None
+            finished = self._poll(task)
+            if finished is not None:
+                return finished
+
+    def _poll(self, task: _PendingTask) -> Optional[TaskResult]:
+        """Issue one polling request and either finish or reschedule the task."""
+        task.polls += 1
+        try:
+            endpoint = self.client._get_polling_endpoint(task.task_id)
+            response, headers = self.client._request_with_headers("GET", endpoint)
+        except BFLError as e:
+            # The task may still finish server-side, so nothing is journaled
+            self.client._task_done(task.task_id)
+            return self._finish(
+                task,
+                TaskResult(
+                    id=task.task_id, status="Error", error=str(e), polls=task.polls
+                ),
+            )
+
+        status = response.get("status", "unknown")
+        elapsed = time.monotonic() - task.added_at
+        if status in TERMINAL_STATUSES:
+            self.client._task_done(task.task_id, status, task.polls)
+            error = None
+            if status == "failed":
+                error = response.get("error", "Unknown error")
+            else:
+                self.strategy.record(task.model, elapsed, task.polls)
+            return self._finish(
+                task,
+                TaskResult(
+                    id=task.task_id,
+                    status=status,
+                    result=response.get("result"),
+                    error=error,
+                    polls=task.polls,
+                ),
+            )
+
+        if self.config.timeout and elapsed > self.config.timeout:
+            error = f"Polling timed out after {self.config.timeout} seconds"
+        elif task.polls >= self.config.max_retries:
+            error = f"Polling exceeded maximum retries ({self.config.max_retries})"
+        else:
+            task.last_delay = self.client._next_poll_delay(
+                self.strategy, task.polls, task.last_delay, task.model, headers
+            )
+            self._reschedule(task, task.last_delay)
+            return None
+        self.client._task_done(task.task_id)
+        return self._finish(
+            task,
+            TaskResult(
+                id=task.task_id, status="Timeout", error=error, polls=task.polls
+            ),
+        )
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[TaskResult]:
+        """
+        Yield tasks as they finish until none are pending.
+
+        Tasks added while iterating are picked up as well.
+
+        Args:
+            timeout: Maximum total seconds to wait (None waits indefinitely)
+
+        Raises:
+            BFLError: If `timeout` elapses while tasks are still pending
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            finished = self.poll_next(remaining)
+            if finished is None:
+                return
+            yield finished
@@ -0,0 +1,162 @@
+"""
+Strategies deciding how long to wait between polls of a task.
+"""
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value into seconds.
+
+    Accepts both the delta-seconds and the HTTP-date form. Returns None when the
+    header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class PollingStrategy(ABC):
+    """
+    Base class for polling strategies. Subclasses implement `next_delay`.
+
+    `attempt` is the number of polls already made for the task (starting at 1)
+    and `previous` is the last delay used. A strategy instance can be shared by
+    many tasks and threads, so per-task state is passed in rather than stored.
+    """
+
+    def initial_delay(self, model: Optional[str] = None) -> float:
+        """Delay between submitting a task and its first poll."""
+        return 0.0
+
+    @abstractmethod
+    def next_delay(
+        self, attempt: int, previous: float, model: Optional[str] = None
+    ) -> float:
+        """Delay before the next poll of a task that is still pending."""
+
+    def record(self, model: Optional[str], elapsed: float, polls: int) -> None:
+        """Called when a task finishes, with the time it took to become ready."""
+        pass
+
+
+class FixedInterval(PollingStrategy):
+    """Poll at a constant interval."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+
+    def next_delay(
+        self, attempt: int, previous: float, model: Optional[str] = None
+    ) -> float:
+        return self.interval
+
+
+class ExponentialBackoff(PollingStrategy):
+    """Multiply the interval by `factor` after every poll, up to `max_interval`."""
+
+    def __init__(
+        self, initial: float = 0.5, factor: float = 2.0, max_interval: float = 10.0
+    ):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+
+    def next_delay(
+        self, attempt: int, previous: float, model: Optional[str] = None
+    ) -> float:
+        return min(self.max_interval, self.initial * self.factor ** (attempt - 1))
+
+
+class DecorrelatedJitter(PollingStrategy):
+    """
+    "Decorrelated jitter" backoff: each delay is drawn uniformly between `base`
+    and three times the previous delay, capped at `cap`. Spreads polls of tasks
+    submitted together so they do not hit the API in lockstep.
+    """
+
+    def __init__(
+        self, base: float = 0.5, cap: float = 10.0, rng: Optional[random.Random] = None
+    ):
+        self.base = base
+        self.cap = cap
+        self._rng = rng or random.Random()
+
+    def next_delay(
+        self, attempt: int, previous: float, model: Optional[str] = None
+    ) -> float:
+        upper = max(self.base, previous * 3)
+        return min(self.cap, self._rng.uniform(self.base, upper))
+
+
+class LearnedLatency(PollingStrategy):
+    """
+    Learn how long each model usually takes and poll around that time.
+
+    Keeps an exponentially weighted moving average of time-to-ready per model.
+    The first poll is delayed to `lead_fraction` of the expected latency, then
+    tasks are polled every `interval` seconds. Polls past the expected latency
+    back off towards `max_interval`. Models without history use `default_latency`.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        max_interval: float = 5.0,
+        lead_fraction: float = 0.8,
+        smoothing: float = 0.2,
+        default_latency: float = 0.0,
+        initial_latencies: Optional[Mapping[str, float]] = None,
+    ):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.lead_fraction = lead_fraction
+        self.smoothing = smoothing
+        self.default_latency = default_latency
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, float] = dict(initial_latencies or {})
+
+    def expected_latency(self, model: Optional[str]) -> float:
+        """Current estimate of time-to-ready for `model` in seconds."""
+        with self._lock:
+            return self._latencies.get(model, self.default_latency)
+
+    def initial_delay(self, model: Optional[str] = None) -> float:
+        return self.expected_latency(model) * self.lead_fraction
+
+    def next_delay(
+        self, attempt: int, previous: float, model: Optional[str] = None
+    ) -> float:
+        expected = self.expected_latency(model)
+        waited = self.initial_delay(model) + self.interval * (attempt - 1)
+        if waited < expected:
+            return self.interval
+        # Running late: back off gradually instead of hammering the API
+        return min(self.max_interval, max(self.interval, previous * 1.5))
+
+    def record(self, model: Optional[str], elapsed: float, polls: int) -> None:
+        if model is None:
+            return
+        with self._lock:
+            current = self._latencies.get(model)
+            if current is None:
+                self._latencies[model] = elapsed
+            else:
+                self._latencies[model] = (
+                    1 - self.smoothing
+                ) * current + self.smoothing * elapsed
@@ -0,0 +1,194 @@
+"""
+Insertion-ordered mapping whose entries expire after a fixed time to live.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLMapStats:
+    """Thread-safe counters of lookups and removals in a TTLMap."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of the counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+class TTLMap(Generic[K, V]):
+    """
+    Thread-safe mapping dropping entries `ttl` seconds after they were set.
+
+    All entries share one TTL, so insertion order is expiry order: entries are
+    kept oldest first and expiry only ever looks at the front. Each operation
+    removes the entries that expired since the last one, which makes expiry
+    amortized O(1) instead of a scan of the whole map. Setting an existing
+    key refreshes it. When `max_size` is reached the oldest entry is evicted.
+
+    `on_remove(key, value)` is called, outside the lock, for every entry that
+    expires or is evicted, but not for entries deleted explicitly.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: Optional[int] = None,
+        on_remove: Optional[Callable[[K, V], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl: Seconds an entry stays in the map
+            max_size: Maximum number of entries (None for unbounded)
+            on_remove: Called with each expired or evicted entry
+            clock: Monotonic time source, in seconds
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.on_remove = on_remove
+        self.clock = clock
+        self.stats = TTLMapStats()
+        # key -> (expires_at, value), oldest first
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> List[Tuple[K, V]]:
+        """Pop expired entries from the front. Must hold the lock."""
+        removed = []
+        while self._data:
+            key, (expires_at, value) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+            removed.append((key, value))
+        if removed:
+            self.stats._incr("expired", len(removed))
+        return removed
+
+    def _notify(self, removed: List[Tuple[K, V]]) -> None:
+        if self.on_remove is not None:
+            for key, value in removed:
+                self.on_remove(key, value)
+
+    def __setitem__(self, key: K, value: V) -> None:
+        now = self.clock()
+        with self._lock:
+            removed = self._expire(now)
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._data) > self.max_size:
+                    removed.append(self._pop_oldest())
+        self._notify(removed)
+
+    def _pop_oldest(self) -> Tuple[K, V]:
+        key, (_, value) = self._data.popitem(last=False)
+        self.stats._incr("evicted")
+        return key, value
+
+    def get(self, key: K, default: Any = None) -> Any:
+        """Return the live value for `key`, counting a hit or a miss."""
+        with self._lock:
+            removed = self._expire(self.clock())
+            entry = self._data.get(key)
+        self._notify(removed)
+        if entry is None:
+            self.stats._incr("misses")
+            return default
+        self.stats._incr("hits")
+        return entry[1]
+
+    def __getitem__(self, key: K) -> V:
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: K) -> None:
+        with self._lock:
+            del self._data[key]
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        """Remove `key` and return its value, or `default`."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def expire(self) -> int:
+        """Remove expired entries now. Returns how many were removed."""
+        with self._lock:
+            removed = self._expire(self.clock())
+        self._notify(removed)
+        return len(removed)
+
+    def next_expiry(self) -> Optional[float]:
+        """Clock time at which the oldest entry expires, or None if empty."""
+        with self._lock:
+            if not self._data:
+                return None
+            expires_at, _ = next(iter(self._data.values()))
+            return expires_at
+
+    def clear(self) -> List[Tuple[K, V]]:
+        """Remove every entry, returning the removed items."""
+        with self._lock:
+            items = [(key, value) for key, (_, value) in self._data.items()]
+            self._data.clear()
+        return items
+
+    def __contains__(self, key: object) -> bool:
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > now
+
+    def __len__(self) -> int:
+        self.expire()
+        with self._lock:
+            return len(self._data)
+
+    def keys(self) -> List[K]:
+        """Snapshot of the live keys, oldest first."""
+        self.expire()
+        with self._lock:
+            return list(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self.keys())
@@ -0,0 +1,152 @@
+"""
+Rate-limited progress reporting for batches.
+
+Instead of a line per polling attempt, a `ProgressReporter` counts finished
+items by status and reports the aggregate at most once per interval, plus a
+final summary when the batch ends.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _status_of(result: Any) -> str:
+    """Status of a batch, poll, pipeline or download result."""
+    status = getattr(result, "status", None)
+    if isinstance(status, str):
+        return status
+    ok = getattr(result, "ok", None)
+    if ok is not None:
+        return "ok" if ok else "error"
+    return "done"
+
+
+class ProgressReporter:
+    """
+    Counts finished items by status and reports them at a bounded rate.
+
+    Reports go to the "blackforest.progress" logger (INFO by default) and to
+    an optional callback receiving the same numbers as a dict. Safe to update
+    from many threads.
+
+    Examples:
+        >>> progress = ProgressReporter(total=len(prompts), interval=10)
+        >>> for item in client.generate_many(model, inputs, progress=progress):
+        ...     ...
+        INFO:blackforest.progress:120/500 finished (ok=118 error=2), 4.1/s
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        interval: float = 5.0,
+        logger: logging.Logger = logger,
+        level: int = logging.INFO,
+        callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            total: Number of items expected, if known
+            interval: Minimum seconds between two reports
+            logger: Logger receiving the reports
+            level: Log level of the reports
+            callback: Called with every report's snapshot (optional)
+            clock: Monotonic time source, in seconds
+        """
+        self.total = total
+        self.interval = interval
+        self.logger = logger
+        self.level = level
+        self.callback = callback
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._started = clock()
+        self._last_report = self._started
+
+    def update(self, status: str, n: int = 1) -> None:
+        """Count `n` items finished with `status`, reporting if due."""
+        with self._lock:
+            self._counts[status] += n
+        self.report()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counts per status, items done, total, elapsed seconds and rate."""
+        with self._lock:
+            counts = dict(self._counts)
+        done = sum(counts.values())
+        elapsed = self.clock() - self._started
+        return {
+            "counts": counts,
+            "done": done,
+            "total": self.total,
+            "elapsed": elapsed,
+            "rate": done / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self, force: bool = False) -> bool:
+        """
+        Emit a report unless one was emitted less than `interval` ago.
+
+        Returns:
+            True if a report was emitted
+        """
+        now = self.clock()
+        with self._lock:
+            if not force and now - self._last_report < self.interval:
+                return False
+            self._last_report = now
+        snapshot = self.snapshot()
+        if self.logger.isEnabledFor(self.level):
+            counts = " ".join(f"{k}={v}" for k, v in sorted(snapshot["counts"].items()))
+            self.logger.log(
+                self.level,
+                "%d/%s finished (%s), %.1f/s",
+                snapshot["done"],
+                "?" if self.total is None else self.total,
+                counts or "none",
+                snapshot["rate"],
+            )
+        if self.callback is not None:
+            self.callback(snapshot)
+        return True
+
+    def close(self) -> None:
+        """Emit the final report."""
+        self.report(force=True)
+
+    def track(self, results: Iterable[T]) -> Iterator[T]:
+        """Pass results through, counting each by its status."""
+        try:
+            for result in results:
+                self.update(_status_of(result))
+                yield result
+        finally:
+            self.close()
+
+    async def atrack(self, results: AsyncIterable[T]) -> AsyncIterator[T]:
+        """Asynchronous counterpart of `track`."""
+        try:
+            async for result in results:
+                self.update(_status_of(result))
+                yield result
+        finally:
+            self.close()
@@ -0,0 +1,327 @@
+"""
+Idempotent generation: reuse the result of an identical earlier request.
+
+Requests are identified by a hash of the model and the validated payload.
+Only payloads with a fixed `seed` are cached by default, since without one
+identical inputs are expected to produce different images. Concurrent
+identical requests are coalesced into a single submission (single-flight),
+and completed responses as well as downloaded sample bytes are served from a
+memory tier, optionally backed by a disk tier, until their TTL runs out.
+Sample bytes are only kept for tasks whose response the cache holds, and
+the memory they take is bounded by `max_content_bytes`.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+from blackforest.journal import input_hash
+from blackforest.polling.ttl_map import TTLMap
+from blackforest.types.responses.responses import AsyncResponse, SyncResponse
+
+CachedResponse = Union[AsyncResponse, SyncResponse]
+T = TypeVar("T", bound=CachedResponse)
+
+_RESPONSE_TYPES = {"async": AsyncResponse, "sync": SyncResponse}
+
+
+class ResultCacheStats:
+    """Thread-safe counters of result cache lookups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.content_hits = 0
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of the counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "content_hits": self.content_hits,
+            }
+
+
+class ResultCache:
+    """
+    Cache of generation responses and sample bytes, keyed by request hash.
+
+    Synchronous requests cache their SyncResponse; asynchronous ones cache
+    the AsyncResponse of the submitted task, so a retried submission returns
+    the task already running instead of starting and billing a new one.
+
+    Examples:
+        >>> cache = ResultCache(ttl=600, disk_dir=".bfl-cache")
+        >>> client = BFLClient(api_key, result_cache=cache)
+        >>> inputs = {"prompt": "a forest", "seed": 42}
+        >>> first = client.generate("flux-dev", inputs, ClientConfig(sync=True))
+        >>> again = client.generate("flux-dev", inputs, ClientConfig(sync=True))
+        >>> assert again.id == first.id  # served from the cache
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        content_ttl: float = 3600.0,
+        max_entries: int = 1024,
+        disk_dir: Optional[Union[str, os.PathLike]] = None,
+        require_seed: bool = True,
+        max_content_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            ttl: Seconds a response is reused. The default matches the
+                lifetime of signed sample URLs.
+            content_ttl: Seconds downloaded sample bytes are kept
+            max_entries: Entries kept in memory, per tier
+            disk_dir: Directory for the disk tier (optional). Entries there
+                survive restarts and expire by modification time.
+            require_seed: Only cache payloads with a fixed seed
+            max_content_bytes: Memory budget for sample bytes. Samples larger
+                than this are not kept in memory.
+        """
+        self.ttl = ttl
+        self.content_ttl = content_ttl
+        self.require_seed = require_seed
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = ResultCacheStats()
+        self._responses: TTLMap[str, CachedResponse] = TTLMap(ttl, max_entries)
+        self.max_content_bytes = max_content_bytes
+        self._content_size = 0
+        self._content_lock = threading.RLock()
+        self._contents: TTLMap[str, Tuple[str, bytes]] = TTLMap(
+            content_ttl, max_entries, on_remove=self._content_removed
+        )
+        # IDs of the tasks behind cached responses, whose samples may be kept
+        self._tasks: TTLMap[str, bool] = TTLMap(max(ttl, content_ttl), max_entries)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._async_in_flight: Dict[str, "asyncio.Future"] = {}
+
+    def key(self, model: str, payload: Dict[str, Any], sync: bool) -> Optional[str]:
+        """Cache key of a request, or None if it must not be cached."""
+        if self.require_seed and payload.get("seed") is None:
+            return None
+        return f"{'sync' if sync else 'async'}-{input_hash(model, payload)}"
+
+    # Disk tier
+
+    def _disk_path(self, name: str) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        return self.disk_dir / hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+    def _read_disk(self, name: str, ttl: float) -> Optional[bytes]:
+        path = self._disk_path(name)
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime > ttl:
+                path.unlink()
+                return None
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def _delete_disk(self, name: str) -> None:
+        path = self._disk_path(name)
+        if path is None:
+            return
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _write_disk(self, name: str, data: bytes) -> None:
+        path = self._disk_path(name)
+        if path is None:
+            return
+        # Written to a temporary file and renamed, so readers never see a
+        # partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def prune(self) -> int:
+        """Delete expired disk entries. Returns how many were deleted."""
+        if self.disk_dir is None:
+            return 0
+        deleted = 0
+        now = time.time()
+        ttl = max(self.ttl, self.content_ttl)
+        for path in self.disk_dir.iterdir():
+            try:
+                if now - path.stat().st_mtime > ttl:
+                    path.unlink()
+                    deleted += 1
+            except OSError:
+                pass
+        return deleted
+
+    # Responses
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for `key`, if still fresh."""
+        response = self._responses.get(key)
+        if response is not None:
+            self.stats._incr("hits")
+            return response
+        name = f"response:{key}"
+        data = self._read_disk(name, self.ttl)
+        if data is not None:
+            try:
+                entry = json.loads(data)
+                response_type = _RESPONSE_TYPES[entry["type"]]
+                response = response_type.model_validate(entry["data"])
+            except (KeyError, TypeError, ValueError):
+                # Corrupt or from an incompatible version; drop it
+                self._delete_disk(name)
+            else:
+                self._responses[key] = response
+                self._tasks[response.id] = True
+                self.stats._incr("disk_hits")
+                return response
+        self.stats._incr("misses")
+        return None
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Cache a response."""
+        self._responses[key] = response
+        self._tasks[response.id] = True
+        if self.disk_dir is not None:
+            kind = "sync" if isinstance(response, SyncResponse) else "async"
+            entry = {"type": kind, "data": response.model_dump(mode="json")}
+            self._write_disk(f"response:{key}", json.dumps(entry).encode("utf-8"))
+
+    def get_or_create(self, key: str, create: Callable[[], T]) -> T:
+        """
+        Return the cached response or create it, once across threads.
+
+        Callers arriving while the same key is being created wait for that
+        result instead of creating their own. Failures are not cached and are
+        raised to every waiting caller.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            self.stats._incr("coalesced")
+            return future.result()
+        try:
+            response = create()
+            self.put(key, response)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        future.set_result(response)
+        return response
+
+    async def get_or_create_async(
+        self, key: str, create: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Like `get_or_create`, coalescing callers on the running event loop."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        future = self._async_in_flight.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            self.stats._incr("coalesced")
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._async_in_flight[key] = future
+        try:
+            response = await create()
+            self.put(key, response)
+        except BaseException as e:
+            future.set_exception(e)
+            # Only waiting callers see the error; nobody may be waiting
+            future.exception()
+            raise
+        finally:
+            if self._async_in_flight.get(key) is future:
+                del self._async_in_flight[key]
+        future.set_result(response)
+        return response
+
+    # Sample bytes
+
+    def get_content(self, task_id: str) -> Optional[Tuple[str, bytes]]:
+        """Return the (content type, bytes) of a downloaded sample."""
+        entry = self._contents.get(task_id)
+        if entry is None:
+            data = self._read_disk(f"content:{task_id}", self.content_ttl)
+            if data is None:
+                return None
+            content_type, _, content = data.partition(b"\n")
+            entry = (content_type.decode("utf-8"), content)
+            self._store_content(task_id, entry)
+        self.stats._incr("content_hits")
+        return entry
+
+    def put_content(self, task_id: str, content_type: str, content: bytes) -> None:
+        """
+        Cache the downloaded sample of a task. Samples of tasks without a
+        cached response, such as unseeded ones, are not kept.
+        """
+        if task_id not in self._tasks:
+            return
+        self._store_content(task_id, (content_type, content))
+        if self.disk_dir is not None:
+            header = content_type.replace("\n", " ").encode("utf-8") + b"\n"
+            self._write_disk(f"content:{task_id}", header + content)
+
+    def _store_content(self, task_id: str, entry: Tuple[str, bytes]) -> None:
+        """Keep a sample in memory, evicting the oldest ones over budget."""
+        if len(entry[1]) > self.max_content_bytes:
+            return
+        with self._content_lock:
+            previous = self._contents.pop(task_id)
+            if previous is not None:
+                self._content_size -= len(previous[1])
+            self._content_size += len(entry[1])
+            # Evictions by entry count are accounted for by _content_removed
+            self._contents[task_id] = entry
+            while self._content_size > self.max_content_bytes:
+                keys = self._contents.keys()
+                if not keys:
+                    break
+                evicted = self._contents.pop(keys[0])
+                if evicted is not None:
+                    self._content_size -= len(evicted[1])
+
+    def _content_removed(self, task_id: str, entry: Tuple[str, bytes]) -> None:
+        with self._content_lock:
+            self._content_size -= len(entry[1])
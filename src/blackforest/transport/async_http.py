@@ -0,0 +1,405 @@
+"""
+Non-blocking HTTP transports used by the asyncio client.
+
+`AsyncHTTPTransport` is a small HTTP/1.1 client built only on asyncio streams, so
+the async client works without extra dependencies. When aiohttp is installed,
+`AiohttpTransport` can be used instead.
+"""
+
+import asyncio
+import json
+import ssl
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlsplit
+
+from blackforest.transport.retry import IDEMPOTENT_METHODS
+from blackforest.transport.session import ConnectionStats
+
+# Request bodies are bytes, or a sized iterable of byte chunks that is
+# streamed to the server (iterating it again must start over)
+RequestBody = Union[bytes, Iterable[bytes]]
+
+
+class TransportError(Exception):
+    """Raised when a request could not be completed at the connection level."""
+
+    pass
+
+
+class ConnectError(TransportError):
+    """Raised when no connection could be made, so the request was never sent."""
+
+    pass
+
+
+@dataclass
+class TransportResponse:
+    """A fully read HTTP response."""
+
+    status: int
+    reason: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncTransport(Protocol):
+    """Interface the async client expects from its HTTP transport."""
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[RequestBody] = None,
+        timeout: Optional[float] = None,
+    ) -> TransportResponse: ...
+
+    async def aclose(self) -> None: ...
+
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _RequestNotSent(ConnectionError):
+    """The connection failed before the whole request was written."""
+
+    pass
+
+
+class AsyncHTTPTransport:
+    """
+    Minimal keep-alive HTTP/1.1 client on top of asyncio streams.
+
+    Idle connections are pooled per (scheme, host, port) so that polling many
+    tasks against the same host reuses sockets instead of re-doing TLS.
+    """
+
+    def __init__(
+        self,
+        max_keepalive_connections: int = 100,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        stats: Optional[ConnectionStats] = None,
+    ):
+        """
+        Args:
+            max_keepalive_connections: Idle connections kept open per host
+            ssl_context: SSL context for https URLs (defaults to system trust)
+            stats: Counters of new vs. reused connections (optional)
+        """
+        self.max_keepalive_connections = max_keepalive_connections
+        self.stats = stats or ConnectionStats()
+        self._ssl_context = ssl_context
+        self._idle: Dict[Tuple[str, str, int], List[_Connection]] = {}
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    async def _connect(self, key: Tuple[str, str, int]) -> _Connection:
+        scheme, host, port = key
+        if scheme == "https":
+            return await asyncio.open_connection(
+                host, port, ssl=self._get_ssl_context(), server_hostname=host
+            )
+        return await asyncio.open_connection(host, port)
+
+    def _release(self, key: Tuple[str, str, int], conn: _Connection) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_keepalive_connections:
+            idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[RequestBody] = None,
+        timeout: Optional[float] = None,
+    ) -> TransportResponse:
+        """
+        Send a request and read the whole response.
+
+        Raises:
+            TransportError: If the connection fails or times out
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise TransportError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        host_header = parts.netloc.rsplit("@", 1)[-1]
+        head = self._serialize(method, target, host_header, headers, body)
+
+        try:
+            return await asyncio.wait_for(
+                self._send(key, head, body, method), timeout
+            )
+        except TransportError:
+            raise
+        except asyncio.TimeoutError as e:
+            raise TransportError(f"Request to {url} timed out") from e
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            raise TransportError(f"Request to {url} failed: {e}") from e
+
+    async def _send(
+        self,
+        key: Tuple[str, str, int],
+        head: bytes,
+        body: Optional[RequestBody],
+        method: str,
+    ) -> TransportResponse:
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if writer.is_closing() or reader.at_eof():
+                writer.close()
+                continue
+            try:
+                response = await self._exchange(
+                    key, (reader, writer), head, body, method
+                )
+            except ConnectionError as e:
+                # The server dropped an idle keep-alive connection. Retry on a
+                # fresh one only if the server cannot have acted on the request.
+                if not isinstance(e, _RequestNotSent) and (
+                    method.upper() not in IDEMPOTENT_METHODS
+                ):
+                    raise TransportError(
+                        f"Connection to {key[1]}:{key[2]} was dropped after "
+                        f"the request was sent: {e}"
+                    ) from e
+                continue
+            self.stats.record(reused=True)
+            return response
+
+        try:
+            conn = await self._connect(key)
+        except OSError as e:
+            raise ConnectError(f"Could not connect to {key[1]}:{key[2]}: {e}") from e
+        response = await self._exchange(key, conn, head, body, method)
+        self.stats.record(reused=False)
+        return response
+
+    async def _exchange(
+        self,
+        key: Tuple[str, str, int],
+        conn: _Connection,
+        head: bytes,
+        body: Optional[RequestBody],
+        method: str,
+    ) -> TransportResponse:
+        reader, writer = conn
+        try:
+            try:
+                if body is None or isinstance(body, bytes):
+                    writer.write(head + (body or b""))
+                else:
+                    writer.write(head)
+                    # Drain after every chunk so only one chunk is buffered
+                    async for chunk in _aiter_chunks(body):
+                        writer.write(chunk)
+                        await writer.drain()
+                await writer.drain()
+            except ConnectionError as e:
+                raise _RequestNotSent(str(e)) from e
+            response, keep_alive = await self._read_response(reader, method)
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self._release(key, conn)
+        else:
+            writer.close()
+        return response
+
+    @staticmethod
+    def _serialize(
+        method: str,
+        target: str,
+        host: str,
+        headers: Optional[Dict[str, str]],
+        body: Optional[RequestBody],
+    ) -> bytes:
+        """Serialize the request line and headers."""
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body) if body is not None else 0}")
+        lines.append("Connection: keep-alive")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    @staticmethod
+    async def _read_response(
+        reader: asyncio.StreamReader, method: str
+    ) -> Tuple[TransportResponse, bool]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        version, _, rest = status_line.decode("latin-1").strip().partition(" ")
+        status_text, _, reason = rest.partition(" ")
+        status = int(status_text)
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = version == "HTTP/1.1" and connection != "close"
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            content = b""
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip optional trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        response = TransportResponse(
+            status=status, reason=reason, headers=headers, content=content
+        )
+        return response, keep_alive
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for _, writer in conns:
+                writer.close()
+
+
+class AiohttpTransport:
+    """Transport backed by an `aiohttp.ClientSession` (requires aiohttp)."""
+
+    def __init__(self, session: Any = None, limit: int = 100):
+        """
+        Args:
+            session: An existing aiohttp.ClientSession to use (optional)
+            limit: Maximum simultaneous connections when creating a session
+        """
+        self._session = session
+        self._owns_session = session is None
+        self.limit = limit
+
+    def _get_session(self) -> Any:
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError as e:
+                raise TransportError(
+                    "AiohttpTransport requires aiohttp. "
+                    "Install it with `pip install blackforest[async]`"
+                ) from e
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit)
+            )
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[RequestBody] = None,
+        timeout: Optional[float] = None,
+    ) -> TransportResponse:
+        import aiohttp
+
+        session = self._get_session()
+        if body is not None and not isinstance(body, bytes):
+            headers = {**(headers or {}), "Content-Length": str(len(body))}
+            body = _aiter_chunks(body)
+        try:
+            async with session.request(
+                method,
+                url,
+                headers=headers,
+                data=body,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                content = await response.read()
+                return TransportResponse(
+                    status=response.status,
+                    reason=response.reason or "",
+                    headers={k.lower(): v for k, v in response.headers.items()},
+                    content=content,
+                )
+        except asyncio.TimeoutError as e:
+            raise TransportError(f"Request to {url} timed out") from e
+        except aiohttp.ClientConnectorError as e:
+            raise ConnectError(f"Could not connect for {url}: {e}") from e
+        except aiohttp.ClientError as e:
+            raise TransportError(f"Request to {url} failed: {e}") from e
+
+    async def aclose(self) -> None:
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+
+async def _aiter_chunks(body: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Iterate a streamed body on a worker thread, one chunk at a time.
+
+    Producing a chunk can read and encode image files, which must not block
+    the event loop.
+    """
+    chunks = iter(body)
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def default_transport() -> AsyncTransport:
+    """Use aiohttp when it is installed, otherwise the stdlib transport."""
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        return AsyncHTTPTransport()
+    return AiohttpTransport()
@@ -0,0 +1,352 @@
+"""
+Client-side rate limiting and in-flight task limits.
+
+All classes here are thread-safe and async waiters are woken through their
+own event loop, so one RateLimiter can be shared by several BFLClient
+threads and AsyncBFLClient instances at the same time.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from blackforest.polling.ttl_map import TTLMap
+
+# Endpoint classes that can be limited independently
+SUBMIT = "submit"
+POLL = "poll"
+USAGE = "usage"
+
+# Seconds a submission waits for an in-flight slot by default
+DEFAULT_SLOT_TIMEOUT = 600.0
+# Polling URLs expire after this long, so nobody can finish the task after it
+DEFAULT_TASK_TTL = 1800.0
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of `burst`.
+
+    The rate adapts AIMD-style: `penalize()` (called on 429 responses)
+    multiplies it by `decrease_factor`, and each `reward()` (called on success)
+    adds back a small step until the configured rate is reached again.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        recovery_step: Optional[float] = None,
+    ):
+        """
+        Args:
+            rate: Sustained requests per second
+            burst: Bucket capacity (defaults to max(1, rate))
+            min_rate: Floor for the adapted rate (defaults to rate / 10)
+            decrease_factor: Multiplier applied to the rate on each 429
+            recovery_step: Rate added back per successful request
+                (defaults to 5% of `rate`)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.decrease_factor = decrease_factor
+        self.recovery_step = (
+            recovery_step if recovery_step is not None else rate * 0.05
+        )
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, returning how long the caller must wait before sending.
+
+        Tokens may be borrowed from the future, so concurrent callers are
+        spaced out instead of all waking up at the same moment.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def penalize(self) -> None:
+        """Reduce the rate after the server signalled rate limiting."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+    def reward(self) -> None:
+        """Move the rate back towards the configured maximum."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+
+class InFlightLimiter:
+    """Bounds the number of submitted tasks that have not finished yet."""
+
+    def __init__(self, max_in_flight: int):
+        """
+        Args:
+            max_in_flight: Maximum number of unfinished tasks
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        # Async callers waiting for a slot, woken one per release
+        self._async_waiters: Deque[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight >= self.max_in_flight:
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a slot is free. Returns False on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._in_flight < self.max_in_flight, timeout
+            ):
+                return False
+            self._in_flight += 1
+            return True
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a free slot without blocking the event loop. Returns False
+        on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._cond:
+                if self._in_flight < self.max_in_flight:
+                    self._in_flight += 1
+                    return True
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            remaining = None if deadline is None else max(0, deadline - loop.time())
+            try:
+                await asyncio.wait((waiter,), timeout=remaining)
+            except BaseException:
+                self._abandon(loop, waiter)
+                raise
+            if not waiter.done():
+                self._abandon(loop, waiter)
+                return False
+
+    def _abandon(
+        self, loop: asyncio.AbstractEventLoop, waiter: asyncio.Future
+    ) -> None:
+        """Stop waiting, passing on a wake-up this caller will not use."""
+        with self._cond:
+            if (loop, waiter) in self._async_waiters:
+                self._async_waiters.remove((loop, waiter))
+            else:
+                self._wake_async()
+
+    def _wake_async(self) -> None:
+        """Wake the oldest async waiter. Must hold the lock."""
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # Its event loop is closed
+                continue
+            return
+
+    def release(self) -> None:
+        with self._cond:
+            if self._in_flight > 0:
+                self._in_flight -= 1
+                self._cond.notify()
+                self._wake_async()
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    """
+    Throttles outgoing traffic per endpoint class.
+
+    `submit` limits generation/processing POSTs, `poll` limits result polling
+    and `usage` limits usage-tracking calls. `max_in_flight` bounds how many
+    submitted tasks may be unfinished at once; a slot is held from submission
+    until the task is seen in a final state, its polling URL expires, or
+    `task_ttl` passes without anyone finishing it.
+
+    Examples:
+        >>> limiter = RateLimiter.shared(
+        ...     api_key, submit=TokenBucket(5), poll=TokenBucket(20), max_in_flight=50
+        ... )
+        >>> client = BFLClient(api_key, rate_limiter=limiter)
+        >>> async_client = AsyncBFLClient(api_key, rate_limiter=limiter)
+    """
+
+    _shared: Dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        submit: Optional[TokenBucket] = None,
+        poll: Optional[TokenBucket] = None,
+        usage: Optional[TokenBucket] = None,
+        max_in_flight: Optional[int] = None,
+        slot_timeout: Optional[float] = DEFAULT_SLOT_TIMEOUT,
+        task_ttl: float = DEFAULT_TASK_TTL,
+    ):
+        """
+        Args:
+            submit: Bucket limiting generation and processing submissions
+            poll: Bucket limiting result polling
+            usage: Bucket limiting usage tracking calls
+            max_in_flight: Maximum number of unfinished tasks (optional)
+            slot_timeout: Seconds a submission waits for an in-flight slot
+                before failing (None to wait indefinitely)
+            task_ttl: Seconds after which the slot of a task that was never
+                finished, e.g. one nobody polls, is given back
+        """
+        self.buckets: Dict[str, Optional[TokenBucket]] = {
+            SUBMIT: submit,
+            POLL: poll,
+            USAGE: usage,
+        }
+        self.in_flight = InFlightLimiter(max_in_flight) if max_in_flight else None
+        self.slot_timeout = slot_timeout
+        # Tasks holding a slot; expired entries release theirs
+        self._tasks: TTLMap[str, bool] = TTLMap(
+            task_ttl, on_remove=self._task_expired
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, api_key: str, **kwargs) -> "RateLimiter":
+        """
+        Return the process-wide limiter for an API key, creating it with
+        `kwargs` on first use.
+        """
+        with cls._shared_lock:
+            if api_key not in cls._shared:
+                cls._shared[api_key] = cls(**kwargs)
+            return cls._shared[api_key]
+
+    @staticmethod
+    def endpoint_class(method: str, url: str) -> str:
+        """Classify a request as submit, poll or usage traffic."""
+        if "/licenses/" in url:
+            return USAGE
+        if method.upper() == "GET":
+            return POLL
+        return SUBMIT
+
+    def reserve(self, endpoint_class: str) -> float:
+        """Seconds to wait before sending a request of this class."""
+        bucket = self.buckets.get(endpoint_class)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def on_response(self, endpoint_class: str, status: int) -> None:
+        """Adapt the rate of an endpoint class to a response status."""
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is None:
+            return
+        if status == 429:
+            bucket.penalize()
+        elif status < 400:
+            bucket.reward()
+
+    def _slot_wait(self, deadline: Optional[float]) -> Optional[float]:
+        """
+        Seconds to wait for a slot before checking for abandoned tasks again
+        or giving up, after giving back the slots of expired tasks.
+        """
+        self._tasks.expire()
+        now = time.monotonic()
+        times = (deadline, self._tasks.next_expiry())
+        waits = [t - now for t in times if t is not None]
+        return max(0.0, min(waits)) if waits else None
+
+    def _deadline(self) -> Optional[float]:
+        if self.slot_timeout is None:
+            return None
+        return time.monotonic() + self.slot_timeout
+
+    def acquire_task_slot(self) -> bool:
+        """
+        Wait for an in-flight slot. Returns False if none was freed within
+        `slot_timeout`.
+        """
+        if self.in_flight is None:
+            return True
+        deadline = self._deadline()
+        while True:
+            if self.in_flight.acquire(self._slot_wait(deadline)):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    async def acquire_task_slot_async(self) -> bool:
+        """Like `acquire_task_slot`, without blocking the event loop."""
+        if self.in_flight is None:
+            return True
+        deadline = self._deadline()
+        while True:
+            if await self.in_flight.acquire_async(self._slot_wait(deadline)):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def release_task_slot(self) -> None:
+        """Give back a slot whose submission failed."""
+        if self.in_flight is not None:
+            self.in_flight.release()
+
+    def task_started(self, task_id: str) -> None:
+        """Attach the slot acquired for a submission to its task."""
+        if self.in_flight is None:
+            return
+        with self._lock:
+            if task_id in self._tasks:
+                # Already tracked; the extra slot is not needed
+                self.in_flight.release()
+                return
+            self._tasks[task_id] = True
+
+    def task_finished(self, task_id: str) -> None:
+        """Release the slot of a finished task. Safe to call repeatedly."""
+        if self.in_flight is None:
+            return
+        with self._lock:
+            if self._tasks.pop(task_id) is None:
+                return
+        self.in_flight.release()
+
+    def _task_expired(self, task_id: str, tracked: bool) -> None:
+        if self.in_flight is not None:
+            self.in_flight.release()
@@ -0,0 +1,207 @@
+"""
+Retry policy for transient HTTP failures.
+"""
+
+import random
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Mapping, Optional
+
+from blackforest.polling.strategies import parse_retry_after
+
+# Methods that can be repeated without side effects
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Statuses worth retrying for idempotent requests
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Statuses that guarantee a POST was not processed, so it is safe to resend it.
+# A 429 is rejected before the task is created; a 5xx from a gateway may not be.
+SAFE_POST_STATUSES = frozenset({429})
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of the request volume.
+
+    Every request deposits `ratio` tokens and every retry withdraws one, so
+    during an outage the client backs off to roughly `ratio` extra load
+    instead of multiplying its traffic by `max_retries`.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_tokens: float = 10, max_tokens: float = 100
+    ):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one retry token. Returns False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryStats:
+    """Thread-safe counters describing retry activity."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.budget_exhausted = 0
+        self.retries_by_reason: Counter = Counter()
+
+    def _incr(self, name: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            if reason is not None:
+                self.retries_by_reason[reason] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return a copy of the counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "gave_up": self.gave_up,
+                "budget_exhausted": self.budget_exhausted,
+                "retries_by_reason": dict(self.retries_by_reason),
+            }
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried.
+
+    Idempotent requests (GET polling, usage lookups) are retried on connection
+    errors, timeouts and `retry_statuses`. A POST may already have created a
+    task, so it is only retried when the failure proves it was not processed:
+    the connection could not be established, or the server answered with one
+    of `safe_post_statuses` (429 by default).
+
+    Examples:
+        >>> client = BFLClient(api_key, retry_policy=RetryPolicy(max_retries=5))
+        >>> client.retry_stats.snapshot()
+        {'requests': 12, 'retries': 2, ...}
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = RETRYABLE_STATUSES,
+        safe_post_statuses: Iterable[int] = SAFE_POST_STATUSES,
+        respect_retry_after: bool = True,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Args:
+            max_retries: Maximum retries per request (0 disables retrying)
+            backoff_factor: Base delay; retry n waits backoff_factor * 2**(n-1)
+            max_backoff: Upper bound for a single delay in seconds
+            jitter: Randomize delays ("full jitter") to avoid retry storms
+            retry_statuses: HTTP statuses retried for idempotent requests
+            safe_post_statuses: HTTP statuses for which a POST is retried
+            respect_retry_after: Wait at least as long as a Retry-After header
+            budget: Shared retry budget (a new RetryBudget by default)
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.safe_post_statuses = frozenset(safe_post_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+        self.stats = RetryStats()
+
+    @classmethod
+    def disabled(cls) -> "RetryPolicy":
+        """A policy that never retries."""
+        return cls(max_retries=0)
+
+    def record_request(self) -> None:
+        """Count an attempt and feed the retry budget."""
+        self.stats._incr("requests")
+        self.budget.deposit()
+
+    def retry_reason(
+        self, method: str, status: Optional[int] = None, connect_error: bool = False
+    ) -> Optional[str]:
+        """
+        Classify a failure.
+
+        Args:
+            method: HTTP method of the failed request
+            status: Response status, or None if no response was received
+            connect_error: True if the connection could not be established,
+                so the request never reached the server
+
+        Returns:
+            A short reason string if the failure may be retried, else None
+        """
+        if connect_error:
+            return "connect"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if status is None:
+            return "connection" if idempotent else None
+        allowed = self.retry_statuses if idempotent else self.safe_post_statuses
+        return f"status_{status}" if status in allowed else None
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (starting at 1)."""
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(
+        self,
+        method: str,
+        attempt: int,
+        status: Optional[int] = None,
+        connect_error: bool = False,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Optional[float]:
+        """
+        Decide whether to retry a failed request.
+
+        Args:
+            method: HTTP method of the failed request
+            attempt: Number of the retry being considered (starting at 1)
+            status: Response status, or None if no response was received
+            connect_error: True if the connection could not be established
+            headers: Response headers, used for Retry-After
+
+        Returns:
+            Seconds to wait before retrying, or None to give up
+        """
+        reason = self.retry_reason(method, status, connect_error)
+        if reason is None:
+            return None
+        if attempt > self.max_retries:
+            self.stats._incr("gave_up")
+            return None
+        if not self.budget.withdraw():
+            self.stats._incr("budget_exhausted")
+            return None
+
+        delay = self.backoff(attempt)
+        if self.respect_retry_after and headers is not None:
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_backoff))
+        self.stats._incr("retries", reason)
+        return delay
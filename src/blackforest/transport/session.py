@@ -0,0 +1,115 @@
+"""
+Pooled `requests` session used by the sync client.
+"""
+
+import socket
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from blackforest.types.general.connection_pool_config import ConnectionPoolConfig
+
+
+class ConnectionStats:
+    """Thread-safe counters of newly opened vs. reused HTTP connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def record(self, reused: bool) -> None:
+        with self._lock:
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of requests served on an already open connection."""
+        total = self.new_connections + self.reused_connections
+        return self.reused_connections / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+            }
+
+
+def _counting_pool(base: type, stats: ConnectionStats) -> type:
+    """Subclass a urllib3 pool so every checkout is recorded in `stats`."""
+
+    def _get_conn(self, timeout=None):
+        conn = base._get_conn(self, timeout=timeout)
+        # A connection without a socket has never connected, or was dropped
+        # and will reconnect: either way a new TCP (and TLS) handshake.
+        stats.record(reused=getattr(conn, "sock", None) is not None)
+        return conn
+
+    return type(f"Counting{base.__name__}", (base,), {"_get_conn": _get_conn})
+
+
+def socket_options(config: ConnectionPoolConfig) -> List[Tuple[int, int, int]]:
+    """Socket options implied by a pool configuration."""
+    options = []
+    if config.tcp_nodelay:
+        options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+    if config.tcp_keepalive:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Tuning knobs are platform specific
+        for name, value in (
+            ("TCP_KEEPIDLE", config.tcp_keepalive_idle),
+            ("TCP_KEEPINTVL", config.tcp_keepalive_interval),
+            ("TCP_KEEPCNT", config.tcp_keepalive_count),
+        ):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    options.extend(config.socket_options or [])
+    return options
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter applying a ConnectionPoolConfig and counting connections."""
+
+    def __init__(
+        self,
+        config: Optional[ConnectionPoolConfig] = None,
+        stats: Optional[ConnectionStats] = None,
+    ):
+        # `config` is already used by HTTPAdapter itself
+        self.pool_config = config or ConnectionPoolConfig()
+        self.stats = stats or ConnectionStats()
+        super().__init__(
+            pool_connections=self.pool_config.pool_connections,
+            pool_maxsize=self.pool_config.pool_maxsize,
+            pool_block=self.pool_config.pool_block,
+        )
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("socket_options", socket_options(self.pool_config))
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+
+def build_session(
+    config: Optional[ConnectionPoolConfig] = None,
+    stats: Optional[ConnectionStats] = None,
+) -> requests.Session:
+    """Create a requests.Session with pooled, instrumented adapters."""
+    config = config or ConnectionPoolConfig()
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(config, stats)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
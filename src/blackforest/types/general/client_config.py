@@ -1,7 +1,12 @@
+import logging
 import os
 from typing import Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from blackforest.polling.strategies import FixedInterval, PollingStrategy
+
+logger = logging.getLogger(__name__)
 
 
 # Determine default sync behavior based on environment
@@ -14,6 +19,8 @@ def _get_default_sync() -> bool:
 class ClientConfig(BaseModel):
     """Base configuration class for BFL client operations."""
 
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     sync: bool = Field(
         default_factory=_get_default_sync,
         description="Whether to wait for the operation to complete before returning \
@@ -35,14 +42,25 @@ class ClientConfig(BaseModel):
         ge=1,
         description="Maximum number of polling attempts for synchronous operations.",
     )
+    polling_strategy: Optional[PollingStrategy] = Field(
+        default=None,
+        description="Strategy deciding the delay between polling attempts. \
+            Defaults to a fixed `polling_interval`.",
+    )
+
+    def get_polling_strategy(self) -> PollingStrategy:
+        """Return the configured polling strategy."""
+        if self.polling_strategy is None:
+            return FixedInterval(self.polling_interval)
+        return self.polling_strategy
 
     @model_validator(mode="after")
     def log_sync_mode(self):
         """Log debug information about sync mode when in development"""
         if os.environ.get("BFL_DEBUG", "").lower() in ("1", "true", "yes"):
-            env = os.environ.get("BFL_ENV", "production")
-            print(
-                f"[BFL_DEBUG] Environment: {env}, \
-                  Sync mode: {'enabled' if self.sync else 'disabled'}"
+            logger.debug(
+                "Environment: %s, sync mode: %s",
+                os.environ.get("BFL_ENV", "production"),
+                "enabled" if self.sync else "disabled",
             )
         return self
@@ -0,0 +1,58 @@
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class ConnectionPoolConfig(BaseModel):
+    """HTTP connection pooling and keep-alive settings for the client session."""
+
+    pool_connections: int = Field(
+        default=10,
+        ge=1,
+        description="Number of per-host connection pools to cache.",
+    )
+    pool_maxsize: int = Field(
+        default=32,
+        ge=1,
+        description="Maximum connections kept open per host. Should be at least \
+            the number of threads sharing the client.",
+    )
+    pool_block: bool = Field(
+        default=False,
+        description="Block when all pooled connections are busy instead of \
+            opening (and later discarding) extra connections.",
+    )
+    keep_alive: bool = Field(
+        default=True,
+        description="Reuse HTTP connections between requests. When disabled, \
+            every request asks the server to close the connection.",
+    )
+    tcp_nodelay: bool = Field(
+        default=True,
+        description="Disable Nagle's algorithm on client sockets.",
+    )
+    tcp_keepalive: bool = Field(
+        default=True,
+        description="Enable TCP keep-alive probes so idle pooled connections \
+            are not silently dropped by NATs and load balancers.",
+    )
+    tcp_keepalive_idle: int = Field(
+        default=60,
+        ge=1,
+        description="Seconds of idleness before the first keep-alive probe.",
+    )
+    tcp_keepalive_interval: int = Field(
+        default=15,
+        ge=1,
+        description="Seconds between keep-alive probes.",
+    )
+    tcp_keepalive_count: int = Field(
+        default=4,
+        ge=1,
+        description="Unanswered probes before the connection is dropped.",
+    )
+    socket_options: Optional[List[Tuple[int, int, int]]] = Field(
+        default=None,
+        description="Extra (level, option, value) socket options applied to \
+            every new connection.",
+    )
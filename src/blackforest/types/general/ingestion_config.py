@@ -0,0 +1,34 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from blackforest.images.ingest import DEFAULT_BYTE_BUDGET
+
+
+class IngestionConfig(BaseModel):
+    """How folders and zip archives of images are read into requests."""
+
+    workers: int = Field(
+        default=4,
+        ge=1,
+        description="Threads reading and encoding images while the request \
+            is sent.",
+    )
+    byte_budget: int = Field(
+        default=DEFAULT_BYTE_BUDGET,
+        ge=1,
+        description="Maximum encoded bytes read ahead of the request body. \
+            Images larger than this are streamed in chunks.",
+    )
+    max_request_bytes: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Split the images over several requests of at most this \
+            many encoded bytes each (process_image_chunks only).",
+    )
+    max_images_per_request: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Split the images over several requests of at most this \
+            many images each (process_image_chunks only).",
+    )
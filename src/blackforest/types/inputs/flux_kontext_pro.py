@@ -6,6 +6,9 @@ from pydantic import Field, HttpUrl, model_validator
 from blackforest.types.base.output_format import OutputFormat
 from blackforest.types.inputs.generic import GenericImageInput
 
+# Compiled once rather than looked up in re's cache on every validation
+ASPECT_RATIO_PATTERN = re.compile(r"^\d+:\d+$")
+
 
 class FluxKontextProInputs(GenericImageInput):
     """Inputs for the Flux Kontext Pro model."""
@@ -50,7 +53,7 @@ class FluxKontextProInputs(GenericImageInput):
         try:
             if self.aspect_ratio is not None:
                 # ensure proper format (1:1) and ratio is between 21:9 and 9:21
-                if not re.match(r"^\d+:\d+$", self.aspect_ratio):
+                if not ASPECT_RATIO_PATTERN.match(self.aspect_ratio):
                     raise ValueError(
                         "Aspect ratio must be in the format of 'width:height'"
                     )
@@ -1,10 +1,9 @@
-import base64
-import io
+import binascii
 from typing import Optional
 
-from PIL import Image
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 
+from blackforest.images.validation import is_base64, probe_image
 from blackforest.types.base.output_format import OutputFormat
 
 
@@ -58,11 +57,7 @@ class GenericImagePromptInput(BaseModel):
     def validate_images(self):
         if self.image_prompt is not None:
             # Basic base64 validation
-            try:
-                import base64
-
-                base64.b64decode(self.image_prompt)
-            except Exception:
+            if not is_base64(self.image_prompt):
                 raise ValueError("image_prompt must be a valid base64 encoded image")
         return self
 
@@ -79,8 +74,8 @@ class GenericImageValidation:
                     f"{field_name.capitalize()} file size exceeds 20MB limit"
                 )
 
-            b64_data = base64.b64decode(image)
-            img = Image.open(io.BytesIO(b64_data))
+            # Only the image header is decoded; results are cached per payload
+            img = probe_image(image)
 
             if img.width * img.height > 20 * 10**6:
                 raise ValueError(
@@ -96,7 +91,7 @@ class GenericImageValidation:
 
             return img.size, img.mode
 
-        except base64.binascii.Error:
+        except binascii.Error:
             raise ValueError(f"Invalid base64 encoding for {field_name}")
         except ValueError as e:
             raise e
@@ -134,9 +129,9 @@ class GenericImageInput(BaseModel):
         description="Whether to perform upsampling on the prompt. \
             If active, automatically modifies the prompt for more creative generation.",
     )
-    # webhook_url: Optional[HttpUrl] = Field(
-    #     default=None, description="URL to receive webhook notifications"
-    # )
-    # webhook_secret: Optional[str] = Field(
-    #     default=None, description="Optional secret for webhook signature verification"
-    # )
+    webhook_url: Optional[HttpUrl] = Field(
+        default=None, description="URL to receive webhook notifications"
+    )
+    webhook_secret: Optional[str] = Field(
+        default=None, description="Optional secret for webhook signature verification"
+    )
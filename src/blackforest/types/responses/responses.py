@@ -20,6 +20,9 @@ class AsyncResponse(BaseModel):
 class SyncResponse(BaseModel):
     id: str
     result: GenerationResult
+    polls: int | None = Field(
+        None, description="Number of polls until the result was ready"
+    )
 
 
 class ImageProcessingResponse(BaseModel):
@@ -31,3 +34,70 @@ class ImageProcessingResponse(BaseModel):
     status: str
     result: dict | None = None
     error: str | None = None
+
+
+class TaskResult(BaseModel):
+    """Final state of a task tracked by a poller.
+
+    `status` is the last status reported by the API, or "Timeout"/"Error" when
+    the client gave up on the task.
+    """
+    id: str
+    status: str
+    result: dict | None = None
+    error: str | None = None
+    polls: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status in ("Ready", "completed")
+
+
+class BatchResult(BaseModel):
+    """Outcome of one item of a `generate_many` batch.
+
+    Exactly one of `response` and `error` is set.
+    """
+    index: int = Field(..., description="Position of the item in the input iterable")
+    response: SyncResponse | AsyncResponse | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DownloadResult(BaseModel):
+    """Outcome of downloading one generated sample.
+
+    `path` is set when the sample was written to a file, `content` when it was
+    downloaded into memory. On failure only `error` is set.
+    """
+    url: str
+    key: str | None = Field(None, description="Task ID or caller supplied key")
+    path: str | None = None
+    content: bytes | None = None
+    content_type: str | None = None
+    size: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class PipelineResult(BaseModel):
+    """Outcome of one item run through a generation pipeline.
+
+    On success the image is in `path` (when writing to a directory) or
+    `content`; otherwise `error` says which stage failed.
+    """
+    index: int = Field(..., description="Position of the item in the input iterable")
+    id: str | None = Field(None, description="Task ID, once submitted")
+    path: str | None = None
+    content: bytes | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,77 @@
+"""
+Compiled validation of generation inputs.
+
+Building each request's payload through `input_cls(**inputs).model_dump()`
+repeats work that only depends on the input class. A `ModelValidator` does
+it once per class: it compiles a TypeAdapter for validation and dumping, and
+collects the known fields and their defaults in JSON form.
+
+For inputs the caller vouches for, typically built by their own code from a
+fixed schema, `trusted()` skips validation altogether: unknown fields and
+None values are dropped and defaults are filled in, which gives the payload
+validation would give for valid inputs.
+"""
+
+import functools
+from typing import Any, Dict, Mapping, Type
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_jsonable_python
+
+# Values sent as they are in trusted payloads; others go through pydantic
+_JSON_SCALARS = (str, int, float, bool)
+
+
+class ModelValidator:
+    """
+    Validates and dumps the inputs of one input class.
+
+    Examples:
+        >>> validator = validator_for(FluxPro11Inputs)
+        >>> validator.validate({"prompt": "a forest", "width": 1024})
+        {'width': 1024, 'height': 768, 'prompt': 'a forest', ...}
+    """
+
+    def __init__(self, input_cls: Type[BaseModel]):
+        self.input_cls = input_cls
+        self.adapter: TypeAdapter = TypeAdapter(input_cls)
+        self.fields = frozenset(input_cls.model_fields)
+        self.defaults: Dict[str, Any] = {}
+        for name, field in input_cls.model_fields.items():
+            if field.is_required():
+                continue
+            default = field.get_default(call_default_factory=True)
+            if default is not None:
+                self.defaults[name] = to_jsonable_python(default)
+
+    def validate(self, inputs: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Validate inputs and dump them to JSON-compatible values, leaving out
+        those that are None.
+
+        Raises:
+            pydantic.ValidationError: If the inputs are invalid
+        """
+        instance = self.adapter.validate_python(inputs)
+        return self.adapter.dump_python(instance, mode="json", exclude_none=True)
+
+    def trusted(self, inputs: Mapping[str, Any]) -> Dict[str, Any]:
+        """Build the payload of inputs known to be valid, without validating."""
+        payload = dict(self.defaults)
+        for name, value in inputs.items():
+            if name not in self.fields:
+                continue
+            if value is None:
+                # An explicit None overrides the default and is then omitted
+                payload.pop(name, None)
+            elif type(value) in _JSON_SCALARS:
+                payload[name] = value
+            else:
+                payload[name] = to_jsonable_python(value)
+        return payload
+
+
+@functools.lru_cache(maxsize=None)
+def validator_for(input_cls: Type[BaseModel]) -> ModelValidator:
+    """The validator of an input class, compiled on first use."""
+    return ModelValidator(input_cls)
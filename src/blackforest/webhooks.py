@@ -0,0 +1,304 @@
+"""
+Receiving task completion webhooks instead of polling.
+
+Generation requests can carry a `webhook_url`; the API then POSTs the final
+task state there. `WebhookReceiver` verifies those calls and resolves a
+Future per task, so a batch of any size can be awaited without a single
+polling request. It can run its own stdlib HTTP server in a background thread
+or be mounted into an existing web application as a WSGI app.
+
+Signatures are HMAC-SHA256 digests of the raw request body keyed with the
+`webhook_secret` sent with the request, hex encoded, optionally prefixed with
+"sha256=".
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from blackforest.types.responses.responses import TaskResult
+
+DEFAULT_SIGNATURE_HEADER = "X-BFL-Signature"
+
+# Webhook status values, normalized to the statuses used when polling
+_READY_STATUSES = {"ready", "completed", "success", "succeeded"}
+_FAILED_STATUSES = {"failed", "error"}
+_PENDING_STATUSES = {"pending", "queued", "processing", "running"}
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Signature of a webhook body, as sent in the signature header."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check a webhook signature in constant time."""
+    if not signature:
+        return False
+    expected = sign(secret, body).split("=", 1)[1]
+    received = signature.strip()
+    if received.lower().startswith("sha256="):
+        received = received[len("sha256=") :]
+    return hmac.compare_digest(expected, received.lower())
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_event(payload: Dict[str, Any]) -> Optional[TaskResult]:
+    """
+    Convert a webhook payload into a TaskResult.
+
+    Returns:
+        The final task state, or None for progress notifications
+    """
+    task_id = payload.get("task_id") or payload.get("id")
+    if not task_id:
+        raise ValueError("Webhook payload has no task id")
+    raw_status = str(payload.get("status", ""))
+    status = raw_status.lower()
+    if status in _PENDING_STATUSES:
+        return None
+    result = payload.get("result")
+    error = None
+    if status in _READY_STATUSES:
+        raw_status = "Ready"
+    else:
+        if status in _FAILED_STATUSES:
+            raw_status = "failed"
+        error = payload.get("error") or payload.get("details") or raw_status
+        error = error if isinstance(error, str) else json.dumps(error)
+    return TaskResult(
+        id=str(task_id),
+        status=raw_status,
+        result=result if isinstance(result, dict) else None,
+        error=error,
+    )
+
+
+class WebhookReceiver:
+    """
+    Verifies completion webhooks and resolves a Future per task.
+
+    Events may arrive before `expect()` is called for their task (the webhook
+    can beat the submission response); up to `max_unclaimed` of them are kept
+    and hand their result to the matching `expect()` call.
+
+    Examples:
+        >>> receiver = WebhookReceiver(
+        ...     secret="s3cret", public_url="https://jobs.example.com/bfl"
+        ... )
+        >>> receiver.serve(host="0.0.0.0", port=8080)
+        >>> futures = [
+        ...     client.generate_with_webhook("flux-pro-1.1", {"prompt": p}, receiver)
+        ...     for p in prompts
+        ... ]
+        >>> for future in concurrent.futures.as_completed(futures):
+        ...     print(future.result().result["sample"])
+    """
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        public_url: Optional[str] = None,
+        signature_header: str = DEFAULT_SIGNATURE_HEADER,
+        max_unclaimed: int = 10_000,
+    ):
+        """
+        Args:
+            secret: Shared secret used to sign webhooks. Unsigned requests are
+                accepted only when no secret is set.
+            public_url: URL under which the API can reach this receiver; sent
+                as `webhook_url` with generation requests
+            signature_header: Request header carrying the signature
+            max_unclaimed: Events kept for tasks nobody is waiting for yet
+        """
+        self.secret = secret
+        self.public_url = public_url
+        self.signature_header = signature_header
+        self.max_unclaimed = max_unclaimed
+        self._pending: Dict[str, Future] = {}
+        self._unclaimed: "OrderedDict[str, TaskResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def webhook_inputs(self) -> Dict[str, str]:
+        """Input fields that make a generation request report here."""
+        if not self.public_url:
+            raise ValueError("public_url is required to request webhooks")
+        inputs = {"webhook_url": self.public_url}
+        if self.secret:
+            inputs["webhook_secret"] = self.secret
+        return inputs
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks waiting for their webhook."""
+        with self._lock:
+            return len(self._pending)
+
+    def expect(self, task_id: str) -> "Future[TaskResult]":
+        """Return a Future resolved when the webhook for `task_id` arrives."""
+        with self._lock:
+            future = self._pending.get(task_id)
+            if future is not None:
+                return future
+            future = Future()
+            result = self._unclaimed.pop(task_id, None)
+            if result is None:
+                self._pending[task_id] = future
+                future.add_done_callback(lambda _: self._forget(task_id, future))
+        if result is not None:
+            future.set_result(result)
+        return future
+
+    def _forget(self, task_id: str, future: Future) -> None:
+        # Drops cancelled futures so a late webhook is not delivered to them
+        with self._lock:
+            if self._pending.get(task_id) is future:
+                del self._pending[task_id]
+
+    def deliver(self, result: TaskResult) -> bool:
+        """
+        Resolve the Future waiting for a task.
+
+        Returns:
+            True if someone was waiting for the task
+        """
+        with self._lock:
+            future = self._pending.pop(result.id, None)
+            if future is None:
+                self._unclaimed[result.id] = result
+                self._unclaimed.move_to_end(result.id)
+                while len(self._unclaimed) > self.max_unclaimed:
+                    self._unclaimed.popitem(last=False)
+                return False
+        if future.set_running_or_notify_cancel():
+            future.set_result(result)
+        return True
+
+    def handle(self, body: bytes, headers: Mapping[str, str]) -> Tuple[int, str]:
+        """
+        Process one webhook request.
+
+        Args:
+            body: Raw request body
+            headers: Request headers (looked up case-insensitively)
+
+        Returns:
+            HTTP status code and a short message for the response
+        """
+        if self.secret is not None:
+            lowered = {k.lower(): v for k, v in headers.items()}
+            signature = lowered.get(self.signature_header.lower())
+            if not verify_signature(self.secret, body, signature):
+                return 401, "invalid signature"
+        try:
+            payload = json.loads(body)
+            result = parse_event(payload)
+        except (ValueError, AttributeError) as e:
+            return 400, f"invalid payload: {e}"
+        if result is not None:
+            self.deliver(result)
+        return 200, "ok"
+
+    def wsgi_app(
+        self, environ: Dict[str, Any], start_response: Callable
+    ) -> Iterable[bytes]:
+        """WSGI application accepting webhooks on any path."""
+        if environ.get("REQUEST_METHOD") != "POST":
+            status, message = 405, "method not allowed"
+        else:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            body = environ["wsgi.input"].read(length) if length else b""
+            headers = {
+                key[5:].replace("_", "-"): value
+                for key, value in environ.items()
+                if key.startswith("HTTP_")
+            }
+            status, message = self.handle(body, headers)
+        data = message.encode("utf-8")
+        start_response(
+            f"{status} {'OK' if status == 200 else 'Error'}",
+            [("Content-Type", "text/plain"), ("Content-Length", str(len(data)))],
+        )
+        return [data]
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """
+        Start a background HTTP server accepting webhooks on any path.
+
+        Without a secret anyone able to reach the server could resolve tasks
+        with forged results, so only loopback interfaces are served then,
+        e.g. behind a reverse proxy.
+
+        Args:
+            host: Interface to bind (default: loopback only)
+            port: Port to bind (0 picks a free one)
+
+        Returns:
+            The bound (host, port)
+
+        Raises:
+            ValueError: If `host` is not a loopback interface and no secret
+                is set
+        """
+        if self._server is not None:
+            raise RuntimeError("Receiver is already serving")
+        if self.secret is None and not _is_loopback(host):
+            raise ValueError(
+                f"Refusing to accept unsigned webhooks on {host!r}; "
+                "set a secret or bind to a loopback interface"
+            )
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, message = receiver.handle(body, dict(self.headers.items()))
+                data = message.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="bfl-webhooks", daemon=True
+        )
+        self._thread.start()
+        return self._server.server_address[:2]
+
+    def close(self) -> None:
+        """Stop the background server, if running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self) -> "WebhookReceiver":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
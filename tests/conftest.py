@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import json
+import threading
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+SAMPLE_BYTES = b"\xff\xd8\xff\xe0" + b"stub-jpeg" * 64
+
+
+class StubState:
+    """Mutable state of the stub BFL API, shared with the test."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.requests = []
+        # Number of polls answered with "Pending" before a task is "Ready"
+        self.ready_after = 1
+        # Queue of (status, headers, body) returned before normal handling
+        self.injected = []
+        self.fail_task_ids = set()
+
+    def inject(self, status, body=None, headers=None):
+        self.injected.append((status, headers or {}, body or {"message": "stub"}))
+
+    def count(self, method, path_prefix):
+        return sum(
+            1 for m, p in self.requests if m == method and p.startswith(path_prefix)
+        )
+
+
+class StubBFLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    @property
+    def base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _send(self, status, body, headers=None, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _injected(self):
+        with self.state.lock:
+            if self.state.injected:
+                return self.state.injected.pop(0)
+        return None
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._read_body()
+        with self.state.lock:
+            self.state.requests.append(("POST", path))
+        injected = self._injected()
+        if injected:
+            status, headers, payload = injected
+            return self._send(status, payload, headers)
+
+        if "/licenses/models/" in path:
+            return self._send(200, {"ok": True})
+
+        task_id = uuid.uuid4().hex
+        payload = json.loads(body or b"{}")
+        with self.state.lock:
+            self.state.tasks[task_id] = {
+                "path": path,
+                "polls": 0,
+                "payload": payload,
+            }
+        if "webhook_url" in payload:
+            threading.Timer(
+                0.05, self._send_webhook, args=(task_id, payload, self.base)
+            ).start()
+        self._send(
+            200,
+            {
+                "id": task_id,
+                "polling_url": f"{self.base}/v1/get_result?id={task_id}",
+            },
+        )
+
+    @staticmethod
+    def _send_webhook(task_id, payload, base):
+        body = json.dumps(
+            {
+                "task_id": task_id,
+                "status": "Ready",
+                "result": {"sample": f"{base}/samples/{task_id}.jpeg"},
+            }
+        ).encode()
+        headers = {"Content-Type": "application/json"}
+        if payload.get("webhook_secret"):
+            secret = payload["webhook_secret"].encode()
+            digest = hmac.new(secret, body, hashlib.sha256).hexdigest()
+            headers["X-BFL-Signature"] = f"sha256={digest}"
+        request = urllib.request.Request(payload["webhook_url"], body, headers)
+        urllib.request.urlopen(request, timeout=5).close()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        with self.state.lock:
+            self.state.requests.append(("GET", parts.path))
+        injected = self._injected()
+        if injected:
+            status, headers, payload = injected
+            return self._send(status, payload, headers)
+
+        if parts.path.startswith("/samples/"):
+            return self._send(200, SAMPLE_BYTES, content_type="image/jpeg")
+
+        task_id = parse_qs(parts.query).get("id", [""])[0]
+        with self.state.lock:
+            task = self.state.tasks.get(task_id)
+            if task is None:
+                return self._send(404, {"message": "Task not found"})
+            task["polls"] += 1
+            polls = task["polls"]
+        if task_id in self.state.fail_task_ids:
+            return self._send(200, {"id": task_id, "status": "failed", "error": "boom"})
+        if polls <= self.state.ready_after:
+            return self._send(200, {"id": task_id, "status": "Pending"})
+        self._send(
+            200,
+            {
+                "id": task_id,
+                "status": "Ready",
+                "result": {"sample": f"{self.base}/samples/{task_id}.jpeg"},
+            },
+        )
+
+
+class StubBFLServer:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubBFLHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = StubState()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def state(self) -> StubState:
+        return self.httpd.state
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def bfl_server():
+    """A local stand-in for the BFL API."""
+    with StubBFLServer() as server:
+        yield server
@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLError
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+
+def _client(server):
+    return AsyncBFLClient(
+        api_key="test-key", base_url=server.url, transport=AsyncHTTPTransport()
+    )
+
+
+def test_async_client_initialization():
+    client = AsyncBFLClient(api_key="test-key", transport=AsyncHTTPTransport())
+    assert client.base_url == "https://api.bfl.ai"
+    assert client.headers["X-Key"] == "test-key"
+    assert client.headers["Content-Type"] == "application/json"
+
+
+def test_async_generate_stores_polling_url(bfl_server):
+    async def run():
+        async with _client(bfl_server) as client:
+            response = await client.generate(
+                "flux-pro-1.1", {"prompt": "a forest"}, ClientConfig(sync=False)
+            )
+            assert client._get_polling_endpoint(response.id) == response.polling_url
+            status = await client.get_task_status(response.id)
+            assert status.status == "Pending"
+            return response
+
+    response = asyncio.run(run())
+    assert response.polling_url.startswith(bfl_server.url)
+    assert bfl_server.state.tasks[response.id]["payload"]["prompt"] == "a forest"
+
+
+def test_async_generate_sync_mode_concurrently(bfl_server):
+    config = ClientConfig(sync=True, polling_interval=0.1)
+
+    async def run():
+        async with _client(bfl_server) as client:
+            return await asyncio.gather(
+                *(
+                    client.generate("flux-dev", {"prompt": f"p{i}"}, config)
+                    for i in range(20)
+                )
+            )
+
+    responses = asyncio.run(run())
+    assert len({r.id for r in responses}) == 20
+    assert all(r.result.sample.endswith(".jpeg") for r in responses)
+
+
+def test_async_failed_task_raises(bfl_server):
+    async def run():
+        async with _client(bfl_server) as client:
+            response = await client.generate(
+                "flux-pro-1.1", {"prompt": "x"}, ClientConfig(sync=False)
+            )
+            bfl_server.state.fail_task_ids.add(response.id)
+            await client.get_polling_result(
+                response.id, ClientConfig(polling_interval=0.1)
+            )
+
+    with pytest.raises(BFLError, match="Task failed: boom"):
+        asyncio.run(run())
+
+
+def test_async_http_error_message(bfl_server):
+    bfl_server.state.inject(422, {"message": "bad prompt"})
+
+    async def run():
+        async with _client(bfl_server) as client:
+            await client.generate("flux-pro-1.1", {"prompt": "x"})
+
+    with pytest.raises(BFLError, match="bad prompt"):
+        asyncio.run(run())
+
+
+def test_async_process_image_and_track_usage(bfl_server):
+    image_path = os.path.join(os.path.dirname(__file__), "test_images", "image.jpg")
+
+    async def run():
+        async with _client(bfl_server) as client:
+            response = await client.process_image(image_path)
+            await client.track_usage_via_api("flux-dev", 2)
+            return response
+
+    response = asyncio.run(run())
+    assert response.status == "submitted"
+    assert response.task_id in bfl_server.state.tasks
+    assert bfl_server.state.count("POST", "/v1/licenses/models/flux-1-dev") == 1
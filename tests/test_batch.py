@@ -0,0 +1,118 @@
+import asyncio
+import random
+import threading
+import time
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.batch import generate_many
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.responses.responses import AsyncResponse
+
+
+class _SlowClient(BFLClient):
+    """Records how many submissions run at once instead of calling the API."""
+
+    def __init__(self):
+        super().__init__(api_key="test-key")
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def _submit_generation(self, model, payload, config, track_usage=False):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(random.uniform(0.001, 0.02))
+        with self.lock:
+            self.active -= 1
+        if payload["prompt"] == "explode":
+            raise RuntimeError("submission failed")
+        return AsyncResponse(id=payload["prompt"], polling_url="http://x")
+
+
+def test_generate_many_bounds_concurrency_and_streams_inputs():
+    client = _SlowClient()
+    consumed = []
+
+    def inputs():
+        for i in range(40):
+            consumed.append(i)
+            yield {"prompt": str(i)}
+
+    results = generate_many(client, "flux-pro-1.1", inputs(), concurrency=4)
+    first = next(results)
+    # Only a bounded window of inputs has been pulled from the iterable
+    assert len(consumed) <= 8
+    rest = list(results)
+
+    assert client.max_active <= 4
+    assert sorted(r.index for r in [first, *rest]) == list(range(40))
+    assert all(r.ok and r.response.id == str(r.index) for r in [first, *rest])
+
+
+def test_generate_many_ordered_with_per_item_errors():
+    client = _SlowClient()
+    inputs = [
+        {"prompt": "0"},
+        {"prompt": "1", "width": 17},  # invalid: not a multiple of 32
+        {"prompt": "explode"},
+        {"prompt": "3"},
+    ]
+    results = list(
+        client.generate_many("flux-pro-1.1", inputs, concurrency=2, ordered=True)
+    )
+
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert results[0].ok and results[3].ok
+    assert results[1].error.startswith("Invalid inputs")
+    assert results[2].error == "submission failed"
+
+
+def test_stopping_early_does_not_wait_for_running_requests():
+    release = threading.Event()
+
+    class BlockingClient(BFLClient):
+        def _submit_generation(self, model, payload, config, track_usage=False):
+            release.wait(10)
+            return AsyncResponse(id=payload["prompt"], polling_url="http://x")
+
+    inputs = [{"prompt": "slow"}, {"prompt": "x", "width": 1000}]
+    start = time.monotonic()
+    for result in generate_many(BlockingClient(api_key="test-key"), "flux-dev", inputs):
+        assert result.index == 1 and not result.ok
+        break
+    assert time.monotonic() - start < 5
+    release.set()
+
+
+def test_generate_many_against_stub_server(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    config = ClientConfig(sync=True, polling_interval=0.1)
+    inputs = [{"prompt": f"p{i}"} for i in range(12)]
+
+    results = list(
+        client.generate_many("flux-dev", inputs, concurrency=6, config=config)
+    )
+    assert len(results) == 12
+    assert all(r.ok and r.response.result.sample for r in results)
+
+
+def test_async_generate_many_ordered(bfl_server):
+    inputs = [{"prompt": f"p{i}"} for i in range(10)] + [{"prompt": "x", "steps": 0}]
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key", base_url=bfl_server.url, transport=AsyncHTTPTransport()
+        ) as client:
+            return [
+                item
+                async for item in client.generate_many(
+                    "flux-dev", inputs, concurrency=3, ordered=True
+                )
+            ]
+
+    results = asyncio.run(run())
+    assert [r.index for r in results] == list(range(11))
+    assert all(r.ok for r in results[:10])
+    assert not results[10].ok
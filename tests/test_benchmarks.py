@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from benchmarks.mock_server import MockBFLServer, MockConfig, parse_latency
+from benchmarks.run import MODES, Runner, Scenario, compare, parse_size
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert parse_latency("0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2
+    samples = sorted(parse_latency("lognormal:0.05,0.5")(rng) for _ in range(999))
+    assert samples[499] == pytest.approx(0.05, rel=0.2)
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+    assert parse_size("10KB") == 10 * 1024 and parse_size("20MB") == 20 * 1024**2
+
+
+def test_runner_measures_every_mode(tmp_path):
+    config = MockConfig(generation_time="0.01", task_failure_rate=0.5, seed=3)
+    with MockBFLServer(config) as server:
+        runner = Runner(server.url, poll_interval=0.01, image_dir=str(tmp_path))
+        results = [
+            runner.run(Scenario(mode, size, tasks=4, concurrency=2))
+            for mode in MODES
+            for size in (0, 10 * 1024)
+        ]
+        assert server.stats.to_dict()["bytes_received"] > 6 * 10 * 1024
+
+    for result in results:
+        assert result.throughput > 0 and 0 < result.p50 <= result.p99
+        assert result.cpu_per_task > 0 and result.peak_memory > 0
+    # Failed tasks are counted, not raised
+    assert 0 < sum(r.errors for r in results) < sum(r.tasks for r in results)
+
+
+def test_compare_reports_regressions(tmp_path):
+    with MockBFLServer() as server:
+        runner = Runner(server.url, poll_interval=0.01, image_dir=str(tmp_path))
+        result = runner.run(Scenario("sync", 0, 2, 1), measure_memory=False)
+
+    baseline = {**vars(result), "throughput": result.throughput * 2}
+    (line,) = compare([result], [baseline], threshold=0.1)
+    assert line.startswith("sync/prompt throughput")
+    assert compare([result], [vars(result)], threshold=0.1) == []
@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import io
+import sys
+import threading
+
+import pytest
+from PIL import Image, ImageDraw, ImageOps
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.images.control import ControlPreprocessor, canny_edges
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+
+def _square(size=(320, 256)):
+    image = Image.new("L", size, 0)
+    ImageDraw.Draw(image).rectangle((80, 64, 239, 191), fill=200)
+    return image
+
+
+def _b64(image, format="PNG"):
+    out = io.BytesIO()
+    image.save(out, format=format)
+    return base64.b64encode(out.getvalue()).decode()
+
+
+def _open(value):
+    return Image.open(io.BytesIO(base64.b64decode(value)))
+
+
+def test_canny_finds_the_outline_of_a_square():
+    np = pytest.importorskip("numpy")
+
+    edges = np.asarray(canny_edges(_square().convert("RGB"), 50, 200))
+
+    assert set(np.unique(edges)) == {0, 255}
+    rows, cols = np.nonzero(edges)
+    # Thin edges hugging the square's border, nothing inside or outside it
+    assert rows.min() >= 62 and rows.max() <= 193
+    assert cols.min() >= 78 and cols.max() <= 241
+    assert not edges[70:186, 86:234].any()
+    assert edges[128, 78:82].any() and edges[128, 238:242].any()
+    # Above the high threshold nothing is an edge
+    assert not np.asarray(canny_edges(_square(), 2000, 3000)).any()
+
+
+def test_edge_maps_are_cached_by_image_and_thresholds(tmp_path):
+    pytest.importorskip("numpy")
+    path = tmp_path / "square.png"
+    _square().save(path)
+    control = ControlPreprocessor()
+    inputs = {"prompt": "x", "control_image": _b64(_square())}
+
+    first = control.process("flux-pro-1.0-canny", inputs)
+    # The same bytes read from a file hash the same
+    same = control.process(
+        "flux-pro-1.0-canny", {"prompt": "x", "control_image": str(path)}
+    )
+    other = control.process("flux-pro-1.0-canny", {**inputs, "canny_low_threshold": 10})
+
+    assert "control_image" not in first
+    assert same["preprocessed_image"] == first["preprocessed_image"]
+    assert other["preprocessed_image"] != first["preprocessed_image"]
+    assert _open(first["preprocessed_image"]).size == (320, 256)
+    assert control.stats()["computed"] == 2
+    assert control.stats()["hits"] == 1
+    # Other models, and requests with a map already, are left alone
+    assert control.process("flux-pro-1.0-fill", inputs) is inputs
+    assert control.process("flux-pro-1.0-canny", first) is first
+
+
+def test_client_sends_cached_depth_maps(bfl_server):
+    calls = []
+
+    def depth(image):
+        calls.append(image.size)
+        return ImageOps.invert(image.convert("L"))
+
+    control = ControlPreprocessor(depth_estimator=depth)
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, control_preprocessor=control
+    )
+    inputs = {"prompt": "x", "control_image": _b64(_square(), "JPEG")}
+    for _ in range(2):
+        response = client.generate(
+            "flux-pro-1.0-depth", inputs, ClientConfig(sync=False)
+        )
+
+    payload = bfl_server.state.tasks[response.id]["payload"]
+    assert "control_image" not in payload
+    assert _open(payload["preprocessed_image"]).getpixel((0, 0)) > 200
+    assert calls == [(320, 256)]
+    # Canny needs no estimator; depth requests without one are unchanged
+    assert ControlPreprocessor().process("flux-pro-1.0-depth", inputs) is inputs
+
+
+def test_canny_without_numpy_explains_how_to_install_it(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    with pytest.raises(ImportError, match=r"blackforest\[control\]"):
+        canny_edges(_square(), 50, 200)
+
+
+def test_async_client_computes_maps_off_the_event_loop(bfl_server):
+    threads = []
+
+    def depth(image):
+        threads.append(threading.current_thread())
+        return image.convert("L")
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            control_preprocessor=ControlPreprocessor(depth_estimator=depth),
+        ) as client:
+            inputs = {"prompt": "x", "control_image": _b64(_square(), "JPEG")}
+            await client.generate("flux-pro-1.0-depth", inputs, ClientConfig())
+            items = client.generate_many(
+                "flux-pro-1.0-depth", [{**inputs, "prompt": "y"}, {"prompt": "z"}]
+            )
+            return [item async for item in items]
+
+    asyncio.run(run())
+    assert threads and threading.main_thread() not in threads
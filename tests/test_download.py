@@ -0,0 +1,137 @@
+import io
+import threading
+import time
+
+import pytest
+from conftest import SAMPLE_BYTES
+
+from blackforest import BFLClient, BFLError
+from blackforest.download import Downloader, url_expiry
+from blackforest.types.base.output_format import OutputFormat
+from blackforest.types.general.client_config import ClientConfig
+
+SYNC_MODE = ClientConfig(sync=True, polling_interval=0.1)
+
+
+def test_url_expiry():
+    azure = "https://x.blob.core.windows.net/s.jpeg?se=2030-01-01T00%3A00%3A00Z&sig=a"
+    assert url_expiry(azure) == 1893456000
+    aws = "https://x/s.png?X-Amz-Date=20300101T000000Z&X-Amz-Expires=600"
+    assert url_expiry(aws) == 1893456600
+    assert url_expiry("https://x/s.png?Expires=1893456000") == 1893456000
+    assert url_expiry("https://x/s.png") == pytest.approx(time.time() + 600, abs=5)
+
+
+def test_download_to_file_and_sink(bfl_server, tmp_path):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.generate("flux-dev", {"prompt": "x"}, SYNC_MODE)
+
+    result = client.download(response, tmp_path / "out.jpeg", OutputFormat.jpeg)
+    assert result.size == len(SAMPLE_BYTES)
+    assert (tmp_path / "out.jpeg").read_bytes() == SAMPLE_BYTES
+
+    sink = io.BytesIO()
+    client.download(response.result.sample, sink)
+    assert sink.getvalue() == SAMPLE_BYTES
+    assert client.download(response).content == SAMPLE_BYTES
+
+
+def test_content_type_is_checked(bfl_server, tmp_path):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.generate("flux-dev", {"prompt": "x"}, SYNC_MODE)
+
+    with pytest.raises(BFLError, match="expected 'image/png'"):
+        client.download(response, tmp_path / "out.png", OutputFormat.png)
+    assert not list(tmp_path.iterdir())
+
+
+def test_download_many(bfl_server, tmp_path):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    responses = [
+        r.response
+        for r in client.generate_many(
+            "flux-dev", [{"prompt": str(i)} for i in range(5)], config=SYNC_MODE
+        )
+    ]
+
+    results = list(client.download_many(responses, str(tmp_path)))
+    assert all(r.ok for r in results)
+    assert {r.key for r in results} == {r.id for r in responses}
+    for r in results:
+        assert r.path == str(tmp_path / f"{r.key}.jpeg")
+
+
+def test_soonest_expiring_url_is_downloaded_first(bfl_server):
+    order = []
+
+    class Sink(io.BytesIO):
+        def __init__(self, name):
+            super().__init__()
+            self.name = name
+
+        def write(self, data):
+            if not self.getvalue():
+                order.append(self.name)
+            return super().write(data)
+
+    base = f"{bfl_server.url}/samples/s.jpeg"
+    with Downloader(max_workers=1) as downloader:
+        # Queue everything before the worker can pick up a job
+        with downloader._cond:
+            futures = [
+                downloader.submit(f"{base}?Expires={expiry}", Sink(name))
+                for name, expiry in (("late", 4e9), ("early", 2e9), ("mid", 3e9))
+            ]
+        for future in futures:
+            assert future.result().ok
+
+    assert order == ["early", "mid", "late"]
+
+
+def test_unexpected_errors_fail_the_job_not_the_worker(bfl_server, monkeypatch):
+    class BrokenSink(io.BytesIO):
+        def write(self, data):
+            raise RuntimeError("sink broken")
+
+    url = f"{bfl_server.url}/samples/s.jpeg"
+    with Downloader(max_workers=1) as downloader:
+        broken = downloader.submit(url, BrokenSink()).result(timeout=10)
+        assert not broken.ok and broken.error == "sink broken"
+        # The same worker still serves later jobs
+        assert downloader.submit(url, io.BytesIO()).result(timeout=10).ok
+
+    fetch = Downloader._fetch
+
+    def flaky_fetch(self, job):
+        if job.key == "0":
+            raise ValueError("corrupt sample")
+        return fetch(self, job)
+
+    monkeypatch.setattr(Downloader, "_fetch", flaky_fetch)
+    with Downloader(max_workers=2) as downloader:
+        results = {r.key: r for r in downloader.download_many([url] * 3)}
+    assert results["0"].error == "corrupt sample"
+    assert results["1"].ok and results["2"].ok
+
+
+def test_close_can_cancel_queued_downloads(bfl_server):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowSink(io.BytesIO):
+        def write(self, data):
+            started.set()
+            release.wait(10)
+            return super().write(data)
+
+    url = f"{bfl_server.url}/samples/s.jpeg"
+    downloader = Downloader(max_workers=1)
+    running = downloader.submit(url, SlowSink())
+    queued = [downloader.submit(url) for _ in range(3)]
+    assert started.wait(10)
+    threading.Timer(0.2, release.set).start()
+    downloader.close(cancel_futures=True)
+
+    # The running download finishes; the queued ones are never started
+    assert running.result(timeout=0).ok
+    assert all(future.cancelled() for future in queued)
+    assert bfl_server.state.count("GET", "/samples/s.jpeg") == 1
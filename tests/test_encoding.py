@@ -0,0 +1,180 @@
+import asyncio
+import base64
+import json
+import os
+import threading
+import zipfile
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.images.encoding import (
+    FileImage,
+    StreamedValue,
+    StreamingJSONBody,
+    encode_file,
+    encode_zip_member,
+    iter_base64,
+    iter_base64_zip_member,
+    open_archive,
+    stored_member_offset,
+)
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+ASYNC_MODE = ClientConfig(sync=False)
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path / "input.png"
+    # Not a multiple of the chunk size, so the last chunk is padded
+    path.write_bytes(os.urandom(3 * 1000 + 2))
+    return path
+
+
+def test_chunked_encoding_matches_b64encode(image_file):
+    expected = base64.b64encode(image_file.read_bytes())
+    assert b"".join(iter_base64(image_file, chunk_size=300)) == expected
+    assert encode_file(image_file) == expected.decode()
+    assert len(FileImage(image_file)) == len(expected)
+
+
+def test_streaming_body_is_valid_json(image_file):
+    body = StreamingJSONBody(
+        {"prompt": 'a "quoted" prompt', "image": FileImage(image_file), "n": [1]}
+    )
+    data = body.to_bytes()
+    assert len(body) == len(data)
+    # Iterating again starts over so a request can be retried
+    assert body.to_bytes() == data
+    payload = json.loads(data)
+    assert payload["prompt"] == 'a "quoted" prompt'
+    assert base64.b64decode(payload["image"]) == image_file.read_bytes()
+    assert StreamingJSONBody.wrap({"image": "aGk="}) is None
+
+
+def test_process_image_streams_file(bfl_server, image_file):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.process_image(str(image_file), strength=0.5)
+
+    payload = bfl_server.state.tasks[response.task_id]["payload"]
+    assert payload["strength"] == 0.5
+    assert base64.b64decode(payload["image"]) == image_file.read_bytes()
+
+
+def test_kontext_input_paths_are_streamed(bfl_server, image_file):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key", base_url=bfl_server.url, transport=AsyncHTTPTransport()
+        ) as client:
+            return await client.generate(
+                "flux-kontext-pro",
+                {"prompt": "x", "input_image": str(image_file)},
+                ASYNC_MODE,
+            )
+
+    response = asyncio.run(run())
+    payload = bfl_server.state.tasks[response.id]["payload"]
+    assert base64.b64decode(payload["input_image"]) == image_file.read_bytes()
+
+
+def test_streamed_bodies_are_encoded_off_the_event_loop(bfl_server, image_file):
+    threads = []
+
+    class RecordingBody(StreamingJSONBody):
+        def __iter__(self):
+            for chunk in super().__iter__():
+                threads.append(threading.current_thread())
+                yield chunk
+
+    body = RecordingBody({"prompt": "x", "image": FileImage(image_file)})
+
+    async def run():
+        transport = AsyncHTTPTransport()
+        try:
+            return await transport.request(
+                "POST", f"{bfl_server.url}/v1/image", body=body
+            )
+        finally:
+            await transport.aclose()
+
+    response = asyncio.run(run())
+    payload = bfl_server.state.tasks[response.json()["id"]]["payload"]
+    assert base64.b64decode(payload["image"]) == image_file.read_bytes()
+    assert threads and threading.main_thread() not in threads
+
+
+def test_zip_members_are_encoded_in_place(tmp_path):
+    path = tmp_path / "images.zip"
+    stored, deflated = os.urandom(3 * 1000 + 1), b"deflated" * 500
+    with zipfile.ZipFile(path, "w") as zf:
+        # A local extra field the central directory does not have
+        info = zipfile.ZipInfo("stored.png")
+        info.extra = b"\xca\xfe\x04\x00data"
+        zf.writestr(info, stored)
+        zf.writestr("deflated.png", deflated, zipfile.ZIP_DEFLATED)
+        zf.writestr("empty.png", b"")
+
+    with zipfile.ZipFile(path) as zf:
+        infos = {info.filename: info for info in zf.infolist()}
+    with open(path, "rb") as f:
+        offset = stored_member_offset(f, infos["stored.png"])
+        f.seek(offset)
+        assert f.read(len(stored)) == stored
+        assert stored_member_offset(f, infos["deflated.png"]) is None
+
+    for name, data in (("stored.png", stored), ("deflated.png", deflated)):
+        expected = base64.b64encode(data)
+        assert encode_zip_member(path, infos[name]) == expected
+        chunks = iter_base64_zip_member(path, infos[name], chunk_size=300)
+        assert b"".join(chunks) == expected
+    assert encode_zip_member(path, infos["empty.png"]) == b""
+
+    # Corrupt data is caught even though zipfile is bypassed
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(zipfile.BadZipFile):
+        encode_zip_member(path, infos["stored.png"])
+
+
+def test_compressed_members_share_an_open_archive(tmp_path, monkeypatch):
+    path = tmp_path / "images.zip"
+    members = {f"{i}.png": os.urandom(100) * 5 for i in range(20)}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    with zipfile.ZipFile(path) as zf:
+        infos = zf.infolist()
+
+    opened = []
+
+    class CountingZipFile(zipfile.ZipFile):
+        def __init__(self, *args, **kwargs):
+            opened.append(args[0])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(zipfile, "ZipFile", CountingZipFile)
+    for info in infos:
+        encoded = encode_zip_member(path, info)
+        assert base64.b64decode(encoded) == members[info.filename]
+        assert b"".join(iter_base64_zip_member(path, info)) == encoded
+    assert len(opened) == 1
+
+    # Other threads open their own, and a changed file is reopened
+    thread = threading.Thread(target=encode_zip_member, args=(path, infos[0]))
+    thread.start()
+    thread.join()
+    os.utime(path, ns=(0, 0))
+    assert open_archive(path) is open_archive(path)
+    assert len(opened) == 3
+
+
+def test_streamed_values_must_implement_iter_and_len():
+    class Partial(StreamedValue):
+        def __iter__(self):
+            yield b""
+
+    with pytest.raises(TypeError):
+        Partial()
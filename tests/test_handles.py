@@ -0,0 +1,143 @@
+import asyncio
+import concurrent.futures
+import time
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.journal import TaskJournal
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.transport.rate_limit import RateLimiter
+from blackforest.types.general.client_config import ClientConfig
+
+CONFIG = ClientConfig(polling_interval=0.1)
+
+
+def test_handles_resolve_in_background(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    called = []
+    handles = [client.submit("flux-dev", {"prompt": str(i)}, CONFIG) for i in range(8)]
+    handles[0].add_done_callback(called.append)
+
+    done, pending = concurrent.futures.wait(handles, timeout=10)
+    assert not pending
+    assert all(h.result().ok and h.result().id == h.id for h in handles)
+    assert called == [handles[0]]
+
+    # All handles were polled by one shared thread
+    assert len(client._background_pollers) == 1
+
+
+def test_as_completed_and_await(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    handles = [client.submit("flux-dev", {"prompt": str(i)}, CONFIG) for i in range(3)]
+    finished = list(concurrent.futures.as_completed(handles, timeout=10))
+    assert set(finished) == set(handles)
+
+    async def run():
+        return await client.submit("flux-dev", {"prompt": "x"}, CONFIG)
+
+    assert asyncio.run(run()).ok
+
+
+def test_cancel_stops_polling(bfl_server, tmp_path):
+    limiter = RateLimiter(max_in_flight=2)
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        rate_limiter=limiter,
+        journal=TaskJournal(tmp_path / "tasks.jsonl"),
+    )
+    bfl_server.state.ready_after = 1000
+    handle = client.submit("flux-dev", {"prompt": "x"}, CONFIG)
+
+    try:
+        handle.result(timeout=0.3)
+    except concurrent.futures.TimeoutError:
+        pass
+    assert handle.cancel() and handle.cancelled()
+    polls = bfl_server.state.count("GET", "/v1/get_result")
+    time.sleep(0.4)
+    assert bfl_server.state.count("GET", "/v1/get_result") == polls
+    # The slot is freed, but the task is still pending and can be resumed
+    assert limiter.in_flight.in_flight == 0
+    assert client.journal.get(handle.id).pending
+
+
+def test_track_existing_response(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    handle = client.track(response, CONFIG)
+    assert client.track(response.id, CONFIG) is handle
+    assert handle.result(timeout=10).ok
+
+
+def test_async_submit(bfl_server):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key", base_url=bfl_server.url, transport=AsyncHTTPTransport()
+        ) as client:
+            tasks = [
+                await client.submit("flux-dev", {"prompt": str(i)}, CONFIG)
+                for i in range(3)
+            ]
+            return [await t for t in asyncio.as_completed(tasks, timeout=10)]
+
+    results = asyncio.run(run())
+    assert len(results) == 3 and all(r.ok for r in results)
+
+
+def test_cancelled_async_task_stays_pending(bfl_server, tmp_path):
+    bfl_server.state.ready_after = 1000
+    limiter = RateLimiter(max_in_flight=2)
+    journal = TaskJournal(tmp_path / "tasks.jsonl")
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            rate_limiter=limiter,
+            journal=journal,
+        ) as client:
+            task = await client.submit("flux-dev", {"prompt": "x"}, CONFIG)
+            await asyncio.sleep(0.2)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert limiter.in_flight.in_flight == 0
+    assert [r.status for r in journal] == ["Pending"]
+
+
+def test_async_tasks_report_final_states_like_the_poller(bfl_server, tmp_path):
+    bfl_server.state.ready_after = 1000
+    limiter = RateLimiter(max_in_flight=3)
+    journal = TaskJournal(tmp_path / "tasks.jsonl")
+    config = ClientConfig(polling_interval=0.1, max_retries=3)
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            rate_limiter=limiter,
+            journal=journal,
+        ) as client:
+            timed_out = await (await client.submit("flux-dev", {"prompt": "a"}, config))
+
+            task = await client.submit("flux-dev", {"prompt": "b"}, config)
+            bfl_server.state.fail_task_ids.update(bfl_server.state.tasks)
+            failed = await task
+
+            task = await client.submit("flux-dev", {"prompt": "c"}, config)
+            bfl_server.state.inject(404)
+            errored = await task
+            return timed_out, failed, errored
+
+    timed_out, failed, errored = asyncio.run(run())
+    assert timed_out.status == "Timeout" and timed_out.polls == 3
+    assert failed.status == "failed" and failed.error == "boom"
+    assert errored.status == "Error"
+    assert limiter.in_flight.in_flight == 0
+    # Only the task the API reported as failed is final in the journal
+    statuses = {r.task_id: r.status for r in journal}
+    assert sorted(statuses.values()) == ["Pending", "Pending", "failed"]
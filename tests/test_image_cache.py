@@ -0,0 +1,75 @@
+import base64
+import os
+import zipfile
+
+from blackforest import BFLClient
+from blackforest.images.cache import EncodedImageCache, file_key
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_file_encoding_is_cached(tmp_path):
+    image = _write(tmp_path / "ref.png", b"first-version")
+    cache = EncodedImageCache()
+
+    assert cache.encode_file(image) == base64.b64encode(b"first-version").decode()
+    cache.encode_file(image)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # Changing the file changes its key
+    _write(image, b"second-version!")
+    os.utime(image, ns=(1, 1))
+    assert cache.encode_file(image) == base64.b64encode(b"second-version!").decode()
+    assert cache.stats()["misses"] == 2
+
+
+def test_memory_tier_is_lru_bounded(tmp_path):
+    paths = [_write(tmp_path / f"{i}.png", bytes([i]) * 30) for i in range(3)]
+    # Each encoding is 40 bytes, so two fit
+    cache = EncodedImageCache(max_bytes=80)
+    cache.encode_file(paths[0])
+    cache.encode_file(paths[1])
+    cache.encode_file(paths[0])
+    cache.encode_file(paths[2])
+
+    assert len(cache) == 2
+    assert cache.size == 80
+    assert cache.get(file_key(paths[1])) is None
+    assert cache.get(file_key(paths[0])) is not None
+
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    image = _write(tmp_path / "ref.png", b"reference")
+    EncodedImageCache(disk_dir=tmp_path / "cache").encode_file(image)
+
+    cache = EncodedImageCache(disk_dir=tmp_path / "cache")
+    assert cache.encode_file(image) == base64.b64encode(b"reference").decode()
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 0
+
+
+def test_client_uses_cache_for_folders_and_zips(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    _write(folder / "a.png", b"a-bytes")
+    archive = tmp_path / "images.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("b.jpg", b"b-bytes")
+        zf.writestr("notes.txt", b"ignored")
+
+    cache = EncodedImageCache()
+    client = BFLClient(api_key="test-key", image_cache=cache)
+    for _ in range(2):
+        assert client._process_folder(str(folder)) == [
+            base64.b64encode(b"a-bytes").decode()
+        ]
+        assert client._process_zip(str(archive)) == [
+            base64.b64encode(b"b-bytes").decode()
+        ]
+
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,77 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+from pydantic import ValidationError
+
+from blackforest.images import validation
+from blackforest.images.validation import is_base64, probe_image
+from blackforest.types.inputs.flux_pro_1_1 import FluxPro11Inputs
+from blackforest.types.inputs.flux_pro_expand import FluxProExpandInputs
+
+
+def _encode(size=(320, 256), mode="RGB", fmt="PNG", **save_kwargs):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=fmt, **save_kwargs)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.mark.parametrize(
+    "mode,fmt",
+    [
+        ("RGB", "PNG"),
+        ("RGBA", "PNG"),
+        ("L", "JPEG"),
+        ("RGB", "JPEG"),
+        ("RGB", "WEBP"),
+        ("RGBA", "WEBP"),
+        ("P", "GIF"),
+        ("RGB", "BMP"),
+    ],
+)
+def test_probe_matches_pillow(mode, fmt):
+    info = probe_image(_encode((333, 271), mode, fmt))
+    assert info.size == (333, 271)
+    assert info.format == fmt
+
+
+def test_jpeg_header_after_large_metadata_segment():
+    # The frame header follows ~60KB of EXIF data, past the first prefixes
+    image = _encode((300, 280), fmt="JPEG", exif=b"Exif\x00\x00" + b"\x00" * 60000)
+    assert probe_image(image).size == (300, 280)
+
+
+def test_only_header_is_decoded(monkeypatch):
+    validation.clear_cache()
+    image = _encode((512, 512), fmt="PNG")
+    # Corrupt the middle of the payload: the header path never looks at it
+    middle = len(image) // 2 - len(image) // 2 % 4
+    corrupted = image[:middle] + "////" + image[middle + 4 :]
+    monkeypatch.setattr(validation, "_probe_full", pytest.fail)
+    assert probe_image(corrupted).size == (512, 512)
+
+
+def test_results_are_cached(monkeypatch):
+    validation.clear_cache()
+    image = _encode(fmt="JPEG")
+    probe_image(image)
+    monkeypatch.setattr(validation, "_probe_header", pytest.fail)
+    assert probe_image(image).size == (320, 256)
+
+
+def test_is_base64():
+    assert is_base64(_encode())
+    assert not is_base64("not base64!")
+    assert not is_base64("abc=def=")
+
+
+def test_models_use_header_validation():
+    with pytest.raises(ValidationError, match="at least 256x256"):
+        FluxProExpandInputs(image=_encode((128, 512)), top=64)
+    with pytest.raises(ValidationError, match="Invalid base64"):
+        FluxProExpandInputs(image="abcde", top=64)
+    FluxProExpandInputs(image=_encode(), top=64)
+
+    with pytest.raises(ValidationError, match="valid base64"):
+        FluxPro11Inputs(prompt="x", image_prompt="not base64!")
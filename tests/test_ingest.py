@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import json
+import os
+import tracemalloc
+import zipfile
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.images.encoding import StreamingJSONBody
+from blackforest.images.ingest import (
+    ImageSequence,
+    chunk_sources,
+    folder_sources,
+    zip_sources,
+)
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.ingestion_config import IngestionConfig
+from blackforest.types.inputs.generic import ImageInput
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "images.zip"
+    members = {f"img-{i}.png": os.urandom(1000 * i + 1) for i in range(6)}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+        zf.writestr("notes.txt", b"ignored")
+    return path, list(members.values())
+
+
+def _decoded(payload):
+    return [base64.b64decode(image) for image in payload["image"]]
+
+
+def test_sequence_matches_serial_encoding(archive):
+    path, members = archive
+    sources = zip_sources(path)
+    assert len(sources) == len(members)
+    # A budget smaller than some images streams those in chunks instead
+    sequence = ImageSequence(sources, workers=3, byte_budget=4000, chunk_size=300)
+    body = StreamingJSONBody({"image": [sequence], "strength": 1})
+
+    data = body.to_bytes()
+    assert len(body) == len(data)
+    assert body.to_bytes() == data
+    assert _decoded(json.loads(data)) == members
+
+
+def test_read_ahead_stays_within_budget(tmp_path):
+    path = tmp_path / "large.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(16):
+            zf.writestr(f"{i}.jpg", os.urandom(512 * 1024))
+
+    sequence = ImageSequence(zip_sources(path), workers=2, byte_budget=1024**2)
+    tracemalloc.start()
+    try:
+        sent = sum(len(chunk) for chunk in sequence)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert sent == len(sequence) > 10 * 1024**2
+    assert peak < 4 * 1024**2
+
+
+def test_zip_members_are_streamed(bfl_server, archive):
+    path, members = archive
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    assert all(not isinstance(v, str) for v in client._process_zip(str(path)))
+
+    response = client.process_image(ImageInput(zip_path=str(path)))
+    payload = bfl_server.state.tasks[response.task_id]["payload"]
+    assert _decoded(payload) == members
+
+
+def test_chunked_requests(bfl_server, tmp_path):
+    images = [os.urandom(300 + i) for i in range(5)]
+    for i, data in enumerate(images):
+        (tmp_path / f"{i}.png").write_bytes(data)
+    assert [s.size for s in folder_sources(tmp_path)] == [300, 301, 302, 303, 304]
+    assert [len(c) for c in chunk_sources(folder_sources(tmp_path), 900)] == [2, 2, 1]
+
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    ingestion = IngestionConfig(workers=2, max_images_per_request=2)
+    responses = client.process_image_chunks(
+        ImageInput(folder_path=str(tmp_path)), ingestion=ingestion, strength=0.5
+    )
+
+    assert len(responses) == 3
+    payloads = [bfl_server.state.tasks[r.task_id]["payload"] for r in responses]
+    assert [image for p in payloads for image in _decoded(p)] == images
+    assert all(p["strength"] == 0.5 for p in payloads)
+
+
+def test_async_parallel_ingestion(bfl_server, archive):
+    path, members = archive
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+        ) as client:
+            return await client.process_image(
+                ImageInput(zip_path=str(path)), ingestion=IngestionConfig()
+            )
+
+    response = asyncio.run(run())
+    payload = bfl_server.state.tasks[response.task_id]["payload"]
+    assert _decoded(payload) == members
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.journal import TaskJournal, input_hash
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+CONFIG = ClientConfig(polling_interval=0.1)
+ASYNC_MODE = ClientConfig(sync=False)
+
+
+def test_journal_replays_latest_state(tmp_path):
+    path = tmp_path / "tasks.jsonl"
+    with TaskJournal(path) as journal:
+        journal.submitted("a", "flux-dev", "https://x/a", "h1")
+        journal.submitted("b", "flux-dev", None, "h2")
+        journal.finished("a", "Ready")
+    # A write cut short by a crash is skipped
+    with open(path, "a") as f:
+        f.write('{"task_id": "b", "sta')
+
+    journal = TaskJournal(path)
+    assert journal.get("a").status == "Ready"
+    assert journal.get("a").polling_url == "https://x/a"
+    assert [r.task_id for r in journal.pending()] == ["b"]
+    assert journal.find("h2")[0].task_id == "b"
+
+    journal.compact()
+    assert len(path.read_text().splitlines()) == 1
+    journal.finished("b", "failed")
+    assert TaskJournal(path).get("b").status == "failed"
+
+
+def test_finished_tasks_are_bounded_and_compacted(tmp_path):
+    path = tmp_path / "tasks.jsonl"
+    journal = TaskJournal(path, max_finished=3)
+    journal.submitted("pending", "flux-dev")
+    for i in range(600):
+        journal.submitted(str(i), "flux-dev")
+        journal.finished(str(i), "Ready")
+
+    ids = ["pending", "597", "598", "599"]
+    assert [r.task_id for r in journal] == ids
+    # Compacted automatically instead of holding all 1201 lines
+    assert len(path.read_text().splitlines()) < 1201
+    journal.close()
+    assert [r.task_id for r in TaskJournal(path, max_finished=3)] == ids
+
+
+def test_input_hash_is_stable():
+    assert input_hash("flux-dev", {"a": 1, "b": 2}) == input_hash(
+        "flux-dev", {"b": 2, "a": 1}
+    )
+    assert input_hash("flux-dev", {"a": 1}) != input_hash("flux-pro", {"a": 1})
+
+
+def test_client_records_and_resumes_tasks(bfl_server, tmp_path):
+    path = tmp_path / "tasks.jsonl"
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, journal=TaskJournal(path)
+    )
+    first = client.generate("flux-dev", {"prompt": "a"}, ASYNC_MODE)
+    client.generate("flux-dev", {"prompt": "b"}, ASYNC_MODE)
+    client.get_task_status(first.id)
+    client.get_task_status(first.id)
+    record = client.journal.get(first.id)
+    assert record.status == "Ready" and record.model == "flux-dev"
+    payload = client._prepare_generation_payload("flux-dev", {"prompt": "a"})
+    assert record.input_hash == input_hash("flux-dev", payload)
+
+    # A new process picks up what the first one left pending
+    client.journal.close()
+    restarted = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, journal=TaskJournal(path)
+    )
+    handles = restarted.resume(CONFIG)
+    assert len(handles) == 1
+    assert handles[0].result(timeout=10).ok
+    assert restarted.journal.pending() == []
+    assert TaskJournal(path).pending() == []
+
+
+def test_async_resume(bfl_server, tmp_path):
+    journal = TaskJournal(tmp_path / "tasks.jsonl")
+    journal.submitted("x", "flux-dev")
+    bfl_server.state.tasks["x"] = {"path": "/v1/flux-dev", "polls": 0, "payload": {}}
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            journal=journal,
+        ) as client:
+            return await asyncio.gather(*await client.resume(CONFIG))
+
+    (result,) = asyncio.run(run())
+    assert result.ok and journal.get("x").status == "Ready"
+
+
+def test_resume_requires_journal():
+    with pytest.raises(ValueError):
+        BFLClient(api_key="k").resume()
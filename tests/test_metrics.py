@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+
+from blackforest import BFLClient
+from blackforest.metrics import (
+    CallbackSink,
+    InMemorySink,
+    Instrumentation,
+    MetricsSink,
+)
+from blackforest.transport.retry import RetryPolicy
+from blackforest.types.general.client_config import ClientConfig
+
+SYNC_MODE = ClientConfig(sync=True, polling_interval=0.1)
+
+
+def test_generation_metrics(bfl_server):
+    sink = InMemorySink()
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        instrumentation=Instrumentation([sink]),
+    )
+    for i in range(3):
+        response = client.generate("flux-dev", {"prompt": str(i)}, SYNC_MODE)
+    client.download(response)
+
+    assert (
+        sink.summary("generation.validation.duration", model="flux-dev")["count"] == 3
+    )
+    assert sink.summary("generation.submit.duration", model="flux-dev")["count"] == 3
+    ready = sink.summary("task.ready.duration", model="flux-dev", status="Ready")
+    assert ready["count"] == 3 and ready["p99"] >= ready["p50"] > 0
+    assert sink.summary("task.polls", model="flux-dev")["mean"] == 2
+    assert sink.histogram("http.request.duration", "endpoint") == {
+        "submit": 3,
+        "poll": 6,
+    }
+    assert sink.summary("http.upload.bytes", endpoint="submit")["count"] == 3
+    assert sink.summary("download.bytes", status="ok")["sum"] > 0
+
+
+def test_timed_steps_are_recorded_when_they_fail(bfl_server):
+    sink = InMemorySink()
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        instrumentation=Instrumentation([sink]),
+    )
+    client.generate("flux-dev", {"prompt": "x"}, SYNC_MODE)
+    with pytest.raises(ValueError):
+        client.generate("flux-dev", {"prompt": "x", "width": 7}, SYNC_MODE)
+
+    assert sink.histogram("generation.validation.duration", "outcome") == {
+        "ok": 1,
+        "error": 1,
+    }
+
+
+def test_retries_and_statuses_are_counted(bfl_server):
+    sink = InMemorySink()
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        retry_policy=RetryPolicy(backoff_factor=0.01),
+        instrumentation=Instrumentation([sink]),
+    )
+    bfl_server.state.inject(429)
+    client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+
+    assert sink.histogram("http.request.duration", "status") == {"429": 1, "200": 1}
+    assert sink.histogram("http.retry", "reason") == {"status_429": 1}
+
+
+def test_failing_sink_does_not_break_requests(bfl_server, caplog):
+    def broken(event):
+        raise RuntimeError("sink down")
+
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        instrumentation=Instrumentation([CallbackSink(broken)]),
+    )
+    with caplog.at_level(logging.DEBUG, logger="blackforest.metrics"):
+        assert client.generate("flux-dev", {"prompt": "x"}, SYNC_MODE).result
+    assert "Metrics sink" in caplog.text
+    assert "http.request.duration" in caplog.text
+
+
+def test_sinks_must_implement_emit():
+    class Silent(MetricsSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
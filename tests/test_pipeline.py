@@ -0,0 +1,94 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from conftest import SAMPLE_BYTES
+
+from blackforest import BFLClient
+from blackforest.download import Downloader
+from blackforest.types.general.client_config import ClientConfig
+
+CONFIG = ClientConfig(polling_interval=0.1)
+
+
+def test_pipeline_writes_images(bfl_server, tmp_path):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    inputs = [{"prompt": str(i)} for i in range(10)]
+    inputs[3] = {"prompt": "bad", "width": 7}
+
+    results = list(client.run_pipeline("flux-dev", inputs, str(tmp_path), CONFIG))
+
+    assert sorted(r.index for r in results) == list(range(10))
+    failed = [r for r in results if not r.ok]
+    assert [r.index for r in failed] == [3]
+    assert "Invalid inputs" in failed[0].error
+    for r in results:
+        if r.ok:
+            assert r.path == str(tmp_path / f"{r.id}.jpeg")
+            assert (tmp_path / f"{r.id}.jpeg").read_bytes() == SAMPLE_BYTES
+
+
+def test_pipeline_returns_content_without_output_dir(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    results = list(client.run_pipeline("flux-dev", [{"prompt": "x"}], config=CONFIG))
+    assert results[0].content == SAMPLE_BYTES
+    assert results[0].path is None
+
+
+def test_pipeline_reports_failed_download_futures(bfl_server, monkeypatch):
+    def submit(self, *args, **kwargs):
+        future = Future()
+        future.set_exception(ValueError("disk on fire"))
+        return future
+
+    monkeypatch.setattr(Downloader, "submit", submit)
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    inputs = [{"prompt": str(i)} for i in range(3)]
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.extend(
+            client.run_pipeline("flux-dev", inputs, config=CONFIG)
+        ),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(10)
+
+    assert not thread.is_alive()
+    assert sorted(r.index for r in results) == [0, 1, 2]
+    assert all(r.error == "disk on fire" for r in results)
+
+
+def test_pipeline_applies_backpressure(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    consumed = []
+
+    def inputs():
+        for i in itertools.count():
+            consumed.append(i)
+            yield {"prompt": str(i)}
+
+    results = client.run_pipeline(
+        "flux-dev",
+        inputs(),
+        config=CONFIG,
+        encode_workers=1,
+        submit_workers=1,
+        max_polling=2,
+        queue_size=1,
+    )
+    first = next(results)
+    assert first.ok
+    time.sleep(0.5)
+    # Only the items buffered between the stages were read, and reading
+    # stops while the results are not consumed
+    buffered = len(consumed)
+    assert buffered < 20
+    time.sleep(0.5)
+    assert len(consumed) == buffered
+
+    results.close()
+    submitted = bfl_server.state.count("POST", "/v1/flux-dev")
+    time.sleep(0.3)
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == submitted
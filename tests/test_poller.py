@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from blackforest import BFLClient, BFLError
+from blackforest.journal import TaskJournal
+from blackforest.polling.poller import TaskPoller
+from blackforest.transport.rate_limit import RateLimiter
+from blackforest.types.general.client_config import ClientConfig
+
+
+def _submit(client, n):
+    config = ClientConfig(sync=False)
+    return [
+        client.generate("flux-pro-1.1", {"prompt": f"p{i}"}, config).id
+        for i in range(n)
+    ]
+
+
+def test_poller_seeds_from_client_and_completes_all(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    task_ids = _submit(client, 25)
+
+    poller = TaskPoller(client, config=ClientConfig(polling_interval=0.1))
+    assert len(poller) == 25
+
+    results = list(poller.as_completed(timeout=30))
+    assert sorted(r.id for r in results) == sorted(task_ids)
+    assert all(r.ok and r.polls == 2 for r in results)
+    assert len(poller) == 0
+    # One thread, one request per poll: 25 tasks * 2 polls each
+    assert bfl_server.state.count("GET", "/v1/get_result") == 50
+
+
+def test_poller_reports_failures_per_task(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    ok_id, failed_id = _submit(client, 2)
+    bfl_server.state.fail_task_ids.add(failed_id)
+
+    results = {r.id: r for r in client.poll_many(config=ClientConfig())}
+    assert results[ok_id].ok
+    assert not results[failed_id].ok
+    assert results[failed_id].error == "boom"
+
+
+def test_poller_releases_slots_of_tasks_it_cannot_poll(bfl_server, tmp_path):
+    limiter = RateLimiter(max_in_flight=2)
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        rate_limiter=limiter,
+        journal=TaskJournal(tmp_path / "tasks.jsonl"),
+    )
+    (task_id,) = _submit(client, 1)
+    bfl_server.state.inject(404)
+
+    (result,) = list(TaskPoller(client, config=ClientConfig()).as_completed())
+    assert result.status == "Error"
+    assert limiter.in_flight.in_flight == 0
+    # The task may still finish, so it stays resumable
+    assert client.journal.get(task_id).pending
+
+
+def test_poller_gives_up_after_max_retries(bfl_server):
+    bfl_server.state.ready_after = 100
+    limiter = RateLimiter(max_in_flight=2)
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, rate_limiter=limiter
+    )
+    (task_id,) = _submit(client, 1)
+
+    config = ClientConfig(polling_interval=0.1, max_retries=3)
+    (result,) = list(TaskPoller(client, config=config).as_completed())
+    assert result.status == "Timeout"
+    assert result.polls == 3
+    assert limiter.in_flight.in_flight == 0
+
+
+def test_poller_overall_timeout(bfl_server):
+    bfl_server.state.ready_after = 100
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    _submit(client, 1)
+
+    poller = TaskPoller(client, config=ClientConfig(polling_interval=0.1))
+    with pytest.raises(BFLError, match="Timed out waiting for 1 pending tasks"):
+        list(poller.as_completed(timeout=0.3))
+
+
+def test_poller_accepts_tasks_added_from_other_threads(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    first, second = _submit(client, 2)
+    poller = TaskPoller(client, task_ids=[first], config=ClientConfig())
+
+    threading.Timer(0.2, poller.add, args=(second,)).start()
+    results = poller.as_completed(timeout=10)
+    assert next(results).id == first
+    assert next(results).id == second
@@ -0,0 +1,87 @@
+import random
+import time
+from email.utils import formatdate
+
+import pytest
+
+from blackforest import BFLClient
+from blackforest.polling.strategies import (
+    DecorrelatedJitter,
+    ExponentialBackoff,
+    FixedInterval,
+    LearnedLatency,
+    PollingStrategy,
+    parse_retry_after,
+)
+from blackforest.types.general.client_config import ClientConfig
+
+
+def test_default_strategy_uses_polling_interval():
+    strategy = ClientConfig(polling_interval=2.5).get_polling_strategy()
+    assert isinstance(strategy, FixedInterval)
+    assert strategy.next_delay(1, 0.0) == 2.5
+
+
+def test_strategies_must_implement_next_delay():
+    class NoDelay(PollingStrategy):
+        pass
+
+    with pytest.raises(TypeError):
+        NoDelay()
+
+
+def test_exponential_backoff_is_capped():
+    strategy = ExponentialBackoff(initial=0.5, factor=2, max_interval=3)
+    delays = [strategy.next_delay(attempt, 0.0) for attempt in range(1, 6)]
+    assert delays == [0.5, 1.0, 2.0, 3, 3]
+
+
+def test_decorrelated_jitter_stays_in_bounds():
+    strategy = DecorrelatedJitter(base=0.5, cap=4, rng=random.Random(0))
+    delay = 0.0
+    for attempt in range(1, 50):
+        new_delay = strategy.next_delay(attempt, delay)
+        assert 0.5 <= new_delay <= min(4, max(0.5, delay * 3))
+        delay = new_delay
+
+
+def test_learned_latency_tracks_each_model():
+    strategy = LearnedLatency(interval=0.5, smoothing=0.5)
+    assert strategy.initial_delay("flux-dev") == 0.0
+
+    strategy.record("flux-dev", 10.0, polls=3)
+    strategy.record("flux-dev", 20.0, polls=3)
+    assert strategy.expected_latency("flux-dev") == 15.0
+    assert strategy.initial_delay("flux-dev") == 12.0
+    assert strategy.expected_latency("flux-pro") == 0.0
+    assert strategy.next_delay(1, 12.0, "flux-dev") == 0.5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 0 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_sync_generate_reports_polls_and_honors_retry_after(bfl_server):
+    bfl_server.state.ready_after = 2
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.generate(
+        "flux-pro-1.1", {"prompt": "x"}, ClientConfig(sync=False)
+    )
+
+    bfl_server.state.inject(200, {"status": "Pending"}, {"Retry-After": "1"})
+    config = ClientConfig(polling_strategy=FixedInterval(0.1))
+    start = time.monotonic()
+    result, polls = client._wait_for_result(response.id, config)
+    assert time.monotonic() - start >= 1.0
+    assert polls == 4
+    assert result["sample"].endswith(".jpeg")
+
+
+def test_sync_response_includes_poll_count(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    config = ClientConfig(sync=True, polling_strategy=ExponentialBackoff(0.1))
+    response = client.generate("flux-dev", {"prompt": "x"}, config)
+    assert response.polls == 2
@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import io
+import threading
+
+from PIL import Image
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.images.preprocess import ImagePreprocessor
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+
+def _image(size, mode="RGB", format="JPEG", **save_args):
+    image = Image.effect_noise(size, 40).convert(mode)
+    out = io.BytesIO()
+    image.save(out, format=format, **save_args)
+    return out.getvalue()
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def _open(value):
+    return Image.open(io.BytesIO(base64.b64decode(value)))
+
+
+def test_large_photos_are_downscaled_rotated_and_stripped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    exif[0x010F] = "Camera maker"
+    original = _image((4000, 3000), exif=exif.tobytes(), quality=95)
+
+    preprocessor = ImagePreprocessor(max_megapixels=1.0, processes=0)
+    inputs = preprocessor.process(
+        "flux-pro-1.0-canny", {"control_image": _b64(original)}
+    )
+
+    image = _open(inputs["control_image"])
+    assert image.format == "JPEG"
+    assert image.height > image.width  # orientation applied
+    assert 0.95e6 < image.width * image.height <= 1e6
+    assert not image.getexif()
+    stats = preprocessor.stats()
+    assert stats["bytes_in"] == len(original) > 4 * stats["bytes_out"]
+
+
+def test_masks_keep_matching_their_image():
+    image = _b64(_image((1500, 1000), "RGBA", "PNG"))
+    mask = Image.new("L", (1500, 1000))
+    mask.paste(255, (500, 250, 1000, 750))
+    out = io.BytesIO()
+    mask.save(out, format="PNG")
+
+    preprocessor = ImagePreprocessor(max_megapixels=0.25, processes=0)
+    inputs = preprocessor.process(
+        "flux-pro-1.0-fill", {"image": image, "mask": _b64(out.getvalue())}
+    )
+
+    image, mask = _open(inputs["image"]), _open(inputs["mask"])
+    assert image.format == mask.format == "PNG" and image.mode == "RGBA"
+    assert image.size == mask.size == (612, 408)
+    assert set(mask.getdata()) == {0, 255}
+
+
+def test_expand_margins_follow_the_image_and_small_images_are_kept():
+    preprocessor = ImagePreprocessor(max_megapixels=1.0, processes=0)
+    inputs = {"image": _b64(_image((2000, 2000))), "top": 400, "left": 0}
+    processed = preprocessor.process("flux-pro-1.0-expand", inputs)
+    assert _open(processed["image"]).size == (1000, 1000)
+    assert processed["top"] == 200 and processed["left"] == 0
+
+    small = {"image": _b64(_image((512, 512), optimize=True)), "top": 64}
+    assert preprocessor.process("flux-pro-1.0-expand", small) == small
+    assert preprocessor.process("flux-dev", {"prompt": "x"}) == {"prompt": "x"}
+
+
+def test_client_preprocesses_in_a_process_pool(bfl_server, tmp_path):
+    path = tmp_path / "depth.png"
+    path.write_bytes(_image((2400, 1800), format="PNG"))
+
+    with ImagePreprocessor(processes=1) as preprocessor:
+        client = BFLClient(
+            api_key="test-key", base_url=bfl_server.url, preprocessor=preprocessor
+        )
+        response = client.generate(
+            "flux-pro-1.0-depth",
+            {"prompt": "x", "control_image": str(path)},
+            ClientConfig(sync=False),
+        )
+
+    payload = bfl_server.state.tasks[response.id]["payload"]
+    image = _open(payload["control_image"])
+    assert image.format == "JPEG" and image.width * image.height <= 2e6
+
+
+def test_async_client_preprocesses_off_the_event_loop(bfl_server):
+    threads = []
+
+    class Recording(ImagePreprocessor):
+        def process(self, model, inputs):
+            threads.append(threading.current_thread())
+            return super().process(model, inputs)
+
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            preprocessor=Recording(processes=0),
+        ) as client:
+            inputs = {"prompt": "x", "control_image": _b64(_image((512, 512)))}
+            await client.generate("flux-pro-1.0-depth", inputs, ClientConfig())
+            items = client.generate_many("flux-pro-1.0-canny", [inputs])
+            return [item async for item in items]
+
+    results = asyncio.run(run())
+    assert results[0].ok
+    assert len(threads) == 2 and threading.main_thread() not in threads
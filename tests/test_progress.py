@@ -0,0 +1,55 @@
+import logging
+
+from blackforest import BFLClient
+from blackforest.progress import ProgressReporter
+from blackforest.types.general.client_config import ClientConfig
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reports_are_rate_limited():
+    clock = Clock()
+    reports = []
+    progress = ProgressReporter(
+        total=10, interval=5, callback=reports.append, clock=clock
+    )
+    for i in range(10):
+        clock.now = i
+        progress.update("ok" if i % 3 else "error")
+
+    # Due at t=5 only; the rest were suppressed
+    assert [r["done"] for r in reports] == [6]
+    progress.close()
+    assert reports[-1]["counts"] == {"error": 4, "ok": 6}
+    assert reports[-1]["total"] == 10
+
+
+def test_batch_progress_is_logged(bfl_server, caplog):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    inputs = [{"prompt": str(i)} for i in range(4)] + [{"prompt": "x", "width": 7}]
+    progress = ProgressReporter(total=5, interval=60)
+
+    with caplog.at_level(logging.DEBUG, logger="blackforest"):
+        results = list(
+            client.generate_many(
+                "flux-dev",
+                inputs,
+                config=ClientConfig(sync=True, polling_interval=0.1),
+                progress=progress,
+            )
+        )
+
+    assert len(results) == 5
+    (line,) = [r for r in caplog.records if r.name == "blackforest.progress"]
+    assert line.getMessage().startswith("5/5 finished (error=1 ok=4), ")
+    # Per-attempt polling diagnostics go to the client's logger, not stdout
+    assert any(
+        r.name == "blackforest.client" and r.getMessage().startswith("Polling task")
+        for r in caplog.records
+    )
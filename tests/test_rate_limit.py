@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient, BFLError
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.transport.rate_limit import (
+    InFlightLimiter,
+    RateLimiter,
+    TokenBucket,
+)
+from blackforest.transport.retry import RetryPolicy
+from blackforest.types.general.client_config import ClientConfig
+
+ASYNC_MODE = ClientConfig(sync=False)
+
+
+def test_token_bucket_spaces_out_requests():
+    bucket = TokenBucket(rate=10, burst=1)
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.1, abs=0.01)
+    assert waits[2] == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_adapts_to_rate_limiting():
+    bucket = TokenBucket(rate=8, min_rate=2, recovery_step=1)
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.rate == 2
+    bucket.penalize()
+    assert bucket.rate == 2
+    bucket.reward()
+    assert bucket.rate == 3
+
+
+def test_in_flight_limiter_blocks_until_release():
+    limiter = InFlightLimiter(1)
+    assert limiter.acquire()
+    assert not limiter.acquire(timeout=0.05)
+    threading.Timer(0.05, limiter.release).start()
+    assert limiter.acquire(timeout=2)
+
+
+def test_async_waiters_are_woken_by_release():
+    limiter = InFlightLimiter(1)
+    assert limiter.try_acquire()
+
+    async def run():
+        assert not await limiter.acquire_async(timeout=0.05)
+        # A cancelled waiter passes its wake-up on to the next one
+        cancelled = asyncio.ensure_future(limiter.acquire_async())
+        waiting = asyncio.ensure_future(limiter.acquire_async(timeout=2))
+        await asyncio.sleep(0.01)
+        limiter.release()
+        cancelled.cancel()
+        return await waiting, cancelled.cancelled()
+
+    assert asyncio.run(run()) == (True, True)
+    assert limiter.in_flight == 1
+
+
+def test_task_slots_time_out_and_abandoned_tasks_are_released(bfl_server):
+    limiter = RateLimiter(max_in_flight=1, slot_timeout=0.1)
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, rate_limiter=limiter
+    )
+    client.generate("flux-dev", {"prompt": "1"}, ASYNC_MODE)
+    with pytest.raises(BFLError, match="within 0.1 seconds"):
+        client.generate("flux-dev", {"prompt": "2"}, ASYNC_MODE)
+
+    # A task nobody polls gives its slot back after task_ttl
+    limiter = RateLimiter(max_in_flight=1, task_ttl=0.2)
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, rate_limiter=limiter
+    )
+    client.generate("flux-dev", {"prompt": "1"}, ASYNC_MODE)
+    start = time.monotonic()
+    client.generate("flux-dev", {"prompt": "2"}, ASYNC_MODE)
+    assert 0.1 <= time.monotonic() - start < 2
+    assert limiter.in_flight.in_flight == 1
+
+
+def test_shared_limiter_is_per_api_key():
+    first = RateLimiter.shared("key-a", max_in_flight=3)
+    assert RateLimiter.shared("key-a") is first
+    assert RateLimiter.shared("key-b") is not first
+
+
+def test_submit_rate_is_limited(bfl_server):
+    limiter = RateLimiter(submit=TokenBucket(rate=20, burst=1))
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, rate_limiter=limiter
+    )
+
+    start = time.monotonic()
+    for i in range(5):
+        client.generate("flux-dev", {"prompt": str(i)}, ASYNC_MODE)
+    assert time.monotonic() - start >= 0.19
+
+
+def test_rate_limit_response_lowers_rate(bfl_server):
+    bucket = TokenBucket(rate=100)
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        rate_limiter=RateLimiter(submit=bucket),
+        retry_policy=RetryPolicy(backoff_factor=0.01),
+    )
+    bfl_server.state.inject(429)
+    client.generate("flux-dev", {"prompt": "x"}, ASYNC_MODE)
+    assert bucket.rate < 100
+
+
+def test_max_in_flight_is_shared_by_sync_and_async_clients(bfl_server):
+    limiter = RateLimiter(max_in_flight=2)
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, rate_limiter=limiter
+    )
+    first = client.generate("flux-dev", {"prompt": "1"}, ASYNC_MODE)
+    client.generate("flux-dev", {"prompt": "2"}, ASYNC_MODE)
+    assert limiter.in_flight.in_flight == 2
+
+    async def submit_third():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            rate_limiter=limiter,
+        ) as async_client:
+            return await asyncio.wait_for(
+                async_client.generate("flux-dev", {"prompt": "3"}, ASYNC_MODE), 5
+            )
+
+    # Finishing the first task frees a slot for the async client
+    threading.Timer(
+        0.2,
+        client.get_polling_result,
+        args=(first.id, ClientConfig(polling_interval=0.1)),
+    ).start()
+    start = time.monotonic()
+    asyncio.run(submit_third())
+    assert time.monotonic() - start >= 0.2
+    assert limiter.in_flight.in_flight == 2
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import SAMPLE_BYTES
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.result_cache import ResultCache
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.general.client_config import ClientConfig
+
+SYNC_MODE = ClientConfig(sync=True, polling_interval=0.1)
+ASYNC_MODE = ClientConfig(sync=False)
+SEEDED = {"prompt": "a forest", "seed": 42}
+
+
+def test_seeded_requests_are_submitted_once(bfl_server):
+    cache = ResultCache()
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+
+    first = client.generate("flux-dev", SEEDED, SYNC_MODE)
+    assert client.generate("flux-dev", dict(SEEDED), SYNC_MODE).id == first.id
+    # Async submissions are cached separately, as the running task
+    task = client.generate("flux-dev", SEEDED, ASYNC_MODE)
+    assert client.generate("flux-dev", SEEDED, ASYNC_MODE).id == task.id
+    # Unseeded and different requests are not deduplicated
+    client.generate("flux-dev", {"prompt": "a forest"}, ASYNC_MODE)
+    client.generate("flux-dev", {"prompt": "a forest"}, ASYNC_MODE)
+    client.generate("flux-dev", {**SEEDED, "seed": 43}, ASYNC_MODE)
+
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 5
+    assert cache.stats.hits == 2
+
+
+def test_concurrent_identical_requests_are_coalesced(bfl_server):
+    cache = ResultCache()
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(
+            pool.map(lambda _: client.generate("flux-dev", SEEDED, SYNC_MODE), range(8))
+        )
+
+    assert len({r.id for r in responses}) == 1
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 1
+    stats = cache.stats.snapshot()
+    assert stats["coalesced"] + stats["hits"] == 7
+
+
+def test_disk_tier_survives_restart_and_expires(bfl_server, tmp_path):
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        result_cache=ResultCache(disk_dir=tmp_path),
+    )
+    first = client.generate("flux-dev", SEEDED, SYNC_MODE)
+
+    cache = ResultCache(disk_dir=tmp_path)
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+    assert client.generate("flux-dev", SEEDED, SYNC_MODE).id == first.id
+    assert cache.stats.disk_hits == 1
+
+    for path in tmp_path.iterdir():
+        os.utime(path, (0, 0))
+    assert cache.prune() == 1
+    assert ResultCache(disk_dir=tmp_path).get(next(iter(cache._responses))) is None
+
+
+def test_downloads_are_served_from_cache(bfl_server, tmp_path):
+    cache = ResultCache(disk_dir=tmp_path / "cache")
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+    response = client.generate("flux-dev", SEEDED, SYNC_MODE)
+
+    assert client.download(response).content == SAMPLE_BYTES
+    client.download(response, tmp_path / "a.jpeg")
+    assert (tmp_path / "a.jpeg").read_bytes() == SAMPLE_BYTES
+    assert bfl_server.state.count("GET", "/samples/") == 1
+
+    restarted = ResultCache(disk_dir=tmp_path / "cache")
+    assert restarted.get_content(response.id) == ("image/jpeg", SAMPLE_BYTES)
+
+
+def test_sample_bytes_are_bounded_and_only_kept_for_cached_tasks(bfl_server, tmp_path):
+    cache = ResultCache(max_content_bytes=2 * len(SAMPLE_BYTES))
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+
+    # Downloads to files are streamed, not cached
+    seeded = client.generate("flux-dev", SEEDED, SYNC_MODE)
+    client.download(seeded, tmp_path / "a.jpeg")
+    assert cache.get_content(seeded.id) is None
+    # Nor are samples of unseeded requests
+    unseeded = client.generate("flux-dev", {"prompt": "a forest"}, SYNC_MODE)
+    client.download(unseeded)
+    assert cache.get_content(unseeded.id) is None
+
+    ids = [
+        client.generate("flux-dev", {**SEEDED, "seed": seed}, SYNC_MODE).id
+        for seed in range(3)
+    ]
+    for task_id in ids:
+        cache.put_content(task_id, "image/jpeg", SAMPLE_BYTES)
+    # The oldest sample was evicted to stay within the budget
+    assert cache.get_content(ids[0]) is None
+    assert cache.get_content(ids[2]) == ("image/jpeg", SAMPLE_BYTES)
+    assert cache._content_size == 2 * len(SAMPLE_BYTES)
+
+
+def test_async_requests_are_coalesced(bfl_server):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            result_cache=ResultCache(),
+        ) as client:
+            return await asyncio.gather(
+                *(client.generate("flux-dev", SEEDED, SYNC_MODE) for _ in range(5))
+            )
+
+    responses = asyncio.run(run())
+    assert len({r.id for r in responses}) == 1
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 1
+
+
+def test_batches_and_pipelines_share_cached_tasks(bfl_server, tmp_path):
+    cache = ResultCache()
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+    inputs = [SEEDED, {"prompt": "a lake"}, dict(SEEDED)]
+
+    # Pipelines submit without waiting, so their tasks are cached as async
+    batch = list(
+        client.generate_many(
+            "flux-dev", inputs, config=ClientConfig(sync=False), ordered=True
+        )
+    )
+    assert batch[0].response.id == batch[2].response.id != batch[1].response.id
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 2
+
+    config = ClientConfig(polling_interval=0.1)
+    results = sorted(
+        client.run_pipeline("flux-dev", inputs, str(tmp_path), config=config),
+        key=lambda r: r.index,
+    )
+    assert [r.ok for r in results] == [True] * 3
+    assert results[0].id == results[2].id == batch[0].response.id
+    # Only the unseeded input was submitted again
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 3
+
+
+
+@pytest.mark.parametrize(
+    "corrupt", [b'{"type": "sync", "da', b'{"type": "sync", "data": {}}']
+)
+def test_corrupt_disk_entries_are_misses(bfl_server, tmp_path, corrupt):
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        result_cache=ResultCache(disk_dir=tmp_path),
+    )
+    client.generate("flux-dev", SEEDED, SYNC_MODE)
+    for path in tmp_path.iterdir():
+        path.write_bytes(corrupt)
+
+    cache = ResultCache(disk_dir=tmp_path)
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url, result_cache=cache)
+    client.generate("flux-dev", SEEDED, SYNC_MODE)
+    assert cache.stats.misses == 1 and cache.stats.disk_hits == 0
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 2
+    # The entry was replaced by the new response
+    assert corrupt not in [path.read_bytes() for path in tmp_path.iterdir()]
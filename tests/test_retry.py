@@ -0,0 +1,117 @@
+import asyncio
+import socket
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient, BFLError
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.transport.retry import RetryBudget, RetryPolicy
+from blackforest.types.general.client_config import ClientConfig
+
+
+def _fast_policy(**kwargs):
+    return RetryPolicy(backoff_factor=0.01, jitter=False, **kwargs)
+
+
+def _closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_retry_reasons_are_idempotency_aware():
+    policy = RetryPolicy()
+    assert policy.retry_reason("GET", status=503) == "status_503"
+    assert policy.retry_reason("GET") == "connection"
+    assert policy.retry_reason("POST", status=429) == "status_429"
+    assert policy.retry_reason("POST", status=502) is None
+    assert policy.retry_reason("POST") is None
+    assert policy.retry_reason("POST", connect_error=True) == "connect"
+    assert policy.retry_reason("GET", status=400) is None
+
+
+def test_retry_after_is_honored_and_capped():
+    policy = RetryPolicy(backoff_factor=0.01, jitter=False, max_backoff=5)
+    assert policy.next_delay("GET", 1, status=503, headers={"retry-after": "2"}) == 2
+    assert policy.next_delay("GET", 2, status=503, headers={"retry-after": "60"}) == 5
+
+
+def test_retry_budget_limits_retries():
+    policy = _fast_policy(max_retries=10, budget=RetryBudget(ratio=0, min_tokens=2))
+    assert policy.next_delay("GET", 1, status=503) is not None
+    assert policy.next_delay("GET", 2, status=503) is not None
+    assert policy.next_delay("GET", 3, status=503) is None
+    assert policy.stats.snapshot()["budget_exhausted"] == 1
+
+
+def test_polling_retries_transient_statuses(bfl_server):
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, retry_policy=_fast_policy()
+    )
+    response = client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+
+    bfl_server.state.inject(503)
+    bfl_server.state.inject(502)
+    status = client.get_task_status(response.id)
+
+    assert status.status == "Pending"
+    stats = client.retry_stats.snapshot()
+    assert stats["retries"] == 2
+    assert stats["retries_by_reason"] == {"status_503": 1, "status_502": 1}
+
+
+def test_submission_is_not_retried_after_gateway_error(bfl_server):
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, retry_policy=_fast_policy()
+    )
+    bfl_server.state.inject(502, {"message": "bad gateway"})
+
+    with pytest.raises(BFLError, match="bad gateway"):
+        client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 1
+    assert client.retry_stats.retries == 0
+
+
+def test_submission_is_retried_after_rate_limit(bfl_server):
+    client = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, retry_policy=_fast_policy()
+    )
+    bfl_server.state.inject(429, headers={"Retry-After": "0"})
+
+    response = client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    assert response.id in bfl_server.state.tasks
+    assert bfl_server.state.count("POST", "/v1/flux-dev") == 2
+
+
+def test_connection_refused_raises_bfl_error():
+    client = BFLClient(
+        api_key="test-key",
+        base_url=_closed_port_url(),
+        retry_policy=_fast_policy(max_retries=2),
+    )
+    with pytest.raises(BFLError, match="API request failed"):
+        client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    stats = client.retry_stats.snapshot()
+    assert stats["retries_by_reason"] == {"connect": 2}
+    assert stats["gave_up"] == 1
+
+
+def test_async_client_retries(bfl_server):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key",
+            base_url=bfl_server.url,
+            transport=AsyncHTTPTransport(),
+            retry_policy=_fast_policy(),
+        ) as client:
+            bfl_server.state.inject(429)
+            response = await client.generate(
+                "flux-dev", {"prompt": "x"}, ClientConfig(sync=False)
+            )
+            bfl_server.state.inject(504)
+            await client.get_task_status(response.id)
+            return client.retry_stats.snapshot()
+
+    stats = asyncio.run(run())
+    assert stats["retries_by_reason"] == {"status_429": 1, "status_504": 1}
@@ -0,0 +1,119 @@
+import asyncio
+import socket
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.transport.async_http import AsyncHTTPTransport, TransportError
+from blackforest.transport.session import socket_options
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.general.connection_pool_config import ConnectionPoolConfig
+
+
+def test_pool_config_is_applied_to_session():
+    config = ConnectionPoolConfig(pool_maxsize=64, pool_block=True)
+    client = BFLClient(api_key="test-key", pool_config=config)
+    adapter = client.session.get_adapter("https://api.bfl.ai")
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 64
+    assert adapter.poolmanager.connection_pool_kw["block"] is True
+    assert client.session.headers["Connection"] == "keep-alive"
+
+
+def test_socket_options():
+    options = socket_options(ConnectionPoolConfig(tcp_keepalive=True))
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) in options
+    assert socket_options(
+        ConnectionPoolConfig(tcp_nodelay=False, tcp_keepalive=False)
+    ) == []
+
+
+def test_connections_are_reused(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    response = client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    for _ in range(4):
+        client.get_task_status(response.id)
+
+    assert client.connection_stats.snapshot() == {
+        "new_connections": 1,
+        "reused_connections": 4,
+    }
+
+
+def test_keep_alive_can_be_disabled(bfl_server):
+    client = BFLClient(
+        api_key="test-key",
+        base_url=bfl_server.url,
+        pool_config=ConnectionPoolConfig(keep_alive=False),
+    )
+    response = client.generate("flux-dev", {"prompt": "x"}, ClientConfig(sync=False))
+    client.get_task_status(response.id)
+
+    assert client.connection_stats.new_connections == 2
+    assert client.connection_stats.reused_connections == 0
+
+
+def test_async_transport_counts_connections(bfl_server):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key", base_url=bfl_server.url, transport=AsyncHTTPTransport()
+        ) as client:
+            response = await client.generate(
+                "flux-dev", {"prompt": "x"}, ClientConfig(sync=False)
+            )
+            await client.get_task_status(response.id)
+            return client.connection_stats.snapshot()
+
+    assert asyncio.run(run()) == {"new_connections": 1, "reused_connections": 1}
+
+
+async def _dropping_server(methods):
+    """Serve one request per connection, then drop it on the next one."""
+
+    async def handle(reader, writer):
+        served = 0
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                return
+            methods.append(head.split(b" ", 1)[0].decode())
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    await reader.readexactly(int(value))
+            if served:
+                writer.close()
+                return
+            served += 1
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_async_transport_resends_only_idempotent_requests():
+    async def run(method):
+        methods = []
+        server = await _dropping_server(methods)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+        transport = AsyncHTTPTransport()
+        try:
+            await transport.request("GET", url, timeout=10)
+            try:
+                response = await transport.request(method, url, body=b"{}", timeout=10)
+            except TransportError as e:
+                response = e
+            return response, methods, transport.stats.snapshot()
+        finally:
+            await transport.aclose()
+            server.close()
+
+    response, methods, stats = asyncio.run(run("GET"))
+    assert response.status == 200
+    # Dropped on the reused connection, then sent again on a fresh one
+    assert methods == ["GET", "GET", "GET"]
+    assert stats == {"new_connections": 2, "reused_connections": 0}
+
+    error, methods, stats = asyncio.run(run("POST"))
+    assert isinstance(error, TransportError)
+    assert methods == ["GET", "POST"]
+    assert stats == {"new_connections": 1, "reused_connections": 0}
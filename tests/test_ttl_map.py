@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from blackforest import BFLClient
+from blackforest.polling.ttl_map import TTLMap
+from blackforest.transport.rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_in_insertion_order():
+    clock = Clock()
+    removed = []
+    ttl_map = TTLMap(10, clock=clock, on_remove=lambda k, v: removed.append(k))
+    ttl_map["a"] = 1
+    clock.now = 5
+    ttl_map["b"] = 2
+    clock.now = 6
+    ttl_map["a"] = 3  # refreshed, now expires after "b"
+
+    clock.now = 14
+    assert ttl_map.get("b") == 2 and ttl_map["a"] == 3
+    clock.now = 15
+    assert ttl_map.get("b") is None
+    assert "a" in ttl_map and len(ttl_map) == 1
+    clock.now = 16
+    with pytest.raises(KeyError):
+        ttl_map["a"]
+
+    assert removed == ["b", "a"]
+    assert ttl_map.stats.snapshot() == {
+        "hits": 2,
+        "misses": 2,
+        "expired": 2,
+        "evicted": 0,
+    }
+
+
+def test_max_size_evicts_oldest():
+    removed = []
+    ttl_map = TTLMap(60, max_size=2, on_remove=lambda k, v: removed.append(k))
+    for key in "abc":
+        ttl_map[key] = key
+    assert ttl_map.keys() == ["b", "c"]
+    assert removed == ["a"] and ttl_map.stats.evicted == 1
+    assert ttl_map.pop("b") == "b" and removed == ["a"]
+
+
+def test_concurrent_writers():
+    ttl_map = TTLMap(60, max_size=500)
+
+    def write(offset):
+        for i in range(1000):
+            ttl_map[offset + i] = i
+
+    threads = [threading.Thread(target=write, args=(n * 1000,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ttl_map) == 500
+    assert ttl_map.stats.evicted == 3500
+
+
+def test_client_releases_slots_of_dropped_tasks():
+    limiter = RateLimiter(max_in_flight=2)
+    client = BFLClient(api_key="k", rate_limiter=limiter, max_polling_urls=1)
+    for task_id in ("a", "b"):
+        limiter.acquire_task_slot()
+        client._store_polling_url(task_id, {"polling_url": f"https://x/{task_id}"})
+        client._task_started(task_id)
+
+    # "a" was evicted, so its slot is free again
+    assert limiter.in_flight.in_flight == 1
+    assert client._get_polling_endpoint("b") == "https://x/b"
+    assert client._get_polling_endpoint("a") == "/v1/get_result?id=a"
+    assert client.polling_url_stats.snapshot()["hits"] == 1
@@ -0,0 +1,52 @@
+import pytest
+from pydantic import ValidationError
+
+from benchmarks.validation import measure, sample_inputs
+from blackforest import BFLClient
+from blackforest.resources.mapping.model_input_registry import MODEL_INPUT_REGISTRY
+from blackforest.types.base.output_format import OutputFormat
+from blackforest.types.general.client_config import ClientConfig
+from blackforest.types.inputs.flux_pro_1_1 import FluxPro11Inputs
+from blackforest.validators import validator_for
+
+
+def test_compiled_and_trusted_payloads_match_the_model_dump():
+    for model, inputs in sample_inputs().items():
+        input_cls = MODEL_INPUT_REGISTRY[model]
+        expected = input_cls(**inputs).model_dump(mode="json", exclude_none=True)
+        validator = validator_for(input_cls)
+
+        assert validator is validator_for(input_cls)
+        assert validator.validate(inputs) == expected, model
+        assert validator.trusted(inputs) == expected, model
+
+    validator = validator_for(FluxPro11Inputs)
+    with pytest.raises(ValidationError):
+        validator.validate({"prompt": "x", "width": 1000})
+    # Unknown fields are dropped, enums dumped and explicit None omitted
+    assert validator.trusted(
+        {"prompt": "x", "output_format": OutputFormat.png, "seed": None, "foo": 1}
+    ) == {**validator.defaults, "prompt": "x", "output_format": "png"}
+
+
+def test_trusted_client_skips_validation(bfl_server):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    trusted = BFLClient(
+        api_key="test-key", base_url=bfl_server.url, trusted_inputs=True
+    )
+    inputs = {"prompt": "ein fantastisches bild", "seed": 7, "width": 1000}
+
+    with pytest.raises(ValidationError):
+        client.generate("flux-pro-1.1", inputs)
+    response = trusted.generate("flux-pro-1.1", inputs, ClientConfig(sync=False))
+
+    payload = bfl_server.state.tasks[response.id]["payload"]
+    assert payload["width"] == 1000 and payload["height"] == 768
+
+
+def test_validation_benchmark_covers_the_registry():
+    samples = sample_inputs()
+    assert set(samples) == set(MODEL_INPUT_REGISTRY)
+    result = measure("flux-pro-1.1", samples["flux-pro-1.1"], number=10, repeat=1)
+    assert result.input_class == "FluxPro11Inputs"
+    assert min(result.model_us, result.compiled_us, result.trusted_us) > 0
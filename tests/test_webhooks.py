@@ -0,0 +1,131 @@
+import asyncio
+import io
+import json
+from concurrent.futures import as_completed
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from blackforest import AsyncBFLClient, BFLClient
+from blackforest.transport.async_http import AsyncHTTPTransport
+from blackforest.types.inputs.flux_dev import FluxDevInputs
+from blackforest.types.responses.responses import TaskResult
+from blackforest.webhooks import WebhookReceiver, parse_event, sign, verify_signature
+
+
+@pytest.fixture
+def receiver():
+    receiver = WebhookReceiver(secret="s3cret")
+    host, port = receiver.serve("127.0.0.1")
+    receiver.public_url = f"http://{host}:{port}/hooks/bfl"
+    yield receiver
+    receiver.close()
+
+
+def test_signatures():
+    body = b'{"task_id": "t"}'
+    signature = sign("key", body)
+    assert verify_signature("key", body, signature)
+    assert verify_signature("key", body, signature.split("=", 1)[1])
+    assert not verify_signature("other", body, signature)
+    assert not verify_signature("key", body + b" ", signature)
+    assert not verify_signature("key", body, None)
+
+
+def test_parse_event():
+    ready = parse_event({"id": "t", "status": "SUCCESS", "result": {"sample": "u"}})
+    assert ready.ok and ready.status == "Ready"
+    failed = parse_event({"task_id": "t", "status": "Error", "details": "boom"})
+    assert not failed.ok and failed.error == "boom"
+    assert parse_event({"task_id": "t", "status": "Pending"}) is None
+
+
+def test_handle_rejects_bad_requests():
+    receiver = WebhookReceiver(secret="s3cret")
+    body = json.dumps({"task_id": "t", "status": "Ready"}).encode()
+    assert receiver.handle(body, {"X-BFL-Signature": "sha256=00"})[0] == 401
+    assert (
+        receiver.handle(b"nope", {"x-bfl-signature": sign("s3cret", b"nope")})[0] == 400
+    )
+
+    # An event that beats expect() is kept for it
+    assert receiver.handle(body, {"x-bfl-signature": sign("s3cret", body)}) == (
+        200,
+        "ok",
+    )
+    assert receiver.expect("t").result(timeout=0).status == "Ready"
+
+
+def test_unsigned_webhooks_are_only_served_on_loopback():
+    receiver = WebhookReceiver()
+    with pytest.raises(ValueError, match="unsigned webhooks"):
+        receiver.serve("0.0.0.0")
+    try:
+        host, _ = receiver.serve()
+        assert host == "127.0.0.1"
+    finally:
+        receiver.close()
+
+
+def test_cancelled_future_is_forgotten():
+    receiver = WebhookReceiver()
+    future = receiver.expect("t")
+    assert receiver.pending == 1
+    future.cancel()
+    assert receiver.pending == 0
+    assert not receiver.deliver(TaskResult(id="t", status="Ready"))
+
+
+def test_wsgi_app():
+    receiver = WebhookReceiver(secret="s3cret")
+    future = receiver.expect("t")
+    body = json.dumps({"task_id": "t", "status": "Ready"}).encode()
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "CONTENT_LENGTH": str(len(body)),
+        "HTTP_X_BFL_SIGNATURE": sign("s3cret", body),
+        "wsgi.input": io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    response = receiver.wsgi_app(
+        environ, lambda status, headers: statuses.append(status)
+    )
+    assert statuses == ["200 OK"] and response == [b"ok"]
+    assert future.result(timeout=0).ok
+
+
+def test_webhook_fields_are_sent_as_strings():
+    payload = FluxDevInputs(
+        prompt="x", webhook_url="https://example.com/hook", webhook_secret="s"
+    ).model_dump(mode="json", exclude_none=True)
+    assert payload["webhook_url"] == "https://example.com/hook"
+
+
+def test_generate_with_webhook_does_not_poll(bfl_server, receiver):
+    client = BFLClient(api_key="test-key", base_url=bfl_server.url)
+    futures = [
+        client.generate_with_webhook("flux-dev", {"prompt": str(i)}, receiver)
+        for i in range(5)
+    ]
+    results = [f.result() for f in as_completed(futures, timeout=10)]
+
+    assert all(r.ok and r.result["sample"].endswith(".jpeg") for r in results)
+    assert bfl_server.state.count("GET", "/v1/get_result") == 0
+    task = bfl_server.state.tasks[results[0].id]
+    assert task["payload"]["webhook_url"] == receiver.public_url
+    assert task["payload"]["webhook_secret"] == "s3cret"
+
+
+def test_async_generate_with_webhook(bfl_server, receiver):
+    async def run():
+        async with AsyncBFLClient(
+            api_key="test-key", base_url=bfl_server.url, transport=AsyncHTTPTransport()
+        ) as client:
+            future = await client.generate_with_webhook(
+                "flux-dev", {"prompt": "x"}, receiver
+            )
+            return await asyncio.wait_for(future, 10)
+
+    assert asyncio.run(run()).ok
+    assert bfl_server.state.count("GET", "/v1/get_result") == 0